@@ -0,0 +1,50 @@
+"""Индексы для основных запросов заказов и кухни
+
+Revision ID: 5f3a9c1e7b24
+Revises:
+Create Date: 2026-10-17 12:00:00.000000+03:00
+
+Первая миграция проекта: схема создается через init_db(), поэтому индексы
+создаются с IF NOT EXISTS и миграцию можно применить как к существующей
+базе (app.db), так и к только что созданной.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3a9c1e7b24'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    # Активные заказы столика / поиск заказа для дозаказа
+    ("ix_orders_table_id_status", "orders", ["table_id", "status"]),
+    # Список заказов с фильтром по статусу, статистика по периоду
+    ("ix_orders_status_created_at", "orders", ["status", "created_at"]),
+    ("ix_orders_waiter_id_created_at", "orders", ["waiter_id", "created_at"]),
+    ("ix_orders_created_at", "orders", ["created_at"]),
+    # Доска цеха: department = ? AND status IN (...) ORDER BY created_at
+    ("ix_order_items_department_status_created_at", "order_items", ["department", "status", "created_at"]),
+    # Все блюда кухни: status IN (...) ORDER BY created_at
+    ("ix_order_items_status_created_at", "order_items", ["status", "created_at"]),
+    # Позиции заказа и проверка неготовых позиций при оплате
+    ("ix_order_items_order_id_status", "order_items", ["order_id", "status"]),
+]
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
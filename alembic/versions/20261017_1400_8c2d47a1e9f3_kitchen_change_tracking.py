@@ -0,0 +1,73 @@
+"""Номера изменений позиций заказа для синхронизации доски кухни
+
+Revision ID: 8c2d47a1e9f3
+Revises: 5f3a9c1e7b24
+Create Date: 2026-10-17 14:00:00.000000+03:00
+
+Колонка order_items.change_seq, счетчики sync_counters и журнал удаленных
+позиций order_item_deletions. Новые таблицы и колонку может уже создать
+init_db(), поэтому миграция проверяет их наличие.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2d47a1e9f3'
+down_revision: Union[str, None] = '5f3a9c1e7b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DEPARTMENTS = ('BAR', 'COLD_KITCHEN', 'HOT_KITCHEN', 'DESSERT', 'GRILL', 'BAKERY')
+
+
+def _timestamps():
+    return [
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.text("(datetime('now', '+3 hours'))")),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.text("(datetime('now', '+3 hours'))")),
+    ]
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'change_seq' not in {column['name'] for column in inspector.get_columns('order_items')}:
+        op.add_column('order_items', sa.Column('change_seq', sa.Integer(), nullable=True))
+    op.create_index('ix_order_items_change_seq', 'order_items', ['change_seq'], unique=False, if_not_exists=True)
+
+    if 'sync_counters' not in tables:
+        op.create_table(
+            'sync_counters',
+            sa.Column('name', sa.String(length=50), primary_key=True),
+            sa.Column('value', sa.Integer(), nullable=False),
+            *_timestamps()
+        )
+
+    if 'order_item_deletions' not in tables:
+        op.create_table(
+            'order_item_deletions',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('order_item_id', sa.Integer(), nullable=False),
+            sa.Column('department', sa.Enum(*DEPARTMENTS, name='kitchendepartment'), nullable=False),
+            sa.Column('change_seq', sa.Integer(), nullable=False),
+            *_timestamps()
+        )
+    op.create_index('ix_order_item_deletions_change_seq', 'order_item_deletions', ['change_seq'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    op.drop_index('ix_order_item_deletions_change_seq', table_name='order_item_deletions', if_exists=True)
+    op.drop_table('order_item_deletions')
+    op.drop_table('sync_counters')
+    op.drop_index('ix_order_items_change_seq', table_name='order_items', if_exists=True)
+    with op.batch_alter_table('order_items') as batch_op:
+        batch_op.drop_column('change_seq')
@@ -0,0 +1,31 @@
+"""Индекс поданных позиций по времени изменения для доски кухни
+
+Revision ID: 3b7e5d92c4a6
+Revises: 8c2d47a1e9f3
+Create Date: 2026-10-17 15:00:00.000000+03:00
+
+Доска кухни показывает поданные позиции только за последние N минут:
+status = 'SERVED' AND updated_at >= ?.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e5d92c4a6'
+down_revision: Union[str, None] = '8c2d47a1e9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    op.create_index('ix_order_items_status_updated_at', 'order_items', ['status', 'updated_at'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    op.drop_index('ix_order_items_status_updated_at', table_name='order_items', if_exists=True)
@@ -0,0 +1,105 @@
+"""Архивные таблицы заказов и позиций заказа
+
+Revision ID: 9d4f1a6c2b85
+Revises: 3b7e5d92c4a6
+Create Date: 2026-10-17 16:00:00.000000+03:00
+
+orders_archive и order_items_archive повторяют колонки orders/order_items
+и добавляют archived_at. Таблицы может уже создать init_db(), поэтому
+миграция проверяет их наличие.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f1a6c2b85'
+down_revision: Union[str, None] = '3b7e5d92c4a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ORDER_STATUSES = ('PENDING', 'IN_PROGRESS', 'READY', 'SERVED', 'DINING', 'COMPLETED', 'CANCELLED')
+PAYMENT_STATUSES = ('UNPAID', 'PAID', 'REFUNDED')
+ORDER_TYPES = ('DINE_IN', 'TAKEAWAY', 'DELIVERY')
+ITEM_STATUSES = ('NEW', 'SENT_TO_KITCHEN', 'IN_PREPARATION', 'READY', 'SERVED', 'CANCELLED')
+DEPARTMENTS = ('BAR', 'COLD_KITCHEN', 'HOT_KITCHEN', 'DESSERT', 'GRILL', 'BAKERY')
+
+
+def _timestamps():
+    return [
+        sa.Column(name, sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.text("(datetime('now', '+3 hours'))"))
+        for name in ('created_at', 'updated_at', 'archived_at')
+    ]
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'orders_archive' not in tables:
+        op.create_table(
+            'orders_archive',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('total_price', sa.Float(precision=2), nullable=False),
+            sa.Column('status', sa.Enum(*ORDER_STATUSES, name='orderstatus'), nullable=False),
+            sa.Column('payment_status', sa.Enum(*PAYMENT_STATUSES, name='paymentstatus'), nullable=False),
+            sa.Column('order_type', sa.Enum(*ORDER_TYPES, name='ordertype'), nullable=False),
+            sa.Column('table_id', sa.Integer(), sa.ForeignKey('tables.id'), nullable=True),
+            sa.Column('waiter_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('payment_method_id', sa.Integer(), sa.ForeignKey('payment_methods.id'), nullable=True),
+            sa.Column('customer_name', sa.String(length=100), nullable=True),
+            sa.Column('customer_phone', sa.String(length=20), nullable=True),
+            sa.Column('delivery_address', sa.String(length=500), nullable=True),
+            sa.Column('delivery_notes', sa.String(length=300), nullable=True),
+            sa.Column('served_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('cancelled_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('time_to_serve', sa.Integer(), nullable=True),
+            *_timestamps(),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('kitchen_notes', sa.Text(), nullable=True),
+        )
+    op.create_index('ix_orders_archive_created_at', 'orders_archive', ['created_at'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_orders_archive_waiter_id_created_at', 'orders_archive', ['waiter_id', 'created_at'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_orders_archive_table_id', 'orders_archive', ['table_id'],
+                    unique=False, if_not_exists=True)
+
+    if 'order_items_archive' not in tables:
+        op.create_table(
+            'order_items_archive',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('price', sa.Float(precision=2), nullable=False),
+            sa.Column('total', sa.Float(precision=2), nullable=False),
+            sa.Column('status', sa.Enum(*ITEM_STATUSES, name='orderitemstatus'), nullable=False),
+            sa.Column('department', sa.Enum(*DEPARTMENTS, name='kitchendepartment'), nullable=False),
+            sa.Column('sent_to_kitchen_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('preparation_started_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('ready_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('served_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('estimated_preparation_time', sa.Integer(), nullable=True),
+            sa.Column('actual_preparation_time', sa.Integer(), nullable=True),
+            *_timestamps(),
+            sa.Column('order_id', sa.Integer(), sa.ForeignKey('orders_archive.id'), nullable=False),
+            sa.Column('dish_id', sa.Integer(), sa.ForeignKey('dishes.id'), nullable=False),
+            sa.Column('dish_variation_id', sa.Integer(), sa.ForeignKey('dish_variations.id'), nullable=True),
+            sa.Column('comment', sa.Text(), nullable=True),
+        )
+    op.create_index('ix_order_items_archive_order_id', 'order_items_archive', ['order_id'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_order_items_archive_department_created_at', 'order_items_archive',
+                    ['department', 'created_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_order_items_archive_dish_id', 'order_items_archive', ['dish_id'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    op.drop_table('order_items_archive')
+    op.drop_table('orders_archive')
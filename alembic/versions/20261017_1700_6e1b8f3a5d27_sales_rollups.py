@@ -0,0 +1,82 @@
+"""Почасовые агрегаты продаж
+
+Revision ID: 6e1b8f3a5d27
+Revises: 9d4f1a6c2b85
+Create Date: 2026-10-17 17:00:00.000000+03:00
+
+order_rollups (час x официант x способ оплаты) и order_item_rollups
+(час x блюдо x цех). Таблицы может уже создать init_db(), поэтому миграция
+проверяет их наличие. Заполняются при первом запуске приложения
+(RollupService.ensure_built) или скриптом rebuild_rollups.py.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1b8f3a5d27'
+down_revision: Union[str, None] = '9d4f1a6c2b85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DEPARTMENTS = ('BAR', 'COLD_KITCHEN', 'HOT_KITCHEN', 'DESSERT', 'GRILL', 'BAKERY')
+ORDER_COUNTERS = (
+    'orders', 'pending_orders', 'in_progress_orders', 'ready_orders', 'served_orders',
+    'dining_orders', 'completed_orders', 'cancelled_orders', 'paid_orders'
+)
+
+
+def _timestamps():
+    return [
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.text("(datetime('now', '+3 hours'))")),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.text("(datetime('now', '+3 hours'))")),
+    ]
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'order_rollups' not in tables:
+        op.create_table(
+            'order_rollups',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('day', sa.String(length=10), nullable=False),
+            sa.Column('hour', sa.Integer(), nullable=False),
+            sa.Column('waiter_id', sa.Integer(), nullable=False),
+            sa.Column('payment_method_id', sa.Integer(), nullable=False),
+            *[sa.Column(name, sa.Integer(), nullable=False) for name in ORDER_COUNTERS],
+            sa.Column('revenue', sa.Float(precision=2), nullable=False),
+            sa.Column('time_to_serve_total', sa.Integer(), nullable=False),
+            sa.Column('time_to_serve_count', sa.Integer(), nullable=False),
+            *_timestamps(),
+            sa.UniqueConstraint('day', 'hour', 'waiter_id', 'payment_method_id', name='uq_order_rollups_key')
+        )
+
+    if 'order_item_rollups' not in tables:
+        op.create_table(
+            'order_item_rollups',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('day', sa.String(length=10), nullable=False),
+            sa.Column('hour', sa.Integer(), nullable=False),
+            sa.Column('dish_id', sa.Integer(), nullable=False),
+            sa.Column('department', sa.Enum(*DEPARTMENTS, name='kitchendepartment'), nullable=False),
+            sa.Column('items', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('total', sa.Float(precision=2), nullable=False),
+            *_timestamps(),
+            sa.UniqueConstraint('day', 'hour', 'dish_id', 'department', name='uq_order_item_rollups_key')
+        )
+    op.create_index('ix_order_item_rollups_dish_id_day', 'order_item_rollups', ['dish_id', 'day'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    op.drop_table('order_item_rollups')
+    op.drop_table('order_rollups')
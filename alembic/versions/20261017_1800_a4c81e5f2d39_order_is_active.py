@@ -0,0 +1,44 @@
+"""Хранимый признак открытого заказа вместо вычисляемой сортировки
+
+Revision ID: a4c81e5f2d39
+Revises: 6e1b8f3a5d27
+Create Date: 2026-10-17 18:00:00.000000+03:00
+
+orders.is_active = статус не COMPLETED/CANCELLED. Список заказов сортируется
+по (is_active, created_at) из индекса, открытые заказы столика ищутся по
+частичному индексу. Колонку может уже создать init_db(), поэтому миграция
+проверяет ее наличие; значения для существующих заказов заполняются по статусу.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c81e5f2d39'
+down_revision: Union[str, None] = '6e1b8f3a5d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    inspector = sa.inspect(op.get_bind())
+
+    if 'is_active' not in {column['name'] for column in inspector.get_columns('orders')}:
+        op.add_column('orders', sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+        op.execute("UPDATE orders SET is_active = status NOT IN ('COMPLETED', 'CANCELLED')")
+
+    op.create_index('ix_orders_is_active_created_at', 'orders', ['is_active', 'created_at'],
+                    unique=False, if_not_exists=True)
+    op.create_index('ix_orders_active_table_id', 'orders', ['table_id'], unique=False,
+                    sqlite_where=sa.text('is_active = 1'), if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    op.drop_index('ix_orders_active_table_id', table_name='orders', if_exists=True)
+    op.drop_index('ix_orders_is_active_created_at', table_name='orders', if_exists=True)
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('is_active')
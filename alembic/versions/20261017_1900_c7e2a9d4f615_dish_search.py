@@ -0,0 +1,68 @@
+"""Полнотекстовый индекс поиска блюд (SQLite FTS5)
+
+Revision ID: c7e2a9d4f615
+Revises: a4c81e5f2d39
+Create Date: 2026-10-17 19:00:00.000000+03:00
+
+Виртуальная таблица dish_search (rowid = dishes.id) с названием, описанием,
+ингредиентами и кодом блюда. Тексты хранятся нормализованными (casefold,
+ё -> е), индекс обновляет приложение при сохранении блюда. Таблицу может
+уже создать init_db(), поэтому используется IF NOT EXISTS; на других СУБД
+миграция ничего не делает - поиск остается на ILIKE.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9d4f615'
+down_revision: Union[str, None] = 'a4c81e5f2d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _normalize(value):
+    # Та же нормализация, что в app/services/dish_search.py
+    return (value or "").casefold().replace("ё", "е")
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS dish_search USING fts5("
+        "name, description, ingredients, code, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    op.execute("INSERT INTO dish_search(dish_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 5.0)')")
+
+    dishes = bind.execute(sa.text("SELECT id, name, description, ingredients, code FROM dishes")).all()
+    op.execute("DELETE FROM dish_search")
+    if dishes:
+        bind.execute(
+            sa.text(
+                "INSERT INTO dish_search(rowid, name, description, ingredients, code) "
+                "VALUES (:id, :name, :description, :ingredients, :code)"
+            ),
+            [
+                {
+                    "id": dish.id,
+                    "name": _normalize(dish.name),
+                    "description": _normalize(dish.description),
+                    "ingredients": _normalize(dish.ingredients),
+                    "code": _normalize(dish.code),
+                }
+                for dish in dishes
+            ]
+        )
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS dish_search")
@@ -0,0 +1,46 @@
+"""Признак заказа в работе для сортировки списка заказов
+
+Revision ID: d3a6f08b1c42
+Revises: c7e2a9d4f615
+Create Date: 2026-10-17 20:00:00.000000+03:00
+
+Список заказов показывал первыми PENDING/IN_PROGRESS/READY, а сортировка по
+is_active подняла к ним и SERVED/DINING. orders.in_work хранит прежний
+признак, индекс сортировки списка строится по (in_work, created_at) вместо
+(is_active, created_at). is_active остается для поиска открытых заказов
+столика и архивации. Колонку может уже создать init_db(), поэтому миграция
+проверяет ее наличие; значения для существующих заказов заполняются по статусу.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a6f08b1c42'
+down_revision: Union[str, None] = 'c7e2a9d4f615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Применение миграции."""
+    inspector = sa.inspect(op.get_bind())
+
+    if 'in_work' not in {column['name'] for column in inspector.get_columns('orders')}:
+        op.add_column('orders', sa.Column('in_work', sa.Boolean(), nullable=False, server_default=sa.true()))
+        op.execute("UPDATE orders SET in_work = status IN ('PENDING', 'IN_PROGRESS', 'READY')")
+
+    op.create_index('ix_orders_in_work_created_at', 'orders', ['in_work', 'created_at'],
+                    unique=False, if_not_exists=True)
+    op.drop_index('ix_orders_is_active_created_at', table_name='orders', if_exists=True)
+
+
+def downgrade() -> None:
+    """Откат миграции."""
+    op.create_index('ix_orders_is_active_created_at', 'orders', ['is_active', 'created_at'],
+                    unique=False, if_not_exists=True)
+    op.drop_index('ix_orders_in_work_created_at', table_name='orders', if_exists=True)
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('in_work')
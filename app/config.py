@@ -3,12 +3,20 @@ QRes OS 4 - Configuration Management
 Загрузка и валидация настроек приложения
 """
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 from pydantic import validator
 import os
 
 
+def _check_pragma_value(name: str, value: str, allowed: set) -> str:
+    """Проверка значения PRAGMA SQLite (подставляется в SQL как есть)"""
+    value = (value or "").strip().upper()
+    if value and value not in allowed:
+        raise ValueError(f"{name}: допустимые значения {sorted(allowed)}")
+    return value
+
+
 class Settings(BaseSettings):
     """Настройки приложения с валидацией"""
     
@@ -18,6 +26,22 @@ class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite+aiosqlite:///./app.db"
     
+    # SQLite - PRAGMA при открытии каждого соединения (пустое значение - не задавать)
+    sqlite_journal_mode: str = "WAL"  # WAL: читатели не блокируют запись
+    sqlite_synchronous: str = "NORMAL"  # В WAL безопасно при сбое процесса, меньше fsync на коммит
+    sqlite_busy_timeout: int = 5000  # Ожидание блокировки записи (мс) вместо "database is locked"
+    sqlite_mmap_size: int = 64 * 1024 * 1024  # Чтение через mmap (байт)
+    sqlite_cache_size: int = -16384  # Кэш страниц: отрицательное значение - в КиБ (16 МБ)
+    sqlite_temp_store: str = "MEMORY"  # Временные таблицы и сортировки в памяти
+    sqlite_pool_size: int = 5  # Постоянно открытых соединений с файлом БД
+    sqlite_max_overflow: int = 10  # Дополнительных соединений при пиковой нагрузке
+    
+    # SQLite - очередь записи: пишущие запросы по очереди на одном соединении, групповой коммит
+    sqlite_write_queue: bool = False
+    sqlite_write_queue_batch: int = 32  # Максимум транзакций в одном COMMIT
+    sqlite_write_queue_max_delay: float = 0.05  # Максимальное ожидание фиксации группы (сек)
+    sqlite_write_queue_timeout: float = 10.0  # Ожидание очереди, затем 503 (сек)
+    
     # Security
     secret_key: str = "your-super-secret-key-change-in-production"
     algorithm: str = "HS256"
@@ -29,6 +53,14 @@ class Settings(BaseSettings):
     jwt_audience: str = "qres-os-4-users"
     require_fresh_token_minutes: int = 15  # Время после которого требуется fresh token для критичных операций
     
+    # Хеширование паролей (bcrypt) - отдельный пул потоков, чтобы не блокировать event loop
+    password_hash_workers: int = 2  # Потоков для bcrypt (по числу свободных ядер)
+    password_hash_max_queue: int = 64  # Максимум ожидающих операций, дальше - 503
+    
+    # Кэши аутентификации
+    token_cache_size: int = 4096  # Проверенных JWT токенов в LRU-кэше
+    principal_cache_ttl: float = 30.0  # Время жизни пользователя в кэше (сек), 0 - отключить
+    
     # CRITICAL: Валидация секретного ключа в продакшене
     @validator('secret_key')
     def validate_secret_key(cls, v):
@@ -76,11 +108,68 @@ class Settings(BaseSettings):
     rate_limit_window: int = 60  # Временное окно в секундах (1 минута)
     rate_limit_block_duration: int = 60  # Длительность блокировки (1 минута)
     disable_rate_limit_in_debug: bool = True  # Отключать ли ограничение в режиме разработки
+    rate_limit_auth_max_requests: int = 30  # Бюджет /auth/login* за окно
+    rate_limit_public_max_requests: int = 1000  # Бюджет публичного меню, /health, /uploads за окно
+    rate_limit_max_keys: int = 50000  # Максимум отслеживаемых ключей (IP x бюджет), старые вытесняются
+    max_failed_logins: int = 5  # Неудачных входов до блокировки IP
+    failed_login_window: int = 300  # Окно подсчета неудачных входов (сек)
+    suspicious_requests_threshold: int = 10  # Подозрительных запросов в час до блокировки IP
+    
+    # Request log (JSONL) - буферизованная запись в фоновом потоке
+    request_log_batch_size: int = 100  # Сброс на диск после N записей
+    request_log_flush_interval: float = 1.0  # Или не реже, чем раз в N секунд
+    request_log_queue_size: int = 10000  # Максимум записей в очереди (лишние отбрасываются)
+    
+    # WebSocket - исходящая очередь на каждое соединение
+    websocket_send_queue_size: int = 100  # Максимум неотправленных сообщений на клиента
+    websocket_send_timeout: float = 10.0  # Таймаут отправки одного сообщения (сек)
+    websocket_slow_consumer_policy: str = "coalesce"  # coalesce | drop_oldest | disconnect
+    
+    # Доска кухни
+    kitchen_served_window_minutes: int = 30  # Поданные позиции видны на доске N минут
+    kitchen_board_limit: int = 200  # Позиций одного цеха на странице доски
+    kitchen_board_department_limits: Dict[str, int] = {}  # Лимиты отдельных цехов, например {"bar": 50}
+    
+    # Списки (GET /orders/, /dishes/, /users/, /tables/)
+    list_count_cache_ttl: float = 30.0  # Время жизни total для count=cached (сек)
+    list_count_cache_size: int = 1000  # Наборов фильтров в кэше total (LRU)
+    
+    # Дашборд администратора
+    dashboard_cache_ttl: float = 5.0  # Время жизни снимка статистики (сек)
+    
+    # Архив заказов - закрытые заказы переносятся в orders_archive
+    archive_enabled: bool = True
+    archive_after_days: int = 30  # Архивировать заказы старше N дней
+    archive_batch_size: int = 500  # Заказов в одной транзакции переноса
+    archive_batch_pause: float = 0.1  # Пауза между пачками (сек)
+    archive_interval: int = 3600  # Период фоновой архивации (сек)
     
     # Restaurant
     restaurant_name: str = "QRes OS 4 Restaurant"
     restaurant_timezone: str = "Europe/Moscow"
     
+    @validator('sqlite_journal_mode')
+    def validate_sqlite_journal_mode(cls, v):
+        return _check_pragma_value("sqlite_journal_mode", v, {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"})
+    
+    @validator('sqlite_synchronous')
+    def validate_sqlite_synchronous(cls, v):
+        return _check_pragma_value("sqlite_synchronous", v, {"OFF", "NORMAL", "FULL", "EXTRA"})
+    
+    @validator('sqlite_temp_store')
+    def validate_sqlite_temp_store(cls, v):
+        return _check_pragma_value("sqlite_temp_store", v, {"DEFAULT", "FILE", "MEMORY"})
+    
+    @validator('kitchen_board_department_limits')
+    def validate_kitchen_board_department_limits(cls, v):
+        departments = {"bar", "cold", "hot", "dessert", "grill", "bakery"}
+        unknown = set(v) - departments
+        if unknown:
+            raise ValueError(f"kitchen_board_department_limits: неизвестные цеха {sorted(unknown)}")
+        if any(limit < 1 for limit in v.values()):
+            raise ValueError("kitchen_board_department_limits: лимит должен быть больше 0")
+        return v
+    
     @validator('allowed_hosts', allow_reuse=True)
     def expand_allowed_hosts(cls, v) -> List[str]:
         """ВРЕМЕННО: Разрешаем все хосты для отладки"""
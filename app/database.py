@@ -2,23 +2,92 @@
 QRes OS 4 - Database Configuration
 Настройка подключения к базе данных с поддержкой async SQLAlchemy 2.0
 """
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import DateTime, func, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+from sqlalchemy import DateTime, event, func, text, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util import await_only
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.engine import Connection
 from datetime import datetime
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional
 
 from .config import settings
 
 
+def is_sqlite_file(database_url: str) -> bool:
+    """URL указывает на файловую SQLite (не :memory:)"""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def sqlite_engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Пул соединений для файловой SQLite
+
+    Соединения держатся открытыми: PRAGMA выполняются один раз на соединение,
+    а WAL не сбрасывается в основной файл при закрытии каждой сессии
+    (с NullPool последнее закрытое соединение делает checkpoint и fsync).
+    """
+    if not is_sqlite_file(database_url):
+        return {}
+    return {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.sqlite_pool_size,
+        "max_overflow": settings.sqlite_max_overflow,
+    }
+
+
 # Создание асинхронного движка
 engine = create_async_engine(
     settings.database_url,
     echo=settings.debug,  # Логирование SQL-запросов в режиме отладки
     future=True,
     pool_pre_ping=True,  # Проверка соединений
+    **sqlite_engine_options(settings.database_url)
 )
 
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMA профиля SQLite из настроек, в порядке применения"""
+    pragmas = {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+    return {name: value for name, value in pragmas.items() if value not in (None, "")}
+
+
+def install_sqlite_profile(target_engine: AsyncEngine, pragmas: Dict[str, Any]) -> None:
+    """
+    Применять PRAGMA к каждому новому соединению SQLite
+
+    journal_mode=WAL сохраняется в файле БД, остальные PRAGMA действуют
+    только на соединение, поэтому выполняются в событии connect.
+    Для других СУБД ничего не делает.
+    """
+    if target_engine.dialect.name != "sqlite" or not pragmas:
+        return
+    
+    @event.listens_for(target_engine.sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+install_sqlite_profile(engine, sqlite_pragmas())
+
 # Фабрика сессий
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -46,23 +115,364 @@ class Base(DeclarativeBase):
     )
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+class WriteQueueTimeout(HTTPException):
+    """Очередь записи не освободилась за отведенное время (ответ 503)"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="База данных занята, повторите запрос"
+        )
+
+
+# Ключ session.info: действия, отложенные до группового коммита очереди записи
+_DEFERRED_COMMIT_HOOKS = "deferred_commit_hooks"
+
+
+def run_after_commit(session: Session, callback: Callable[[], None]) -> None:
     """
-    Dependency для получения сессии БД
-    Используется в FastAPI Depends()
+    Выполнить callback, когда транзакция сессии зафиксирована
+
+    Вызывается из события after_commit. Обычная сессия к этому моменту
+    выполнила COMMIT, и callback вызывается сразу. Сессия очереди записи
+    освободила только точку сохранения: другие соединения увидят данные
+    после группового COMMIT, поэтому callback ждет его, а при ошибке
+    COMMIT не вызывается.
+    """
+    deferred = session.info.get(_DEFERRED_COMMIT_HOOKS)
+    if deferred is None:
+        callback()
+    else:
+        deferred.append(callback)
+
+
+class _QueuedSyncSession(Session):
+    """
+    Синхронная часть сессии очереди записи: выбор соединения для операции
+
+    До первой записи SELECT идут через обычный пул. Flush, INSERT/UPDATE/
+    DELETE и session.connection() сначала дожидаются очереди записи
+    (await внутри greenlet, в котором AsyncSession выполняет операции),
+    и дальше все операции сессии - чтение тоже, чтобы видеть свои
+    изменения - идут на соединении писателя.
     """
-    async with AsyncSessionLocal() as session:
+
+    queued: "_QueuedWriteSession"
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        queued = self.queued
+        if not queued.engaged:
+            if clause is not None and getattr(clause, "is_select", False):
+                return super().get_bind(mapper, clause=clause, **kw)
+            await_only(queued.coordinator.take(queued))
+        return queued.coordinator.writer_connection
+
+
+class _QueuedWriteSession(AsyncSession):
+    """
+    Сессия пишущего запроса при включенной очереди записи
+
+    Соединение писателя берется при первой записи, а не при создании
+    сессии: запрос, который сначала читает и долго считает (проверка
+    пароля при входе), не держит очередь. Запись идет в точке сохранения
+    (SAVEPOINT) внутри общей транзакции: commit() освобождает точку
+    сохранения и возвращает управление, когда общая транзакция
+    зафиксирована (групповой коммит). Действия из run_after_commit
+    выполняются после этого.
+    """
+
+    sync_session_class = _QueuedSyncSession
+
+    def __init__(self, coordinator: "WriteCoordinator", **kwargs):
+        super().__init__(**kwargs)
+        self.coordinator = coordinator
+        self.engaged = False  # соединение писателя закреплено за сессией
+        self.holds_lock = False
+        self.sync_session.queued = self
+        self.info[_DEFERRED_COMMIT_HOOKS] = []
+
+    async def commit(self) -> None:
+        hooks: List[Callable[[], None]] = self.info[_DEFERRED_COMMIT_HOOKS]
         try:
-            yield session
-        except Exception as e:
-            await session.rollback()
-            # Логируем только реальные ошибки БД, не validation errors
-            if "ValidationError" not in str(type(e)):
-                from .logger import api_logger
-                api_logger.error(f"Ошибка базы данных: {str(e)}")
+            await super().commit()
+            if self.engaged:
+                await self.coordinator.commit_point(self)
+        except BaseException:
+            # Группа не зафиксирована - изменения не видны, действовать не на что
+            hooks.clear()
             raise
+
+        callbacks = list(hooks)
+        hooks.clear()
+        for callback in callbacks:
+            callback()
+
+
+class WriteCoordinator:
+    """
+    Очередь записи для SQLite (включается настройкой sqlite_write_queue)
+
+    Пишущие транзакции выполняются по очереди на одном выделенном
+    соединении: в SQLite одновременно пишет только одно соединение, и
+    вместо борьбы за блокировку файла (busy_timeout, "database is locked")
+    запросы ждут своей очереди в asyncio. Чтение идет через обычный пул.
+
+    Групповой коммит: транзакция запроса - точка сохранения внутри общей
+    транзакции соединения (BEGIN IMMEDIATE). Если после commit() запроса в
+    очереди есть другие запросы, соединение передается им, а COMMIT
+    выполняет последний в группе (не более write_queue_batch транзакций и
+    write_queue_max_delay секунд ожидания). commit() каждого запроса
+    возвращается только после фиксации группы, ошибка COMMIT передается
+    всем транзакциям группы.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._engine: Optional[AsyncEngine] = None
+        self._connection: Optional[AsyncConnection] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._waiting = 0
+        self._pending: List[asyncio.Future] = []
+        self._batch_started = 0.0
+
+        # Метрики
+        self.transactions = 0
+        self.group_commits = 0
+        self.largest_group = 0
+        self.timeouts = 0
+
+    async def start(self) -> None:
+        """Открыть соединение писателя (если очередь включена и БД - файловая SQLite)"""
+        if self.enabled or not settings.sqlite_write_queue or not is_sqlite_file(settings.database_url):
+            return
+
+        writer_engine = create_async_engine(
+            settings.database_url,
+            echo=settings.debug,
+            future=True,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=1,
+            max_overflow=0
+        )
+        install_sqlite_profile(writer_engine, sqlite_pragmas())
+
+        # Транзакциями управляем сами: драйвер sqlite3 не должен открывать
+        # их неявно, иначе SAVEPOINT работают некорректно
+        @event.listens_for(writer_engine.sync_engine, "connect")
+        def _disable_implicit_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        # IMMEDIATE: блокировка записи берется сразу, без повышения с чтения
+        @event.listens_for(writer_engine.sync_engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        self._engine = writer_engine
+        self._connection = await writer_engine.connect()
+        self._lock = asyncio.Lock()
+        self._pending = []
+        self.enabled = True
+
+    async def stop(self) -> None:
+        """Зафиксировать последнюю группу и закрыть соединение писателя"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        async with self._lock:
+            await self._group_commit()
+            await self._connection.close()
+            await self._engine.dispose()
+        self._connection = None
+        self._engine = None
+
+    @property
+    def writer_connection(self) -> Connection:
+        """Синхронное соединение писателя (для Session.get_bind)"""
+        return self._connection.sync_connection
+
+    def session(self) -> _QueuedWriteSession:
+        """Сессия пишущего запроса: очередь - при первой записи (см. take)"""
+        return _QueuedWriteSession(
+            self,
+            bind=engine,
+            join_transaction_mode="create_savepoint",
+            expire_on_commit=False,
+            autoflush=True
+        )
+
+    async def acquire(self) -> _QueuedWriteSession:
+        """Дождаться очереди и получить сессию, уже закрепленную за писателем"""
+        session = self.session()
+        await self.take(session)
+        return session
+
+    async def take(self, session: _QueuedWriteSession) -> None:
+        """
+        Дождаться очереди и закрепить соединение писателя за сессией
+
+        Raises:
+            WriteQueueTimeout: очередь не освободилась за sqlite_write_queue_timeout
+        """
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._lock.acquire(), settings.sqlite_write_queue_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise WriteQueueTimeout()
         finally:
+            self._waiting -= 1
+
+        try:
+            await self._begin()
+        except Exception:
+            self._lock.release()
+            raise
+        session.holds_lock = True
+        session.engaged = True
+
+    async def release(self, session: _QueuedWriteSession) -> None:
+        """Закрыть сессию и передать соединение следующему в очереди"""
+        try:
+            # Незафиксированная точка сохранения откатывается
             await session.close()
+        finally:
+            if session.holds_lock:
+                session.holds_lock = False
+                try:
+                    # Никто не ждет - фиксируем группу, не держим блокировку записи
+                    if not self._waiting or self._batch_is_full():
+                        await self._group_commit()
+                finally:
+                    self._lock.release()
+
+    async def commit_point(self, session: _QueuedWriteSession) -> None:
+        """Транзакция сессии завершена: дождаться фиксации ее группы"""
+        future = asyncio.get_running_loop().create_future()
+        if not self._pending:
+            self._batch_started = time.monotonic()
+        self._pending.append(future)
+        self.transactions += 1
+
+        if not self._waiting or self._batch_is_full():
+            await self._group_commit()
+            await self._begin()
+            future.result()
+            return
+
+        # Отдаем соединение следующим в очереди; COMMIT выполнит последний в группе
+        session.holds_lock = False
+        self._lock.release()
+        try:
+            await future
+        finally:
+            await self._lock.acquire()
+            session.holds_lock = True
+            await self._begin()
+
+    def _batch_is_full(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= settings.sqlite_write_queue_batch
+            or time.monotonic() - self._batch_started >= settings.sqlite_write_queue_max_delay
+        )
+
+    async def _begin(self) -> None:
+        if not self._connection.in_transaction():
+            await self._connection.begin()
+
+    async def _group_commit(self) -> None:
+        """COMMIT общей транзакции, результат - всем ожидающим транзакциям группы"""
+        pending, self._pending = self._pending, []
+        error: Optional[Exception] = None
+        try:
+            if self._connection.in_transaction():
+                await self._connection.commit()
+        except Exception as e:
+            error = e
+            try:
+                await self._connection.rollback()
+            except Exception:
+                pass
+
+        if pending:
+            self.group_commits += 1
+            self.largest_group = max(self.largest_group, len(pending))
+        for future in pending:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика очереди записи"""
+        return {
+            "enabled": self.enabled,
+            "waiting": self._waiting,
+            "transactions": self.transactions,
+            "group_commits": self.group_commits,
+            "largest_group": self.largest_group,
+            "timeouts": self.timeouts,
+        }
+
+
+# Глобальная очередь записи
+write_coordinator = WriteCoordinator()
+
+# Методы, для которых сессия берется из очереди записи
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+@asynccontextmanager
+async def _request_session(request: Request, lazy_writer: bool) -> AsyncIterator[AsyncSession]:
+    """Сессия запроса: из очереди записи для пишущих методов, иначе из пула"""
+    if write_coordinator.enabled and request.method in WRITE_METHODS:
+        session = write_coordinator.session()
+        if not lazy_writer:
+            await write_coordinator.take(session)
+        close = write_coordinator.release
+    else:
+        session = AsyncSessionLocal()
+        close = AsyncSession.close
+
+    try:
+        yield session
+    except Exception as e:
+        await session.rollback()
+        # Логируем только реальные ошибки БД, не validation errors
+        if "ValidationError" not in str(type(e)):
+            from .logger import api_logger
+            api_logger.error(f"Ошибка базы данных: {str(e)}")
+        raise
+    finally:
+        await close(session)
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency для получения сессии БД
+    Используется в FastAPI Depends()
+
+    При включенной очереди записи (sqlite_write_queue) запросы POST/PUT/
+    PATCH/DELETE получают сессию на соединении писателя (не дождались
+    очереди - 503), остальные - обычную сессию из пула. Писатель берется
+    до первого чтения: проверка и запись по ее результату (есть ли у
+    столика открытый заказ) идут в одной транзакции.
+    """
+    async with _request_session(request, lazy_writer=False) as session:
+        yield session
+
+
+async def get_lazy_write_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency для запросов, которые долго считают до записи (вход в систему)
+
+    Как get_db, но соединение писателя берется при первой записи: чтение
+    до нее идет через пул, и проверка пароля не держит очередь записи.
+    Подходит, только если запись не зависит от прочитанного до нее.
+    """
+    async with _request_session(request, lazy_writer=True) as session:
+        yield session
 
 
 async def init_db():
@@ -70,7 +480,9 @@ async def init_db():
     # Импортируем все модели, чтобы SQLAlchemy знал о них
     from .models import (
         User, Location, Table, Category, Dish, DishVariation,
-        Ingredient, PaymentMethod, Order, OrderItem
+        Ingredient, PaymentMethod, Order, OrderItem,
+        SyncCounter, OrderItemDeletion, OrderArchive, OrderItemArchive,
+        OrderRollup, OrderItemRollup
     )
     
     async with engine.begin() as conn:
@@ -79,4 +491,5 @@ async def init_db():
 
 async def close_db():
     """Закрытие подключения к БД"""
+    await write_coordinator.stop()
     await engine.dispose()
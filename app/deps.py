@@ -4,11 +4,11 @@ QRes OS 4 - FastAPI Dependencies
 """
 from typing import Annotated
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import get_db
+from .database import get_db, get_lazy_write_db
 from .services.auth import AuthService
 from .models import User, UserRole
 from .schemas import TokenData
@@ -24,16 +24,21 @@ security = HTTPBearer()
 
 
 async def get_current_user(
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
 ) -> User:
     """
     Получение текущего аутентифицированного пользователя
+
+    Проверенный токен сохраняется в request.state.principal, чтобы
+    middleware логирования не декодировало его повторно.
     """
     token = credentials.credentials
     token_data = AuthService.verify_token(token)
+    request.state.principal = token_data
     
-    user = await AuthService.get_user_by_id(db, token_data.user_id)
+    user = await AuthService.get_principal(db, token_data.user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,3 +90,4 @@ AdminUser = Annotated[User, Depends(require_admin)]
 WaiterUser = Annotated[User, Depends(require_waiter)]
 KitchenUser = Annotated[User, Depends(require_kitchen)]
 DatabaseSession = Annotated[AsyncSession, Depends(get_db)]
+LazyWriteSession = Annotated[AsyncSession, Depends(get_lazy_write_db)]
@@ -0,0 +1,56 @@
+"""
+QRes OS 4 - Loader Strategies
+Загрузка связей по схеме ответа: список получает только то, что сериализует
+"""
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import selectinload
+
+
+def schema_relations(schema) -> Tuple[str, ...]:
+    """
+    Связи, которые нужны схеме ответа
+
+    Схема объявляет их в ClassVar load_relations путями через точку
+    ("items.dish" - позиции заказа и блюдо каждой позиции).
+    """
+    return tuple(getattr(schema, "load_relations", ()))
+
+
+def load_options(model, schema) -> list:
+    """
+    Опции selectinload для model под схему ответа
+
+    Пути разрешаются по связям самой модели, поэтому одна схема подходит
+    и для orders, и для orders_archive (имена связей совпадают). Общие
+    префиксы путей загружаются один раз.
+    """
+    paths = sorted(set(schema_relations(schema)))
+    options = []
+    for path in paths:
+        current_model, option = model, None
+        for name in path.split("."):
+            attribute = getattr(current_model, name)
+            option = selectinload(attribute) if option is None else option.selectinload(attribute)
+            current_model = attribute.property.mapper.class_
+        options.append(option)
+    return options
+
+
+def parse_expand(expand: Optional[str], allowed: Iterable[str]) -> List[str]:
+    """
+    Разобрать параметр ?expand=a,b
+
+    Raises:
+        ValueError: имя не из allowed
+    """
+    allowed = set(allowed)
+    names: List[str] = []
+    for name in filter(None, (part.strip() for part in (expand or "").split(","))):
+        if name not in allowed:
+            raise ValueError(
+                f"Неизвестное значение expand: {name}. Доступно: {', '.join(sorted(allowed))}"
+            )
+        if name not in names:
+            names.append(name)
+    return names
@@ -9,12 +9,11 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp, Message
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .config import settings
-from .services.auth import AuthService
+from .request_log import RequestLogWriter
 
 # Создаем папку для логов, если ее нет
 BASE_DIR = Path(__file__).resolve().parent.parent  # Путь к корню проекта
@@ -81,6 +80,16 @@ if settings.debug:
     api_logger.addHandler(console_handler)
 
 
+# Структурированный JSONL журнал запросов (запись в фоновом потоке)
+request_log_writer = RequestLogWriter(
+    LOGS_DIR,
+    prefix="api_requests",
+    batch_size=settings.request_log_batch_size,
+    flush_interval=settings.request_log_flush_interval,
+    max_queue_size=settings.request_log_queue_size
+)
+
+
 # CRUD операции для более понятной маркировки в логах
 CRUD_OPERATIONS = {
     "GET": "🔍 ЧТЕНИЕ",
@@ -105,14 +114,44 @@ METHOD_COLORS = {
 }
 
 
-class APIRequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware для логирования всех API запросов"""
+class APIRequestLoggingMiddleware:
+    """Middleware для логирования всех API запросов (чистый ASGI)"""
     
-    async def dispatch(self, request: Request, call_next) -> Response:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Обработка запроса и логирование"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Получаем время начала запроса
         request_time = datetime.now()
         
+        # Общее состояние запроса: сюда get_current_user кладет principal
+        state = scope.setdefault("state", {})
+        
+        # Код ответа перехватываем из сообщения http.response.start
+        status_code = 500
+        
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        # Выполняем запрос без попыток считать тело запроса
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self._log_request(Request(scope), state, status_code, request_time)
+    
+    def _log_request(self, request: Request, state: Dict[str, Any], status_code: int, request_time: datetime) -> None:
+        """Запись строки лога по завершенному запросу"""
+        # Вычисляем время выполнения запроса
+        response_time = (datetime.now() - request_time).total_seconds() * 1000
+        
         # Получаем информацию о запросе
         method = request.method
         path = request.url.path
@@ -120,24 +159,11 @@ class APIRequestLoggingMiddleware(BaseHTTPMiddleware):
         client_ip = request.client.host if request.client else "неизвестен"
         user_agent = request.headers.get("user-agent", "неизвестен")
         
-        # Выполняем запрос без попыток считать тело запроса
-        response = await call_next(request)
-        
-        # Вычисляем время выполнения запроса
-        response_time = (datetime.now() - request_time).total_seconds() * 1000
-        
-        # Получаем информацию о текущем пользователе из запроса
-        # По JWT токену можно определить пользователя
+        # Пользователь из проверенного токена (сохраняется зависимостью get_current_user)
         user_info = "Анонимный"
-        auth_header = request.headers.get("authorization", "")
-        if auth_header.startswith("Bearer "):
-            try:
-                token = auth_header.split(" ")[1]
-                token_data = AuthService.verify_token(token)
-                if token_data:
-                    user_info = f"{token_data.sub} (ID: {token_data.user_id}, роль: {token_data.role})"
-            except Exception:
-                pass
+        principal = state.get("principal")
+        if principal is not None:
+            user_info = f"{principal.username} (ID: {principal.user_id}, роль: {principal.role.value if principal.role else '-'})"
         
         # Формируем строку лога
         operation = CRUD_OPERATIONS.get(method, method)
@@ -152,7 +178,7 @@ class APIRequestLoggingMiddleware(BaseHTTPMiddleware):
             "operation": operation,
             "method": method,
             "path": path,
-            "status_code": response.status_code,
+            "status_code": status_code,
             "response_time_ms": round(response_time, 2),
             "user": user_info,
             "client_ip": client_ip,
@@ -162,60 +188,22 @@ class APIRequestLoggingMiddleware(BaseHTTPMiddleware):
         }
         
         # Определяем уровень логирования в зависимости от кода ответа
-        if response.status_code >= 500:
+        if status_code >= 500:
             log_level = logging.ERROR
-        elif response.status_code >= 400:
+        elif status_code >= 400:
             log_level = logging.WARNING
         else:
             log_level = logging.INFO
         
         # Создаем сообщение для лога
-        log_message = f"{color_start}{operation} | {method} {path} | {response.status_code} | {round(response_time, 2)}ms | {user_info}{color_reset}"
+        log_message = f"{color_start}{operation} | {method} {path} | {status_code} | {round(response_time, 2)}ms | {user_info}{color_reset}"
         
         # Логируем информацию о запросе
         api_logger.log(log_level, log_message, extra={"api_request": log_info})
         
         # Также сохраняем более подробную информацию в JSON-лог
         self._log_to_json(log_info)
-        
-        return response
     
     def _log_to_json(self, log_info: Dict[str, Any]) -> None:
-        """Логирование в JSON-файл для более удобного анализа"""
-        try:
-            # Получаем дату для организации логов по дням
-            today = datetime.now().strftime("%Y-%m-%d")
-            json_log_file = LOGS_DIR / f"api_requests_{today}.json"
-            
-            # Создаем файл, если его нет
-            if not json_log_file.exists():
-                with open(json_log_file, "w", encoding="utf-8") as f:
-                    json.dump([], f)
-            
-            # Загружаем текущие логи
-            with open(json_log_file, "r", encoding="utf-8") as f:
-                try:
-                    logs = json.load(f)
-                except json.JSONDecodeError:
-                    logs = []
-            
-            # Добавляем новый лог
-            logs.append(log_info)
-            
-            # Сохраняем обновленные логи
-            with open(json_log_file, "w", encoding="utf-8") as f:
-                json.dump(logs, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            api_logger.error(f"Ошибка при записи JSON-лога: {e}")
-
-
-def setup_request_logging(app: ASGIApp) -> None:
-    """Добавление middleware логирования к приложению FastAPI
-    
-    Добавляет APIRequestLoggingMiddleware к приложению FastAPI.
-    Все запросы будут логироваться в файлы:
-    - logs/api_requests.log - общий лог всех запросов
-    - logs/api_requests_YYYY-MM-DD.json - детальный лог запросов по дням
-    """
-    app.add_middleware(APIRequestLoggingMiddleware)
-    api_logger.info("🔄 API Request Logging Middleware активирован")
+        """Логирование в JSONL-журнал для более удобного анализа (без блокировки запроса)"""
+        request_log_writer.write(log_info)
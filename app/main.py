@@ -8,26 +8,27 @@ import logging
 import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from .config import settings
-from .database import init_db, close_db
+from .database import init_db, close_db, write_coordinator, AsyncSessionLocal
 from .schemas import ErrorResponse, HealthCheck
-from .logger import setup_request_logging  # Импорт логгера
-from .security import setup_security  # Импорт компонентов безопасности
-from .security_monitor import security_monitor, start_security_monitor_cleanup  # Импорт монитора безопасности
+from .logger import request_log_writer  # Импорт логгера
+from .middleware import setup_middleware  # Цепочка middleware
+from .security_monitor import start_security_monitor_cleanup  # Импорт монитора безопасности
+from .services.archive import archive_worker  # Фоновая архивация заказов
+from .services.rollups import RollupService  # Агрегаты продаж для отчетов
+from .services.dish_search import DishSearchService  # Полнотекстовый поиск блюд
 from .input_validation import InputSanitizer  # Импорт санитизатора
+from .serialization import FastJSONResponse  # Быстрая сериализация ответов
 
 # Импорт роутеров
 from .routers import (
     auth, users, tables, locations, categories, dishes, 
     orders, order_items, ingredients, 
-    paymentmethod, websocket, kitchen, dashboard
+    paymentmethod, websocket, kitchen, dashboard, archive
 )
 
 # Настройка логгера для ошибок
@@ -63,10 +64,27 @@ async def lifespan(app: FastAPI):
     print("🚀 QRes OS 4 запускается...")
     await init_db()
     print("✅ База данных инициализирована")
+    async with AsyncSessionLocal() as session:
+        if await RollupService.ensure_built(session):
+            print("📊 Агрегаты продаж собраны по существующим заказам")
+        if await DishSearchService.ensure_built(session):
+            print("🔎 Индекс поиска блюд пересобран")
+    await write_coordinator.start()
+    if write_coordinator.enabled:
+        print("✍️ Очередь записи SQLite включена")
     
     # Запускаем фоновую задачу очистки данных мониторинга безопасности
     cleanup_task = asyncio.create_task(start_security_monitor_cleanup())
     print("🔒 Монитор безопасности запущен")
+
+    # Запускаем фоновую архивацию закрытых заказов
+    archive_task = asyncio.create_task(archive_worker())
+    if settings.archive_enabled:
+        print(f"🗄️ Архивация заказов старше {settings.archive_after_days} дн. включена")
+    
+    # Запускаем рассылку WebSocket уведомлений
+    websocket.notifier.start()
+    print("📡 Рассылка WebSocket уведомлений запущена")
     
     yield
     
@@ -78,6 +96,15 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         pass
     print("🔒 Монитор безопасности остановлен")
+    archive_task.cancel()
+    try:
+        await archive_task
+    except asyncio.CancelledError:
+        pass
+    await websocket.notifier.stop()
+    print("📡 Рассылка WebSocket уведомлений остановлена")
+    await asyncio.to_thread(request_log_writer.close)
+    print("📝 Журнал запросов сброшен на диск")
     await close_db()
     print("✅ Соединение с базой данных закрыто")
 
@@ -89,6 +116,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -96,163 +124,12 @@ app = FastAPI(
 start_time = time.time()
 
 
-# CORS Middleware - настроен для разработки фронтенда
 if settings.debug:
     print(f"🚀 Настройка CORS для origins: {settings.cors_origins}")
     print(f"🔧 Debug режим: {settings.debug}")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins,  # Используем настройки из конфига
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],  # ИСПРАВЛЕНО: Добавлен PATCH метод
-    # ИСПРАВЛЕНО: Конкретные заголовки вместо wildcard для безопасности
-    allow_headers=[
-        "Authorization",      # Токены авторизации
-        "Content-Type",       # Тип контента
-        "Accept",            # Accept заголовок
-        "Origin",            # CORS origin
-        "X-Requested-With",  # AJAX запросы
-        "X-CSRF-Token"       # CSRF защита
-    ],
-    # ИСПРАВЛЕНО: Минимальный набор заголовков ответа
-    expose_headers=[
-        "Content-Length",    # Размер контента
-        "X-Total-Count",     # Общее количество (для пагинации)
-        "X-Page-Count"       # Количество страниц
-    ]
-)
-
-app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=settings.allowed_hosts  # Используем конкретные хосты для безопасности
-)
-
-# Подключение middleware логирования API-запросов
-setup_request_logging(app)
-
-# Подключение компонентов безопасности (защита от DDoS-атак)
-setup_security(app)
-
-# Middleware для мониторинга безопасности
-@app.middleware("http")
-async def security_monitoring_middleware(request: Request, call_next):
-    """Мониторинг безопасности запросов"""
-    try:
-        # Записываем запрос в монитор безопасности
-        security_monitor.record_request(request)
-        
-        # Проверяем на подозрительные паттерны в URL
-        url_path = str(request.url.path).lower()
-        if any(pattern in url_path for pattern in ['.env', '.git', 'admin', 'phpmyadmin']):
-            # Логируем подозрительный запрос
-            from .security_logger import security_logger
-            security_logger.log_suspicious_activity(
-                security_monitor.get_client_ip(request),
-                str(request.url),
-                request.method
-            )
-        
-        response = await call_next(request)
-        return response
-        
-    except HTTPException as e:
-        # Если IP заблокирован или превышен лимит запросов
-        raise e
-    except Exception as e:
-        # Логируемunexpected ошибки в мониторе безопасности
-        error_logger.error(f"Security monitoring error: {str(e)}")
-        # Продолжаем обработку запроса
-        response = await call_next(request)
-        return response
-
-# Middleware для ограничения размера запросов
-@app.middleware("http")
-async def request_size_limit_middleware(request: Request, call_next):
-    """Ограничивает размер входящих запросов"""
-    content_length = request.headers.get("content-length")
-    
-    if content_length:
-        content_length = int(content_length)
-        
-        # Проверяем общий размер запроса
-        if content_length > settings.max_request_size:
-            return JSONResponse(
-                status_code=413,
-                content={
-                    "detail": f"Размер запроса превышает лимит {settings.max_request_size // (1024*1024)}MB",
-                    "error_code": "REQUEST_TOO_LARGE"
-                }
-            )
-        
-        # Дополнительная проверка для JSON запросов
-        content_type = request.headers.get("content-type", "")
-        if "application/json" in content_type and content_length > settings.max_json_size:
-            return JSONResponse(
-                status_code=413,
-                content={
-                    "detail": f"Размер JSON запроса превышает лимит {settings.max_json_size // 1024}KB",
-                    "error_code": "JSON_TOO_LARGE"
-                }
-            )
-    
-    return await call_next(request)
-
-# Middleware для базовых заголовков безопасности
-@app.middleware("http")
-async def security_headers_middleware(request: Request, call_next):
-    """Добавляет базовые заголовки безопасности"""
-    response = await call_next(request)
-    
-    # Защита от XSS
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"  
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    
-    # Referrer Policy для приватности
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    
-    # Content Security Policy (CSP)
-    csp = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data: https:; "
-        "font-src 'self'; "
-        "connect-src 'self'; "
-        "frame-ancestors 'none'; "
-        "base-uri 'self'; "
-        "form-action 'self'"
-    )
-    response.headers["Content-Security-Policy"] = csp
-    
-    # Permissions Policy для отключения ненужных APIs
-    permissions = (
-        "geolocation=(), "
-        "microphone=(), "
-        "camera=(), "
-        "payment=(), "
-        "usb=(), "
-        "magnetometer=(), "
-        "accelerometer=(), "
-        "gyroscope=()"
-    )
-    response.headers["Permissions-Policy"] = permissions
-    
-    # HSTS для HTTPS (когда будет включен)
-    if request.url.scheme == "https":
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains; preload"
-    
-    # В разработке показываем, что это dev режим
-    if settings.debug:
-        response.headers["X-Environment"] = "development"
-        response.headers["X-Debug-Mode"] = "enabled"
-    else:
-        # В продакшене скрываем версию сервера
-        if "server" in response.headers:
-            del response.headers["server"]
-    
-    return response
+# Цепочка middleware (безопасность, лимиты, логирование, Host, CORS) - app/middleware.py
+setup_middleware(app)
 
 
 # Обработчики ошибок
@@ -408,7 +285,7 @@ async def debug_cors(request: Request):
                 "Authorization", "Content-Type", "Accept", 
                 "Origin", "X-Requested-With", "X-CSRF-Token"
             ],
-            "expose_headers": ["Content-Length", "X-Total-Count", "X-Page-Count"]
+            "expose_headers": ["Content-Length", "X-Total-Count", "X-Page-Count", "X-Next-Cursor"]
         },
         "environment": settings.environment,
         "debug": settings.debug,
@@ -424,14 +301,17 @@ async def debug_security_stats(request: Request):
         raise HTTPException(status_code=404, detail="Not found")
     
     from .security_monitor import security_monitor
+    from .services.auth import password_hasher, token_cache, principal_cache
     
     stats = security_monitor.get_security_stats()
     
     return {
         "message": "Статистика безопасности",
         "stats": stats,
-        "blocked_ips": list(security_monitor.blocked_ips.keys()) if security_monitor.blocked_ips else [],
-        "suspicious_requests_count": sum(security_monitor.suspicious_requests.values()),
+        "blocked_ips": security_monitor.get_blocked_ips(),
+        "password_hasher": password_hasher.stats(),
+        "token_cache": token_cache.stats(),
+        "principal_cache": principal_cache.stats(),
         "environment": settings.environment,
         "debug": settings.debug,
         "security_note": "⚠️ Этот эндпоинт доступен только в режиме разработки"
@@ -452,6 +332,7 @@ app.include_router(paymentmethod.router, prefix="/payment-methods", tags=["Payme
 app.include_router(kitchen.router, tags=["Kitchen"])
 app.include_router(websocket.router, prefix="/ws", tags=["WebSocket"])
 app.include_router(dashboard.router, tags=["Dashboard"])
+app.include_router(archive.router)
 
 
 if __name__ == "__main__":
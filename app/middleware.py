@@ -0,0 +1,293 @@
+"""
+QRes OS 4 - Middleware Pipeline
+Цепочка middleware приложения в виде чистых ASGI-классов
+"""
+import logging
+from typing import List, Sequence, Tuple
+
+from fastapi import HTTPException
+from starlette.datastructures import URL, Headers, MutableHeaders
+from starlette.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, RedirectResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .logger import APIRequestLoggingMiddleware, api_logger
+from .request_screening import screen_request, ALERT
+from .schemas import ErrorResponse
+from .security import RateLimiterMiddleware, SuspiciousRequestFilterMiddleware
+from .security_logger import security_logger
+from .security_monitor import security_monitor
+
+
+error_logger = logging.getLogger("qres_errors")
+
+
+class SecurityHeadersMiddleware:
+    """Добавляет базовые заголовки безопасности ко всем HTTP ответам"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+        headers = {
+            # Защита от XSS
+            "x-content-type-options": "nosniff",
+            "x-frame-options": "DENY",
+            "x-xss-protection": "1; mode=block",
+            # Referrer Policy для приватности
+            "referrer-policy": "strict-origin-when-cross-origin",
+            # Content Security Policy (CSP)
+            "content-security-policy": (
+                "default-src 'self'; "
+                "script-src 'self' 'unsafe-inline'; "
+                "style-src 'self' 'unsafe-inline'; "
+                "img-src 'self' data: https:; "
+                "font-src 'self'; "
+                "connect-src 'self'; "
+                "frame-ancestors 'none'; "
+                "base-uri 'self'; "
+                "form-action 'self'"
+            ),
+            # Permissions Policy для отключения ненужных APIs
+            "permissions-policy": (
+                "geolocation=(), "
+                "microphone=(), "
+                "camera=(), "
+                "payment=(), "
+                "usb=(), "
+                "magnetometer=(), "
+                "accelerometer=(), "
+                "gyroscope=()"
+            ),
+        }
+        # В разработке показываем, что это dev режим
+        if settings.debug:
+            headers["x-environment"] = "development"
+            headers["x-debug-mode"] = "enabled"
+
+        # Заголовки собираются один раз: на запрос - только замена в списке
+        self._headers: List[Tuple[bytes, bytes]] = [
+            (name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()
+        ]
+        self._hsts = (b"strict-transport-security", b"max-age=31536000; includeSubDomains; preload")
+        # В продакшене скрываем версию сервера
+        self._replaced = {name for name, _ in self._headers} | {self._hsts[0]}
+        if not settings.debug:
+            self._replaced.add(b"server")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # HSTS для HTTPS (когда будет включен)
+        extra = self._headers + [self._hsts] if scope.get("scheme") == "https" else self._headers
+        replaced = self._replaced
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    header for header in message.get("headers", ()) if header[0].lower() not in replaced
+                ] + extra
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class RequestSizeLimitMiddleware:
+    """Ограничивает размер входящих запросов по заголовку Content-Length"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_length = headers.get("content-length")
+
+        if content_length:
+            try:
+                content_length = int(content_length)
+            except ValueError:
+                response = JSONResponse(
+                    status_code=400,
+                    content={"detail": "Некорректный заголовок Content-Length", "error_code": "INVALID_CONTENT_LENGTH"}
+                )
+                await response(scope, receive, send)
+                return
+
+            # Проверяем общий размер запроса
+            if content_length > settings.max_request_size:
+                response = JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": f"Размер запроса превышает лимит {settings.max_request_size // (1024*1024)}MB",
+                        "error_code": "REQUEST_TOO_LARGE"
+                    }
+                )
+                await response(scope, receive, send)
+                return
+
+            # Дополнительная проверка для JSON запросов
+            content_type = headers.get("content-type", "")
+            if "application/json" in content_type and content_length > settings.max_json_size:
+                response = JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": f"Размер JSON запроса превышает лимит {settings.max_json_size // 1024}KB",
+                        "error_code": "JSON_TOO_LARGE"
+                    }
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+
+class SecurityMonitoringMiddleware:
+    """Мониторинг безопасности запросов (блокировки IP и подозрительные паттерны)"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        try:
+            # Записываем запрос в монитор безопасности
+            security_monitor.record_request(request)
+
+            # Проверяем на подозрительные паттерны в URL (правила alert.*, тот же проход, что и у монитора)
+            if screen_request(request).has(ALERT):
+                security_logger.log_suspicious_activity(
+                    security_monitor.get_client_ip(request),
+                    str(request.url),
+                    request.method
+                )
+        except HTTPException as e:
+            # IP заблокирован
+            response = JSONResponse(
+                status_code=e.status_code,
+                content=ErrorResponse(
+                    message=str(e.detail),
+                    error_code=f"HTTP_{e.status_code}"
+                ).model_dump()
+            )
+            await response(scope, receive, send)
+            return
+        except Exception as e:
+            # Ошибка мониторинга не должна прерывать обработку запроса
+            error_logger.error(f"Security monitoring error: {str(e)}")
+
+        await self.app(scope, receive, send)
+
+
+class AllowedHostsMiddleware:
+    """
+    Проверка заголовка Host (аналог TrustedHostMiddleware)
+
+    Разрешенные хосты хранятся в множестве, шаблоны вида "*.example.com" -
+    в кортеже суффиксов: проверка одного запроса не зависит от длины списка.
+    """
+
+    def __init__(self, app: ASGIApp, allowed_hosts: Sequence[str], www_redirect: bool = True):
+        for pattern in allowed_hosts:
+            assert "*" not in pattern[1:], "Шаблон домена должен иметь вид '*.example.com'"
+            if pattern.startswith("*") and pattern != "*":
+                assert pattern.startswith("*."), "Шаблон домена должен иметь вид '*.example.com'"
+
+        self.app = app
+        self.allow_any = "*" in allowed_hosts
+        self.hosts = frozenset(pattern for pattern in allowed_hosts if not pattern.startswith("*"))
+        self.suffixes = tuple(pattern[1:] for pattern in allowed_hosts if pattern.startswith("*."))
+        self.www_redirect = www_redirect
+
+    def is_allowed(self, host: str) -> bool:
+        return host in self.hosts or (bool(self.suffixes) and host.endswith(self.suffixes))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.allow_any or scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        host = Headers(scope=scope).get("host", "").split(":")[0]
+        if self.is_allowed(host):
+            await self.app(scope, receive, send)
+            return
+
+        if self.www_redirect and self.is_allowed("www." + host):
+            url = URL(scope=scope)
+            response = RedirectResponse(url=str(url.replace(netloc="www." + url.netloc)))
+        else:
+            response = PlainTextResponse("Invalid host header", status_code=400)
+        await response(scope, receive, send)
+
+
+class CORSMiddleware(StarletteCORSMiddleware):
+    """CORS middleware Starlette с проверкой origin, методов и заголовков по множествам"""
+
+    def __init__(self, app: ASGIApp, **options):
+        super().__init__(app, **options)
+        self.allow_origins = frozenset(self.allow_origins)
+        self.allow_methods = frozenset(self.allow_methods)
+        self.allow_headers = frozenset(self.allow_headers)
+
+
+# Порядок обработки запроса: первый в списке - внешний
+MIDDLEWARE_PIPELINE = [
+    (SecurityHeadersMiddleware, {}),
+    (RequestSizeLimitMiddleware, {}),
+    (SecurityMonitoringMiddleware, {}),
+    # Защита от DDoS-атак (бюджеты по классам маршрутов - app/rate_limit.py)
+    (RateLimiterMiddleware, {}),
+    (SuspiciousRequestFilterMiddleware, {}),
+    (APIRequestLoggingMiddleware, {}),
+    (AllowedHostsMiddleware, {
+        "allowed_hosts": settings.allowed_hosts  # Используем конкретные хосты для безопасности
+    }),
+    # CORS - настроен для разработки фронтенда
+    (CORSMiddleware, {
+        "allow_origins": settings.cors_origins,
+        "allow_credentials": True,
+        "allow_methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        # Конкретные заголовки вместо wildcard для безопасности
+        "allow_headers": [
+            "Authorization",      # Токены авторизации
+            "Content-Type",       # Тип контента
+            "Accept",            # Accept заголовок
+            "Origin",            # CORS origin
+            "X-Requested-With",  # AJAX запросы
+            "X-CSRF-Token"       # CSRF защита
+        ],
+        # Минимальный набор заголовков ответа
+        "expose_headers": [
+            "Content-Length",    # Размер контента
+            "X-Total-Count",     # Общее количество (для пагинации)
+            "X-Page-Count",      # Количество страниц
+            "X-Next-Cursor"      # Курсор следующей страницы (keyset-пагинация)
+        ]
+    }),
+]
+
+
+def setup_middleware(app: ASGIApp) -> None:
+    """
+    Подключение всей цепочки middleware к приложению
+
+    Все middleware - чистые ASGI-классы: ответ не буферизуется и не
+    оборачивается в дополнительные задачи и потоки, поэтому потоковые
+    ответы проходят цепочку без изменений.
+    """
+    # add_middleware ставит middleware снаружи уже добавленных
+    for middleware_class, options in reversed(MIDDLEWARE_PIPELINE):
+        app.add_middleware(middleware_class, **options)
+    api_logger.info("🔄 Цепочка middleware подключена: " + " → ".join(
+        middleware_class.__name__ for middleware_class, _ in MIDDLEWARE_PIPELINE
+    ))
@@ -9,11 +9,15 @@ from .location import Location
 from .table import Table
 from .category import Category
 from .dish import Dish
+from .dish_search import dish_search
 from .dish_variation import DishVariation
 from .ingredient import Ingredient
 from .paymentmethod import PaymentMethod
 from .order import Order, OrderStatus, PaymentStatus, OrderType
 from .order_item import OrderItem, OrderItemStatus
+from .sync import SyncCounter, OrderItemDeletion
+from .archive import OrderArchive, OrderItemArchive
+from .rollup import OrderRollup, OrderItemRollup
 
 # Экспортируем все модели
 __all__ = [
@@ -23,11 +27,18 @@ __all__ = [
     "Table",
     "Category",
     "Dish",
+    "dish_search",
     "DishVariation",
     "Ingredient",
     "PaymentMethod",
     "Order",
     "OrderItem",
+    "SyncCounter",
+    "OrderItemDeletion",
+    "OrderArchive",
+    "OrderItemArchive",
+    "OrderRollup",
+    "OrderItemRollup",
     
     # Enums
     "UserRole",
@@ -0,0 +1,183 @@
+"""
+QRes OS 4 - Archive Models
+Архив закрытых заказов и их позиций (холодное хранение истории)
+"""
+from sqlalchemy import String, Integer, Float, ForeignKey, Text, DateTime, Enum as SQLEnum, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
+from typing import Optional, List, TYPE_CHECKING
+from decimal import Decimal
+from datetime import datetime
+
+from ..database import Base
+from .order import OrderStatus, PaymentStatus, OrderType
+from .order_item import OrderItemStatus, KitchenDepartment
+
+if TYPE_CHECKING:
+    from .table import Table
+    from .user import User
+    from .dish import Dish
+    from .paymentmethod import PaymentMethod
+
+
+class OrderArchive(Base):
+    """
+    Архивный заказ
+
+    Колонки повторяют orders (id сохраняется), поэтому перенос - это
+    INSERT ... SELECT по общим колонкам, а ответы API строятся теми же
+    схемами, что и для обычных заказов.
+    """
+
+    __tablename__ = "orders_archive"
+
+    # Индексы под историю и отчеты за период
+    __table_args__ = (
+        Index("ix_orders_archive_created_at", "created_at"),
+        Index("ix_orders_archive_waiter_id_created_at", "waiter_id", "created_at"),
+        Index("ix_orders_archive_table_id", "table_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    total_price: Mapped[Decimal] = mapped_column(Float(precision=2), default=0.0, nullable=False)
+
+    # Статусы
+    status: Mapped[OrderStatus] = mapped_column(SQLEnum(OrderStatus), nullable=False)
+    payment_status: Mapped[PaymentStatus] = mapped_column(SQLEnum(PaymentStatus), nullable=False)
+    order_type: Mapped[OrderType] = mapped_column(SQLEnum(OrderType), nullable=False)
+
+    # Связи
+    table_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("tables.id"), nullable=True)
+    waiter_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    payment_method_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("payment_methods.id"), nullable=True)
+
+    # Поля для доставки
+    customer_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    customer_phone: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    delivery_address: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    delivery_notes: Mapped[Optional[str]] = mapped_column(String(300), nullable=True)
+
+    # Временные метки
+    served_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    cancelled_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    time_to_serve: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # минуты
+
+    # Переносятся из orders как есть
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+
+    # Комментарии
+    notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    kitchen_notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Relationships (только чтение, обратных связей у справочников нет)
+    table: Mapped[Optional["Table"]] = relationship("Table", foreign_keys=[table_id])
+    waiter: Mapped["User"] = relationship("User", foreign_keys=[waiter_id])
+    payment_method: Mapped[Optional["PaymentMethod"]] = relationship(
+        "PaymentMethod", foreign_keys=[payment_method_id]
+    )
+    items: Mapped[List["OrderItemArchive"]] = relationship(
+        "OrderItemArchive",
+        back_populates="order",
+        order_by="OrderItemArchive.id"
+    )
+
+    def __repr__(self) -> str:
+        return f"<OrderArchive(id={self.id}, status='{self.status}')>"
+
+
+class OrderItemArchive(Base):
+    """Архивная позиция заказа (колонки повторяют order_items)"""
+
+    __tablename__ = "order_items_archive"
+
+    __table_args__ = (
+        Index("ix_order_items_archive_order_id", "order_id"),
+        Index("ix_order_items_archive_department_created_at", "department", "created_at"),
+        Index("ix_order_items_archive_dish_id", "dish_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    price: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False)
+    total: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False)
+
+    status: Mapped[OrderItemStatus] = mapped_column(SQLEnum(OrderItemStatus), nullable=False)
+    department: Mapped[KitchenDepartment] = mapped_column(SQLEnum(KitchenDepartment), nullable=False)
+
+    # Временные метки
+    sent_to_kitchen_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    preparation_started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    ready_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    served_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Время приготовления (минуты)
+    estimated_preparation_time: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    actual_preparation_time: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+    # Переносятся из order_items как есть
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+
+    # Связи
+    order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders_archive.id"), nullable=False)
+    dish_id: Mapped[int] = mapped_column(Integer, ForeignKey("dishes.id"), nullable=False)
+    dish_variation_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("dish_variations.id"), nullable=True)
+
+    # Комментарии
+    comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Relationships
+    order: Mapped["OrderArchive"] = relationship("OrderArchive", back_populates="items")
+    dish: Mapped["Dish"] = relationship("Dish")
+
+    def __repr__(self) -> str:
+        return f"<OrderItemArchive(id={self.id}, order_id={self.order_id}, dish_id={self.dish_id})>"
+
+    # Те же свойства, что у OrderItem (ответ строится схемой OrderItemWithDish)
+    @property
+    def dish_name(self) -> str:
+        """Название блюда"""
+        return self.dish.name if self.dish else "Неизвестное блюдо"
+
+    @property
+    def dish_image_url(self) -> Optional[str]:
+        """URL изображения блюда"""
+        return self.dish.main_image_url if self.dish else None
+
+    @property
+    def dish_cooking_time(self) -> Optional[int]:
+        """Время приготовления блюда"""
+        return self.dish.cooking_time if self.dish else None
+
+    @property
+    def dish_department(self) -> KitchenDepartment:
+        """Кухонный цех блюда"""
+        return self.dish.department if self.dish else KitchenDepartment.HOT_KITCHEN
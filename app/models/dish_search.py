@@ -0,0 +1,39 @@
+"""
+QRes OS 4 - Dish Search Index
+Полнотекстовый индекс блюд SQLite FTS5 (название, описание, ингредиенты, код)
+"""
+from sqlalchemy import DDL, event
+from sqlalchemy.sql import column, table
+
+from ..database import Base
+
+
+# rowid = dishes.id; тексты хранятся нормализованными (см. services/dish_search.py)
+dish_search = table(
+    "dish_search",
+    column("rowid"),
+    column("name"),
+    column("description"),
+    column("ingredients"),
+    column("code"),
+    column("rank")
+)
+
+# Виртуальную таблицу create_all не создает: DDL выполняется после него
+# (только для SQLite, на других СУБД поиск идет через ILIKE)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS dish_search USING fts5("
+        "name, description, ingredients, code, tokenize = 'unicode61 remove_diacritics 2')"
+    ).execute_if(dialect="sqlite")
+)
+# Ранжирование: совпадение в названии весит больше, чем в коде, описании и ингредиентах
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(
+        "INSERT INTO dish_search(dish_search, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0, 5.0)')"
+    ).execute_if(dialect="sqlite")
+)
@@ -2,8 +2,8 @@
 QRes OS 4 - Order Models
 Модели заказа и позиций заказа
 """
-from sqlalchemy import String, Boolean, Integer, Float, ForeignKey, Text, DateTime, Enum as SQLEnum, func
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Boolean, Integer, Float, ForeignKey, Text, DateTime, Enum as SQLEnum, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from sqlalchemy.sql import func
 from sqlalchemy import inspect
 from typing import Optional, List, TYPE_CHECKING
@@ -32,6 +32,13 @@ class OrderStatus(str, enum.Enum):
     CANCELLED = "CANCELLED"
 
 
+# Заказы в этих статусах закрыты (is_active = False)
+CLOSED_ORDER_STATUSES = (OrderStatus.COMPLETED, OrderStatus.CANCELLED)
+
+# Заказы в работе у кухни и официанта (in_work = True) - первые в списке заказов
+IN_WORK_ORDER_STATUSES = (OrderStatus.PENDING, OrderStatus.IN_PROGRESS, OrderStatus.READY)
+
+
 class PaymentStatus(str, enum.Enum):
     """Статусы оплаты"""
     UNPAID = "UNPAID"
@@ -51,21 +58,39 @@ class Order(Base):
     
     __tablename__ = "orders"
     
+    # Индексы под основные запросы: активные заказы столика, списки и статистика
+    __table_args__ = (
+        Index("ix_orders_table_id_status", "table_id", "status"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        Index("ix_orders_waiter_id_created_at", "waiter_id", "created_at"),
+        Index("ix_orders_created_at", "created_at"),
+        # Список заказов: заказы в работе первыми, затем по времени создания
+        Index("ix_orders_in_work_created_at", "in_work", "created_at"),
+        # Открытые заказы столика (частичный: закрытых заказов намного больше)
+        Index("ix_orders_active_table_id", "table_id", sqlite_where=text("is_active = 1")),
+    )
+    
     # Основные поля
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    total_price: Mapped[Decimal] = mapped_column(Float(precision=2), default=0.0, nullable=False)
+    total_price: Mapped[Decimal] = mapped_column(Float(precision=2), default=0.0, nullable=False, active_history=True)
     
     # Статусы
     status: Mapped[OrderStatus] = mapped_column(
         SQLEnum(OrderStatus), 
         default=OrderStatus.PENDING, 
-        nullable=False
+        nullable=False,
+        active_history=True  # Старое значение нужно для агрегатов продаж
     )
     payment_status: Mapped[PaymentStatus] = mapped_column(
         SQLEnum(PaymentStatus), 
         default=PaymentStatus.UNPAID, 
-        nullable=False
+        nullable=False,
+        active_history=True
     )
+    # Заказ открыт (статус не COMPLETED/CANCELLED), ведется при смене статуса
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    # Заказ в работе (PENDING/IN_PROGRESS/READY) - ключ сортировки списка заказов
+    in_work: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     order_type: Mapped[OrderType] = mapped_column(
         SQLEnum(OrderType), 
         default=OrderType.DINE_IN, 
@@ -81,12 +106,14 @@ class Order(Base):
     waiter_id: Mapped[int] = mapped_column(
         Integer, 
         ForeignKey("users.id"), 
-        nullable=False
+        nullable=False,
+        active_history=True
     )
     payment_method_id: Mapped[Optional[int]] = mapped_column(
         Integer, 
         ForeignKey("payment_methods.id"), 
-        nullable=True  # Заказ можно создать без способа оплаты
+        nullable=True,  # Заказ можно создать без способа оплаты
+        active_history=True
     )
     
     # Поля для доставки
@@ -99,7 +126,7 @@ class Order(Base):
     served_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     cancelled_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
-    time_to_serve: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # минуты
+    time_to_serve: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, active_history=True)  # минуты
     
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -138,6 +165,13 @@ class Order(Base):
         cascade="all, delete-orphan"
     )
     
+    @validates("status")
+    def _sync_status_flags(self, key: str, value: OrderStatus) -> OrderStatus:
+        """Любая смена статуса через ORM обновляет is_active и in_work"""
+        self.is_active = value not in CLOSED_ORDER_STATUSES
+        self.in_work = value in IN_WORK_ORDER_STATUSES
+        return value
+    
     def __repr__(self) -> str:
         # Безопасное получение атрибутов для объектов, не привязанных к сессии
         try:
@@ -2,7 +2,7 @@
 QRes OS 4 - OrderItem Model
 Модель позиции заказа (отдельный файл согласно ТЗ)
 """
-from sqlalchemy import String, Boolean, Integer, Float, ForeignKey, Text, DateTime, Enum as SQLEnum
+from sqlalchemy import String, Boolean, Integer, Float, ForeignKey, Text, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from sqlalchemy import inspect
@@ -44,11 +44,22 @@ class OrderItem(Base):
     
     __tablename__ = "order_items"
     
+    # Индексы под основные запросы: доска цеха, все блюда кухни, позиции заказа
+    __table_args__ = (
+        Index("ix_order_items_department_status_created_at", "department", "status", "created_at"),
+        Index("ix_order_items_status_created_at", "status", "created_at"),
+        # Поданные позиции за последние N минут на доске кухни
+        Index("ix_order_items_status_updated_at", "status", "updated_at"),
+        Index("ix_order_items_order_id_status", "order_id", "status"),
+        # Изменения доски кухни после курсора клиента
+        Index("ix_order_items_change_seq", "change_seq"),
+    )
+    
     # Основные поля
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, active_history=True)
     price: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False)  # цена на момент заказа
-    total: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False)  # quantity * price
+    total: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False, active_history=True)  # quantity * price
     
     # Статус
     status: Mapped[OrderItemStatus] = mapped_column(
@@ -60,7 +71,8 @@ class OrderItem(Base):
     # Кухонный цех
     department: Mapped[KitchenDepartment] = mapped_column(
         SQLEnum(KitchenDepartment), 
-        nullable=False
+        nullable=False,
+        active_history=True  # Старое значение нужно для агрегатов продаж
     )
     
     # Временные метки
@@ -95,7 +107,8 @@ class OrderItem(Base):
     dish_id: Mapped[int] = mapped_column(
         Integer, 
         ForeignKey("dishes.id"), 
-        nullable=False
+        nullable=False,
+        active_history=True
     )
     dish_variation_id: Mapped[Optional[int]] = mapped_column(
         Integer, 
@@ -103,6 +116,9 @@ class OrderItem(Base):
         nullable=True
     )
     
+    # Номер последнего изменения (счетчик "order_items" в sync_counters)
+    change_seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    
     # Комментарии
     comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
@@ -147,7 +163,7 @@ class OrderItem(Base):
     def dish_image_url(self) -> Optional[str]:
         """URL изображения блюда"""
         try:
-            return self.dish.image_url if self.dish else None
+            return self.dish.main_image_url if self.dish else None
         except Exception:
             return None
     
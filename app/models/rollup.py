@@ -0,0 +1,111 @@
+"""
+QRes OS 4 - Rollup Models
+Почасовые агрегаты продаж для отчетов (обновляются вместе с заказами)
+"""
+from sqlalchemy import String, Integer, Float, DateTime, Enum as SQLEnum, UniqueConstraint, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from decimal import Decimal
+from datetime import datetime
+
+from ..database import Base
+from .order_item import KitchenDepartment
+
+
+class OrderRollup(Base):
+    """
+    Заказы за час (по дате создания заказа) в разрезе официанта и способа оплаты
+
+    Строка хранит вклад всех заказов ключа: при изменении заказа из нее
+    вычитается старое состояние и прибавляется новое. Заказы без способа
+    оплаты учитываются с payment_method_id = 0.
+    """
+
+    __tablename__ = "order_rollups"
+
+    __table_args__ = (
+        UniqueConstraint("day", "hour", "waiter_id", "payment_method_id", name="uq_order_rollups_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    # Ключ
+    day: Mapped[str] = mapped_column(String(10), nullable=False)  # YYYY-MM-DD (московское время)
+    hour: Mapped[int] = mapped_column(Integer, nullable=False)
+    waiter_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    payment_method_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Счетчики по статусам
+    orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pending_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    in_progress_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ready_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    served_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    dining_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cancelled_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Оплата
+    paid_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False, default=0.0)
+
+    # Время подачи (для среднего: total / count)
+    time_to_serve_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    time_to_serve_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Стандартные временные метки
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours'),  # UTC + 3 часа для Москвы
+        onupdate=func.datetime('now', '+3 hours')
+    )
+
+    def __repr__(self) -> str:
+        return f"<OrderRollup(day='{self.day}', hour={self.hour}, waiter_id={self.waiter_id}, orders={self.orders})>"
+
+
+class OrderItemRollup(Base):
+    """Позиции заказов за час (по дате создания позиции) в разрезе блюда и цеха"""
+
+    __tablename__ = "order_item_rollups"
+
+    __table_args__ = (
+        UniqueConstraint("day", "hour", "dish_id", "department", name="uq_order_item_rollups_key"),
+        # Продажи блюда за все время / за период
+        Index("ix_order_item_rollups_dish_id_day", "dish_id", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    # Ключ
+    day: Mapped[str] = mapped_column(String(10), nullable=False)  # YYYY-MM-DD (московское время)
+    hour: Mapped[int] = mapped_column(Integer, nullable=False)
+    dish_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    department: Mapped[KitchenDepartment] = mapped_column(SQLEnum(KitchenDepartment), nullable=False)
+
+    # Счетчики
+    items: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[Decimal] = mapped_column(Float(precision=2), nullable=False, default=0.0)
+
+    # Стандартные временные метки
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours'),  # UTC + 3 часа для Москвы
+        onupdate=func.datetime('now', '+3 hours')
+    )
+
+    def __repr__(self) -> str:
+        return f"<OrderItemRollup(day='{self.day}', hour={self.hour}, dish_id={self.dish_id}, quantity={self.quantity})>"
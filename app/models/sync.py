@@ -0,0 +1,68 @@
+"""
+QRes OS 4 - Sync Models
+Счетчики изменений и журнал удалений для инкрементальной синхронизации клиентов
+"""
+from sqlalchemy import String, Integer, DateTime, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from datetime import datetime
+
+from ..database import Base
+from .order_item import KitchenDepartment
+
+
+class SyncCounter(Base):
+    """
+    Монотонный счетчик изменений (одна строка на поток изменений)
+
+    Увеличивается в той же транзакции, что и изменение данных, поэтому
+    порядок значений совпадает с порядком коммитов.
+    """
+
+    __tablename__ = "sync_counters"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # Стандартные временные метки
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours'),  # UTC + 3 часа для Москвы
+        onupdate=func.datetime('now', '+3 hours')
+    )
+
+    def __repr__(self) -> str:
+        return f"<SyncCounter(name='{self.name}', value={self.value})>"
+
+
+class OrderItemDeletion(Base):
+    """Удаленная позиция заказа (чтобы клиенты доски кухни убрали ее у себя)"""
+
+    __tablename__ = "order_item_deletions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    order_item_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    department: Mapped[KitchenDepartment] = mapped_column(SQLEnum(KitchenDepartment), nullable=False)
+    change_seq: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+
+    # Стандартные временные метки
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours')  # UTC + 3 часа для Москвы
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.datetime('now', '+3 hours'),  # UTC + 3 часа для Москвы
+        onupdate=func.datetime('now', '+3 hours')
+    )
+
+    def __repr__(self) -> str:
+        return f"<OrderItemDeletion(order_item_id={self.order_item_id}, change_seq={self.change_seq})>"
@@ -0,0 +1,163 @@
+"""
+QRes OS 4 - Keyset Pagination
+Курсоры постраничной выборки по ключу сортировки (без OFFSET)
+"""
+import base64
+import enum
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    """
+    Непрозрачный курсор для клиента (base64url от JSON)
+
+    Значения datetime сохраняются в ISO-формате, разбирать их обратно -
+    забота вызывающего кода (он знает, какие поля - даты).
+    """
+    raw = json.dumps(data, default=_json_default, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Разобрать курсор из encode_cursor
+
+    Raises:
+        ValueError: курсор поврежден или создан не этим сервером
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise ValueError("Некорректный курсор")
+    if not isinstance(data, dict):
+        raise ValueError("Некорректный курсор")
+    return data
+
+
+def parse_key_datetime(value: Any) -> datetime:
+    """Дата из ключа курсора"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("Некорректный курсор")
+
+
+def datetime_key(value: datetime) -> Any:
+    """
+    Дата из ключа для сравнения с колонкой DateTime в SQLite
+
+    Даты, записанные server_default datetime('now', ...), хранятся строкой
+    без микросекунд ("2026-10-17 12:00:00"), а параметр datetime SQLAlchemy
+    передает с микросекундами ("...12:00:00.000000"). Такие строки не равны,
+    и строки с той же секундой на границе страницы терялись бы, поэтому
+    дата без микросекунд передается в формате хранения.
+    """
+    if value.microsecond == 0 and value.tzinfo is None:
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return value
+
+
+def keyset_after(
+    columns: Sequence[ColumnElement],
+    values: Sequence[Any],
+    descending: bool = False
+) -> ColumnElement:
+    """
+    Условие "строка после ключа" для сортировки по columns
+
+    Для (created_at, id) по возрастанию:
+    created_at > :c OR (created_at = :c AND id > :i). Последняя колонка
+    должна быть уникальной (обычно id), иначе строки с одинаковым ключом
+    на границе страницы потеряются. Даты передаются как datetime: формат
+    хранения учитывается здесь (см. _key_bounds).
+    """
+    conditions = []
+    for index, column in enumerate(columns):
+        low, high = _key_bounds(values[index])
+        compare = column < low if descending else column > high
+        equal = [_key_equal(columns[prev], values[prev]) for prev in range(index)]
+        conditions.append(and_(*equal, compare) if equal else compare)
+    return or_(*conditions)
+
+
+def _key_bounds(value: Any) -> Tuple[Any, Any]:
+    """
+    Младшая и старшая запись значения ключа в SQLite
+
+    Дата без микросекунд может лежать в двух видах: "12:00:00" (server_default)
+    и "12:00:00.000000" (записана через ORM). Строго "раньше" - меньше
+    короткой записи, строго "позже" - больше длинной.
+    """
+    if isinstance(value, datetime):
+        return datetime_key(value), value
+    return value, value
+
+
+def _key_equal(column: ColumnElement, value: Any) -> ColumnElement:
+    low, high = _key_bounds(value)
+    return column == value if low is high else column.in_([low, high])
+
+
+class CountMode(str, enum.Enum):
+    """Как считать total в ответе списка"""
+    EXACT = "exact"          # COUNT(*) с фильтрами
+    CACHED = "cached"        # точный COUNT, но из кэша (может отставать на TTL)
+    ESTIMATED = "estimated"  # оценка без перебора строк
+    NONE = "none"            # не считать (total = null)
+
+
+def read_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Курсор списка: пустая строка - первая страница
+
+    Raises:
+        ValueError: курсор поврежден
+    """
+    data = decode_cursor(cursor) if cursor else {}
+    if "key" in data:
+        _parse_key(data["key"])
+    return data
+
+
+def keyset_page(query, model, cursor_data: Dict[str, Any], limit: int, descending: bool = False):
+    """
+    Страница по ключу (created_at, id): условие "после курсора", сортировка, limit + 1
+
+    Лишняя строка показывает, что есть следующая страница (см. keyset_result).
+
+    Raises:
+        ValueError: курсор поврежден
+    """
+    columns = (model.created_at, model.id)
+    if "key" in cursor_data:
+        created_at, row_id = _parse_key(cursor_data["key"])
+        query = query.where(keyset_after(columns, (created_at, row_id), descending))
+    order = [column.desc() for column in columns] if descending else list(columns)
+    return query.order_by(*order).limit(limit + 1)
+
+
+def keyset_result(rows: List[Any], limit: int, **extra: Any) -> Tuple[List[Any], Optional[str]]:
+    """Строки страницы и курсор следующей (None - страница последняя)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor({"key": [last.created_at, last.id], **extra})
+
+
+def _parse_key(key: Any) -> Tuple[datetime, int]:
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], int):
+        raise ValueError("Некорректный курсор")
+    return parse_key_datetime(key[0]), key[1]
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Значение {value!r} нельзя сохранить в курсоре")
@@ -0,0 +1,227 @@
+"""
+QRes OS 4 - Rate Limiter
+Единый ограничитель частоты запросов с O(1) счетчиками на ключ
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Бюджет запросов для класса маршрутов (или класса событий)"""
+    name: str
+    limit: int  # Максимум событий в окне
+    window: float  # Окно в секундах
+    block_duration: float  # Блокировка IP при превышении (сек)
+
+
+@dataclass(frozen=True)
+class RateDecision:
+    """Результат проверки лимита"""
+    allowed: bool
+    retry_after: int = 0
+    count: int = 0
+
+
+class _Window:
+    """
+    Скользящее окно из двух фиксированных интервалов
+
+    Оценка числа событий за последние window секунд:
+    previous * (доля предыдущего интервала, попавшая в окно) + current.
+    Память и время на событие - O(1), без хранения отметок времени.
+    """
+    __slots__ = ("started", "current", "previous")
+
+    def __init__(self, now: float):
+        self.started = now
+        self.current = 0
+        self.previous = 0
+
+    def hit(self, now: float, window: float) -> float:
+        elapsed = now - self.started
+        if elapsed >= window:
+            # Сдвигаем интервалы; если простаивали дольше двух окон - с нуля
+            self.previous = self.current if elapsed < 2 * window else 0
+            self.current = 0
+            self.started += window * int(elapsed // window)
+            elapsed = now - self.started
+        self.current += 1
+        return self.previous * (1.0 - elapsed / window) + self.current
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов для всего приложения
+
+    Счетчики хранятся по ключу (IP, бюджет) в LRU-словаре ограниченного
+    размера: ключи простаивающих клиентов (телефоны гостей, ушедших из
+    Wi-Fi) вытесняются, поэтому память не растет с числом IP.
+    Блокировки IP хранятся отдельно, также с ограничением размера.
+
+    Бюджеты задаются по классам маршрутов (вход, публичное меню, остальной
+    API) и по классам событий (неудачные входы, подозрительные запросы).
+    """
+
+    def __init__(self, budgets: List[Budget], route_classes: List[Tuple[str, str]],
+                 default_budget: str, max_keys: int):
+        self.budgets: Dict[str, Budget] = {budget.name: budget for budget in budgets}
+        # (префикс пути, бюджет) - первый совпавший префикс определяет класс
+        self.route_classes = route_classes
+        self.default_budget = default_budget
+        self.max_keys = max(1, max_keys)
+
+        self._windows: "OrderedDict[Tuple[str, str], _Window]" = OrderedDict()
+        self._blocked: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+        # Метрики
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def route_class(self, path: str) -> str:
+        """Бюджет для пути запроса"""
+        for prefix, budget in self.route_classes:
+            if path.startswith(prefix):
+                return budget
+        return self.default_budget
+
+    def hit(self, key: str, budget_name: str, now: Optional[float] = None) -> RateDecision:
+        """
+        Учесть событие для ключа в бюджете
+
+        При превышении бюджета ключ (IP) блокируется на block_duration бюджета.
+        """
+        now = time.monotonic() if now is None else now
+
+        retry_after = self.blocked_for(key, now)
+        if retry_after:
+            self.limited += 1
+            return RateDecision(allowed=False, retry_after=retry_after)
+
+        budget = self.budgets[budget_name]
+        window_key = (key, budget_name)
+        window = self._windows.get(window_key)
+        if window is None:
+            window = _Window(now)
+            self._windows[window_key] = window
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._windows.move_to_end(window_key)
+
+        count = window.hit(now, budget.window)
+        if count > budget.limit:
+            del self._windows[window_key]
+            self.block(key, budget.block_duration, f"Превышен бюджет '{budget.name}'", now)
+            self.limited += 1
+            return RateDecision(allowed=False, retry_after=int(budget.block_duration), count=int(count))
+
+        self.allowed += 1
+        return RateDecision(allowed=True, count=int(count))
+
+    def block(self, key: str, duration: float, reason: str, now: Optional[float] = None) -> None:
+        """Заблокировать ключ (IP) на duration секунд"""
+        now = time.monotonic() if now is None else now
+        self._blocked[key] = (now + duration, reason)
+        self._blocked.move_to_end(key)
+        if len(self._blocked) > self.max_keys:
+            self._blocked.popitem(last=False)
+
+    def blocked_for(self, key: str, now: Optional[float] = None) -> int:
+        """Секунд до снятия блокировки (0 - ключ не заблокирован)"""
+        entry = self._blocked.get(key)
+        if entry is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        if entry[0] <= now:
+            del self._blocked[key]
+            return 0
+        return max(1, int(entry[0] - now))
+
+    def unblock(self, key: str) -> bool:
+        """Снять блокировку (для административного интерфейса)"""
+        return self._blocked.pop(key, None) is not None
+
+    def count(self, key: str, budget_name: str, now: Optional[float] = None) -> int:
+        """Текущая оценка числа событий ключа в бюджете (без учета нового события)"""
+        window = self._windows.get((key, budget_name))
+        if window is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        budget = self.budgets[budget_name]
+        elapsed = now - window.started
+        if elapsed >= 2 * budget.window:
+            return 0
+        if elapsed >= budget.window:
+            return int(window.current * (1.0 - (elapsed - budget.window) / budget.window))
+        return int(window.previous * (1.0 - elapsed / budget.window) + window.current)
+
+    def purge_expired_blocks(self) -> int:
+        """Удалить истекшие блокировки, вернуть их количество"""
+        now = time.monotonic()
+        expired = [key for key, (until, _) in self._blocked.items() if until <= now]
+        for key in expired:
+            del self._blocked[key]
+        return len(expired)
+
+    def blocked_keys(self) -> List[str]:
+        """Заблокированные в данный момент ключи"""
+        now = time.monotonic()
+        return [key for key, (until, _) in self._blocked.items() if until > now]
+
+    def stats(self) -> Dict:
+        """Статистика ограничителя (для /debug/security)"""
+        per_budget: Dict[str, int] = {name: 0 for name in self.budgets}
+        for _, budget_name in self._windows:
+            per_budget[budget_name] += 1
+        return {
+            "tracked_keys": len(self._windows),
+            "max_keys": self.max_keys,
+            "keys_per_budget": per_budget,
+            "blocked": len(self.blocked_keys()),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "evicted": self.evicted,
+            "budgets": {
+                name: {"limit": budget.limit, "window": budget.window, "block_duration": budget.block_duration}
+                for name, budget in self.budgets.items()
+            }
+        }
+
+    def clear(self) -> None:
+        self._windows.clear()
+        self._blocked.clear()
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Ограничитель с бюджетами из настроек"""
+    block = settings.rate_limit_block_duration
+    return RateLimiter(
+        budgets=[
+            Budget("api", settings.rate_limit_max_requests, settings.rate_limit_window, block),
+            Budget("public", settings.rate_limit_public_max_requests, settings.rate_limit_window, block),
+            Budget("auth", settings.rate_limit_auth_max_requests, settings.rate_limit_window, block),
+            # События, а не маршруты: учитываются монитором безопасности
+            # (блокировка на N-м событии, поэтому лимит N - 1)
+            Budget("failed_login", settings.max_failed_logins - 1, settings.failed_login_window, block),
+            Budget("suspicious", settings.suspicious_requests_threshold - 1, 3600, block),
+        ],
+        route_classes=[
+            ("/auth/login", "auth"),
+            ("/dishes/menu", "public"),
+            ("/health", "public"),
+            ("/uploads", "public"),
+        ],
+        default_budget="api",
+        max_keys=settings.rate_limit_max_keys
+    )
+
+
+# Глобальный ограничитель
+rate_limiter = create_rate_limiter()
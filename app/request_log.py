@@ -0,0 +1,220 @@
+"""
+QRes OS 4 - Structured Request Log
+Append-only JSONL журнал API запросов с фоновой записью и потоковым чтением
+"""
+import json
+import queue
+import logging
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union, IO
+
+
+# Маркер остановки фонового потока
+_STOP = object()
+
+
+def request_log_path(logs_dir: Path, day: Union[date, str], prefix: str = "api_requests") -> Path:
+    """Путь к JSONL файлу журнала за указанный день"""
+    if isinstance(day, date):
+        day = day.strftime("%Y-%m-%d")
+    return Path(logs_dir) / f"{prefix}_{day}.jsonl"
+
+
+class RequestLogWriter:
+    """
+    Буферизованная запись журнала запросов в JSONL файл
+
+    Запросы не трогают диск: записи складываются в ограниченную очередь,
+    а фоновый поток пишет их пачками (по размеру пачки или по таймеру)
+    в файл, открытый в режиме append. Файл ротируется по дате записи.
+    """
+
+    def __init__(
+        self,
+        logs_dir: Path,
+        prefix: str = "api_requests",
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue_size: int = 10000
+    ):
+        """
+        Args:
+            logs_dir: Директория для файлов журнала
+            prefix: Префикс имени файла (api_requests -> api_requests_YYYY-MM-DD.jsonl)
+            batch_size: Количество записей, после которого пачка сбрасывается на диск
+            flush_interval: Максимальное время (сек) хранения записи в буфере
+            max_queue_size: Размер очереди; при переполнении записи отбрасываются
+        """
+        self.logs_dir = Path(logs_dir)
+        self.prefix = prefix
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.05, flush_interval)
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        # Текущий открытый файл и его дата
+        self._file: Optional[IO[str]] = None
+        self._file_day: Optional[str] = None
+
+        # Счетчики для мониторинга
+        self.written = 0
+        self.dropped = 0
+
+    def write(self, entry: Dict[str, Any]) -> bool:
+        """
+        Поставить запись в очередь (не блокирует event loop)
+
+        Returns:
+            True если запись принята, False если очередь переполнена или writer закрыт
+        """
+        if self._closed:
+            return False
+
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Сбросить буфер на диск и остановить фоновый поток"""
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+
+        self._close_file()
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика работы журнала"""
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize()
+        }
+
+    def _ensure_started(self) -> None:
+        """Ленивый запуск фонового потока при первой записи"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self.logs_dir.mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="request-log-writer",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Основной цикл фонового потока"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                # Дочитываем все, что успело попасть в очередь
+                while True:
+                    try:
+                        rest = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if rest is not _STOP:
+                        batch.append(rest)
+                self._write_batch(batch)
+                return
+
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write_batch(self, batch: list) -> None:
+        """Запись пачки в файл(ы) с ротацией по дате"""
+        if not batch:
+            return
+
+        try:
+            for entry in batch:
+                day = str(entry.get("timestamp") or "")[:10] or datetime.now().strftime("%Y-%m-%d")
+                if day != self._file_day:
+                    self._open_file(day)
+                self._file.write(json.dumps(entry, ensure_ascii=False, default=str))
+                self._file.write("\n")
+            self._file.flush()
+            self.written += len(batch)
+        except Exception as e:
+            logging.getLogger("api_requests").error(f"Ошибка при записи JSONL-лога: {e}")
+
+    def _open_file(self, day: str) -> None:
+        """Открыть файл журнала за указанный день (append-only)"""
+        self._close_file()
+        path = request_log_path(self.logs_dir, day, self.prefix)
+        self._file = open(path, "a", encoding="utf-8", buffering=64 * 1024)
+        self._file_day = day
+
+    def _close_file(self) -> None:
+        """Закрыть текущий файл журнала"""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+            self._file_day = None
+
+
+def iter_request_log(
+    logs_dir: Path,
+    day: Union[date, str, None] = None,
+    prefix: str = "api_requests"
+) -> Iterator[Dict[str, Any]]:
+    """
+    Потоковое чтение журнала запросов за день (по одной записи)
+
+    Файл не загружается целиком. Поврежденные строки (например, недописанная
+    последняя строка при аварийной остановке) пропускаются.
+
+    Args:
+        logs_dir: Директория с файлами журнала
+        day: День (date или 'YYYY-MM-DD'), по умолчанию сегодня
+        prefix: Префикс имени файла
+    """
+    path = request_log_path(logs_dir, day or date.today(), prefix)
+    if not path.exists():
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
@@ -0,0 +1,212 @@
+"""
+QRes OS 4 - Request Screening
+Поиск подозрительных паттернов в запросе за один проход
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+
+
+# Части запроса, по которым идет поиск
+PATH = "path"
+QUERY = "query"
+AGENT = "agent"
+
+# Группы правил (по тому, кто на них реагирует)
+FILTER_PATH = "filter_path"  # SuspiciousRequestFilterMiddleware: 404
+FILTER_AGENT = "filter_agent"  # SuspiciousRequestFilterMiddleware: 403
+MONITOR = "monitor"  # SecurityMonitor: счетчик подозрительных запросов
+ALERT = "alert"  # security_monitoring_middleware: запись в журнал безопасности
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Правило: подстрока (в нижнем регистре) в одной или нескольких частях запроса"""
+    id: str
+    pattern: str
+    targets: FrozenSet[str]
+    group: str
+
+
+def _rules(group: str, prefix: str, targets: Iterable[str], patterns: Iterable[str]) -> List[Rule]:
+    targets = frozenset(targets)
+    return [
+        Rule(id=f"{prefix}:{pattern}", pattern=pattern, targets=targets, group=group)
+        for pattern in dict.fromkeys(pattern.lower() for pattern in patterns)
+    ]
+
+
+# Все наборы паттернов приложения (ранее - три отдельных списка)
+RULES: List[Rule] = (
+    _rules(FILTER_PATH, "filter.path", [PATH], [
+        "/wp-", "/wordpress", "/wp-admin", "/wp-login", "/phpMyAdmin",
+        "/admin", "/administrator", "/login.php", "/.git", "/.env",
+        "/config", "/backup", "/dump", "/db", "/database",
+        "/shell", "/cmd", "/command", "/sql", "/phpmyadmin"
+    ])
+    + _rules(FILTER_AGENT, "filter.agent", [AGENT], [
+        "zgrab", "gobuster", "nikto", "nmap", "masscan", "python-requests/",
+        "sqlmap", "scanbot", "bot", "crawler", "spider", "dirbuster", "dirb",
+        "wpscan", "joomla", "drupal"
+    ])
+    + _rules(MONITOR, "monitor.url", [PATH, QUERY], [
+        'admin', 'administrator', 'root', 'test', 'guest',
+        '.env', '.git', 'config', 'backup', 'database',
+        'phpmyadmin', 'wp-admin', 'wp-login',
+        '../', '..\\', '/etc/', '/var/', '/usr/',
+        '<script', 'javascript:', 'eval(', 'exec(',
+        'union select', 'drop table', 'delete from'
+    ])
+    + _rules(MONITOR, "monitor.agent", [AGENT], [
+        'sqlmap', 'nikto', 'nmap', 'masscan', 'zap',
+        'burp', 'w3af', 'gobuster', 'dirb', 'dirbuster'
+    ])
+    + _rules(ALERT, "alert.path", [PATH], ['.env', '.git', 'admin', 'phpmyadmin'])
+)
+
+# Отсутствующий User-Agent - отдельное правило монитора (не подстрока)
+NO_USER_AGENT_RULE = "monitor.agent:missing"
+
+
+@dataclass(frozen=True)
+class ScreeningResult:
+    """Совпавшие правила для запроса"""
+    rule_ids: FrozenSet[str]
+    groups: FrozenSet[str]
+
+    @property
+    def is_clean(self) -> bool:
+        return not self.rule_ids
+
+    def has(self, group: str) -> bool:
+        """Совпало ли хотя бы одно правило группы"""
+        return group in self.groups
+
+
+def _trie_regex(patterns: Iterable[str]) -> str:
+    """
+    Альтернация паттернов, свернутая в префиксное дерево
+
+    Вместо "wp-|wp-admin|wp-login" получается "wp\\-(?:admin|login)?":
+    в каждой позиции движок проверяет один символ на узел, а не все
+    паттерны подряд, и жадно находит самый длинный паттерн.
+    """
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if is_end:
+            # Паттерн может закончиться здесь: продолжение необязательно (жадно)
+            return ("(?:" + body + ")?") if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+
+class _TargetMatcher:
+    """
+    Все паттерны одной части запроса в одном регулярном выражении
+
+    Быстрая проверка - поиск по альтернации (для чистых запросов это
+    единственный проход). Если что-то найдено, проход с опережающей
+    проверкой (?=(...)) находит самый длинный паттерн в каждой позиции;
+    паттерны, являющиеся его префиксами, добавляются из заранее
+    посчитанной таблицы - так находятся все совпавшие правила.
+    """
+
+    def __init__(self, rules: List[Rule]):
+        ids_by_pattern: Dict[str, List[str]] = {}
+        for rule in rules:
+            ids_by_pattern.setdefault(rule.pattern, []).append(rule.id)
+
+        patterns = list(ids_by_pattern)
+        alternation = _trie_regex(patterns)
+        self._search = re.compile(alternation).search
+        self._finditer = re.compile(f"(?=({alternation}))").finditer
+
+        self._implied: Dict[str, Tuple[str, ...]] = {
+            pattern: tuple(
+                rule_id
+                for prefix in patterns if pattern.startswith(prefix)
+                for rule_id in ids_by_pattern[prefix]
+            )
+            for pattern in patterns
+        }
+
+    def match(self, text: str, found: set) -> None:
+        if not text or self._search(text) is None:
+            return
+        implied = self._implied
+        for match in self._finditer(text):
+            found.update(implied[match.group(1)])
+
+
+class RequestMatcher:
+    """Сопоставление запроса со всеми правилами: один проход по каждой части запроса"""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules: Dict[str, Rule] = {rule.id: rule for rule in rules}
+        self._targets: Dict[str, _TargetMatcher] = {}
+        for target in (PATH, QUERY, AGENT):
+            target_rules = [rule for rule in rules if target in rule.targets]
+            if target_rules:
+                self._targets[target] = _TargetMatcher(target_rules)
+
+    def match(self, path: str, query: str = "", user_agent: Optional[str] = None) -> ScreeningResult:
+        """
+        Найти все совпавшие правила
+
+        path, query и user_agent приводятся к нижнему регистру здесь;
+        user_agent=None или пустая строка - запрос без User-Agent.
+        """
+        found: set = set()
+        self._targets[PATH].match(path.lower(), found)
+        self._targets[QUERY].match(query.lower(), found)
+        if user_agent:
+            self._targets[AGENT].match(user_agent.lower(), found)
+        else:
+            found.add(NO_USER_AGENT_RULE)
+
+        if not found:
+            return _CLEAN
+        return ScreeningResult(
+            rule_ids=frozenset(found),
+            groups=frozenset(
+                self.rules[rule_id].group if rule_id in self.rules else MONITOR
+                for rule_id in found
+            )
+        )
+
+
+_CLEAN = ScreeningResult(rule_ids=frozenset(), groups=frozenset())
+
+# Общий сопоставитель, собирается один раз при импорте
+request_matcher = RequestMatcher(RULES)
+
+
+def screen_request(request: Request) -> ScreeningResult:
+    """
+    Результат проверки запроса (вычисляется один раз и сохраняется в request.state)
+
+    Все middleware безопасности используют один и тот же результат.
+    """
+    result = getattr(request.state, "screening", None)
+    if result is None:
+        result = request_matcher.match(
+            request.url.path,
+            request.url.query,
+            request.headers.get("user-agent")
+        )
+        request.state.screening = result
+    return result
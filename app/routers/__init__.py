@@ -14,6 +14,7 @@ from . import order_items
 from . import ingredients
 from . import paymentmethod
 from . import websocket
+from . import archive
 
 __all__ = [
     "auth",
@@ -26,4 +27,5 @@ __all__ = [
     "ingredients",
     "paymentmethod",
     "websocket",
+    "archive",
 ]
@@ -0,0 +1,68 @@
+"""
+QRes OS 4 - Archive Router
+Состояние и ручной запуск архивации заказов (для администратора)
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from ..deps import DatabaseSession, AdminUser
+from ..schemas import APIResponse
+from ..services.archive import ArchiveService, archive_progress
+
+
+router = APIRouter(prefix="/archive", tags=["Archive"])
+
+# Ручной прогон выполняется в фоне: запрос не ждет переноса всех пачек
+_manual_run: Optional[asyncio.Task] = None
+
+
+@router.get("/status", response_model=APIResponse)
+async def get_archive_status(
+    db: DatabaseSession,
+    admin_user: AdminUser
+):
+    """
+    Прогресс архивации: счетчики перенесенных заказов, размеры горячих и
+    архивных таблиц, сколько заказов ожидают переноса
+    """
+    return APIResponse(
+        message="Состояние архива заказов",
+        data=await ArchiveService.get_status(db)
+    )
+
+
+@router.post("/run", response_model=APIResponse, status_code=status.HTTP_202_ACCEPTED)
+async def run_archive(
+    admin_user: AdminUser,
+    days: Optional[int] = Query(None, ge=0, description="Архивировать заказы старше N дней (по умолчанию - из настроек)")
+):
+    """
+    Запустить архивацию сейчас, не дожидаясь фоновой задачи
+    """
+    global _manual_run
+
+    if archive_progress.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Архивация уже выполняется"
+        )
+
+    _manual_run = asyncio.create_task(ArchiveService.run(days=days))
+    _manual_run.add_done_callback(_log_manual_run)
+
+    return APIResponse(
+        message="Архивация запущена",
+        data={"cutoff": ArchiveService.cutoff(days)}
+    )
+
+
+def _log_manual_run(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        print(f"❌ Ошибка архивации заказов: {task.exception()}")
+    else:
+        totals = task.result()
+        print(f"🗄️ В архив перенесено заказов: {totals['orders']}, позиций: {totals['items']}")
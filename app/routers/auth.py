@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
 from ..services.auth import AuthService
 from ..schemas import UserLogin, UserLoginPIN, Token, User as UserSchema, APIResponse
-from ..deps import CurrentUser, DatabaseSession
+from ..deps import CurrentUser, LazyWriteSession
 from ..config import settings
 from ..security_monitor import security_monitor
 from ..security_logger import security_logger
@@ -24,7 +24,7 @@ security = HTTPBearer()
 async def login(
     user_credentials: UserLogin,
     request: Request,
-    db: DatabaseSession
+    db: LazyWriteSession
 ):
     """
     Вход в систему по логину и паролю
@@ -70,7 +70,7 @@ async def login(
 @router.post("/login/pin", response_model=Token)
 async def login_pin(
     user_credentials: UserLoginPIN,
-    db: DatabaseSession
+    db: LazyWriteSession
 ):
     """
     Быстрый вход в систему по логину и PIN-коду
@@ -14,6 +14,7 @@ from ..schemas import (
     Category as CategorySchema, CategoryCreate, CategoryUpdate,
     CategoryWithDishes, CategoryList, APIResponse
 )
+from ..services.menu_cache import menu_cache
 
 
 router = APIRouter()
@@ -86,6 +87,7 @@ async def create_category(
     
     db.add(new_category)
     await db.commit()
+    menu_cache.invalidate()
     await db.refresh(new_category)
     
     return new_category
@@ -178,6 +180,7 @@ async def update_category(
         setattr(category, field, value)
     
     await db.commit()
+    menu_cache.invalidate()
     await db.refresh(category)
     
     return category
@@ -260,6 +263,7 @@ async def delete_category(
         # Деактивируем вместо удаления
         category.is_active = False
         await db.commit()
+        menu_cache.invalidate()
         
         return APIResponse(
             message=f"Категория '{category.name}' деактивирована (содержит {dishes_count} блюд)"
@@ -268,6 +272,7 @@ async def delete_category(
         # Полное удаление, если нет блюд
         await db.delete(category)
         await db.commit()
+        menu_cache.invalidate()
         
         return APIResponse(
             message=f"Категория '{category.name}' удалена"
@@ -3,7 +3,7 @@ QRes OS 4 - Dishes Router
 Роутер для управления блюдами
 """
 from typing import Optional
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, update
 from sqlalchemy.orm import selectinload
@@ -18,6 +18,10 @@ from ..schemas import (
     DishVariationWithDish, DishVariationList, DishVariationAvailabilityUpdate,
     DishVariationDefaultUpdate
 )
+from ..services.menu_cache import menu_cache, etag_matches
+from ..services.row_counts import RowCountService
+from ..services.dish_search import DishSearchService
+from ..pagination import CountMode, read_cursor, keyset_page, keyset_result
 
 
 router = APIRouter()
@@ -31,105 +35,75 @@ async def get_dishes(
     limit: int = Query(100, ge=1, le=100),
     category_id: Optional[int] = Query(None),
     is_available: Optional[bool] = Query(None),
-    search: Optional[str] = Query(None, max_length=100)
+    search: Optional[str] = Query(None, max_length=100),
+    cursor: Optional[str] = Query(None, description="Постраничный вывод по курсору: пустой - первая страница, дальше - next_cursor"),
+    count: Optional[CountMode] = Query(None, description="total: exact | cached | estimated | none")
 ):
     """
     Получить список блюд с фильтрацией и поиском
+
+    Без cursor - skip/limit с сортировкой по названию. С cursor - страницы
+    по (created_at, id) без OFFSET, total только по запросу (count).
     """
-    query = select(Dish).options(selectinload(Dish.category_obj))
+    conditions = []
     
     # Фильтры
     if category_id is not None:
-        query = query.where(Dish.category_id == category_id)
+        conditions.append(Dish.category_id == category_id)
     if is_available is not None:
-        query = query.where(Dish.is_available == is_available)
+        conditions.append(Dish.is_available == is_available)
+    rank = None
     if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            Dish.name.ilike(search_term) | 
-            Dish.description.ilike(search_term) |
-            Dish.ingredients.ilike(search_term)
-        )
+        # Полнотекстовый индекс (SQLite FTS5) или ILIKE на других СУБД
+        search_condition, rank = DishSearchService.search_filter(db, search)
+        conditions.append(search_condition)
     
-    # Сортировка по названию
-    query = query.order_by(Dish.name)
+    query = select(Dish).options(selectinload(Dish.category_obj)).where(*conditions)
     
     # Получение общего количества
-    count_query = select(func.count(Dish.id))
-    if category_id is not None:
-        count_query = count_query.where(Dish.category_id == category_id)
-    if is_available is not None:
-        count_query = count_query.where(Dish.is_available == is_available)
-    if search:
-        search_term = f"%{search}%"
-        count_query = count_query.where(
-            Dish.name.ilike(search_term) | 
-            Dish.description.ilike(search_term) |
-            Dish.ingredients.ilike(search_term)
-        )
-    
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    total, estimated = await RowCountService.count(
+        db, Dish, conditions,
+        count or (CountMode.EXACT if cursor is None else CountMode.NONE),
+        {"category_id": category_id, "is_available": is_available, "search": search},
+        estimable=not search
+    )
     
-    # Пагинация
-    query = query.offset(skip).limit(limit)
+    if cursor is not None:
+        try:
+            query = keyset_page(query, Dish, read_cursor(cursor), limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        result = await db.execute(query)
+        dishes, next_cursor = keyset_result(list(result.scalars().all()), limit)
+        return DishList(dishes=dishes, total=total, total_estimated=estimated, next_cursor=next_cursor)
+    
+    # Сортировка по релевантности поиска и названию, пагинация
+    order = [Dish.name] if rank is None else [rank, Dish.name]
+    query = query.order_by(*order).offset(skip).limit(limit)
     result = await db.execute(query)
     dishes = result.scalars().all()
     
-    return DishList(dishes=dishes, total=total)
+    return DishList(dishes=dishes, total=total, total_estimated=estimated)
 
 
 @router.get("/menu", response_model=MenuResponse)
 async def get_menu(
+    request: Request,
     db: DatabaseSession
 ):
     """
     Получить меню для клиентов (публичный эндпоинт)
     Группировка блюд по категориям
+
+    Отдается готовый снимок из кэша; поддерживается If-None-Match (304)
     """
-    # Получаем активные категории с активными блюдами
-    categories_query = select(Category).where(Category.is_active == True).order_by(Category.sort_order, Category.name)
-    categories_result = await db.execute(categories_query)
-    categories = categories_result.scalars().all()
-    
-    menu_categories = []
-    
-    for category in categories:
-        # Получаем доступные блюда в категории
-        dishes_query = select(Dish).where(
-            Dish.category_id == category.id,
-            Dish.is_available == True
-        ).order_by(Dish.name)
-        dishes_result = await db.execute(dishes_query)
-        dishes = dishes_result.scalars().all()
-        
-        if dishes:  # Добавляем категорию только если есть доступные блюда
-            menu_categories.append({
-                "category": {
-                    "id": category.id,
-                    "name": category.name,
-                    "description": category.description,
-                    "image_url": category.image_url,
-                    "sort_order": category.sort_order
-                },
-                "dishes": [
-                    {
-                        "id": dish.id,
-                        "name": dish.name,
-                        "description": dish.description,
-                        "main_image_url": dish.main_image_url,
-                        "cooking_time": dish.cooking_time,
-                        "weight": dish.weight,
-                        "calories": dish.calories,
-                        "ingredients": dish.ingredients,
-                        "sort_order": dish.sort_order,
-                        "is_popular": dish.is_popular
-                    }
-                    for dish in dishes
-                ]
-            })
-    
-    return MenuResponse(categories=menu_categories)
+    snapshot = await menu_cache.get(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 
 @router.post("/", response_model=DishSchema)
@@ -196,6 +170,7 @@ async def create_dish(
     
     db.add(new_dish)
     await db.commit()
+    menu_cache.invalidate()
     await db.refresh(new_dish)
     
     return new_dish
@@ -311,6 +286,7 @@ async def update_dish(
         setattr(dish, field, value)
     
     await db.commit()
+    menu_cache.invalidate()
     await db.refresh(dish)
     
     return dish
@@ -338,6 +314,7 @@ async def update_dish_availability(
     
     dish.is_available = availability_data.is_available
     await db.commit()
+    menu_cache.invalidate()
     
     status_text = "доступно" if availability_data.is_available else "недоступно"
     return APIResponse(
@@ -370,6 +347,7 @@ async def delete_dish(
     # Деактивируем вместо удаления для сохранения истории
     dish.is_available = False
     await db.commit()
+    menu_cache.invalidate()
     
     return APIResponse(
         message=f"Блюдо '{dish.name}' деактивировано"
@@ -488,6 +466,7 @@ async def create_dish_variation(
     
     db.add(new_variation)
     await db.commit()
+    menu_cache.invalidate()
     await db.refresh(new_variation)
     
     return new_variation
@@ -576,6 +555,7 @@ async def update_dish_variation(
         setattr(variation, field, value)
     
     await db.commit()
+    menu_cache.invalidate()
     await db.refresh(variation)
     
     return variation
@@ -608,6 +588,7 @@ async def update_variation_availability(
     
     variation.is_available = availability_data.is_available
     await db.commit()
+    menu_cache.invalidate()
     
     status_text = "доступна" if availability_data.is_available else "недоступна"
     return APIResponse(
@@ -657,6 +638,7 @@ async def delete_dish_variation(
     # Удаляем вариацию
     await db.delete(variation)
     await db.commit()
+    menu_cache.invalidate()
     
     return APIResponse(
         message="Вариация блюда удалена"
@@ -3,13 +3,13 @@ QRes OS 4 - Kitchen Router
 Роутер для управления кухонными цехами
 """
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 from ..deps import DatabaseSession, CurrentUser
 from ..models.order_item import OrderItemStatus, KitchenDepartment
-from ..schemas.order_item import KitchenOrderItem, OrderItemStatusUpdate, OrderItemCreate
+from ..schemas.order_item import KitchenOrderItem, KitchenBoardChanges, OrderItemStatusUpdate, OrderItemCreate
 from ..schemas.common import APIResponse
 from ..services.kitchen import KitchenService
 
@@ -222,13 +222,25 @@ async def get_order_progress(
 
 @router.get("/dishes", response_model=List[KitchenOrderItem])
 async def get_all_kitchen_dishes(
+    response: Response,
     db: DatabaseSession,
     current_user: CurrentUser,
     department: Optional[KitchenDepartment] = Query(None),
-    status_filter: Optional[List[OrderItemStatus]] = Query(None)
+    status_filter: Optional[List[OrderItemStatus]] = Query(None),
+    served_window_minutes: Optional[int] = Query(
+        None, ge=0, le=24 * 60, description="Поданные позиции за последние N минут (по умолчанию - из настроек)"
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, le=500, description="Позиций каждого цеха на странице (по умолчанию - лимит цеха из настроек)"
+    ),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы из заголовка X-Next-Cursor")
 ):
     """
     Получить все блюда для кухни (из всех заказов)
+    
+    Доска выбирается постранично по каждому цеху отдельно. Если у какого-то
+    цеха остались позиции, в заголовке X-Next-Cursor возвращается курсор
+    следующей страницы.
     """
     # Проверяем права доступа
     if current_user.role.value not in ['kitchen', 'admin', 'KITCHEN', 'ADMIN']:
@@ -237,10 +249,53 @@ async def get_all_kitchen_dishes(
             detail="Доступ только для кухни и администраторов"
         )
     
-    dishes = await KitchenService.get_all_kitchen_dishes(
+    try:
+        board = await KitchenService.get_all_kitchen_dishes(
+            db=db,
+            department=department,
+            status_filter=status_filter,
+            served_window_minutes=served_window_minutes,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if board['next_cursor']:
+        response.headers["X-Next-Cursor"] = board['next_cursor']
+    
+    return board['items']
+
+
+@router.get("/dishes/changes", response_model=KitchenBoardChanges)
+async def get_kitchen_dishes_changes(
+    db: DatabaseSession,
+    current_user: CurrentUser,
+    since: Optional[int] = Query(None, ge=0, description="Курсор из предыдущего ответа"),
+    department: Optional[KitchenDepartment] = Query(None),
+    status_filter: Optional[List[OrderItemStatus]] = Query(None)
+):
+    """
+    Изменения доски кухни после курсора (инкрементальный вариант /kitchen/dishes)
+    
+    Первый запрос - без since: возвращается вся доска и курсор. Дальше
+    клиент передает полученный курсор и применяет к своей копии items
+    (добавить/заменить по id) и removed (удалить). Если full=true, копию
+    нужно заменить целиком.
+    """
+    # Проверяем права доступа
+    if current_user.role.value not in ['kitchen', 'admin', 'KITCHEN', 'ADMIN']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Доступ только для кухни и администраторов"
+        )
+    
+    return await KitchenService.get_kitchen_changes(
         db=db,
+        since=since,
         department=department,
         status_filter=status_filter
     )
-    
-    return dishes
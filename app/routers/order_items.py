@@ -18,6 +18,8 @@ from ..schemas import (
     OrderItem as OrderItemSchema, OrderItemCreate, OrderItemUpdate, 
     OrderItemWithDish, OrderItemStatusUpdate, APIResponse
 )
+from ..services.order_pricing import OrderPricingService, OrderPricingError
+from .websocket import notifier
 
 
 def moscow_now() -> datetime:
@@ -39,7 +41,7 @@ async def add_item_to_order(
     Добавить блюдо в заказ
     """
     # Проверяем существование заказа
-    order_query = select(Order).where(Order.id == order_id)
+    order_query = select(Order).options(selectinload(Order.table)).where(Order.id == order_id)
     order_result = await db.execute(order_query)
     order = order_result.scalar_one_or_none()
     
@@ -65,80 +67,14 @@ async def add_item_to_order(
             detail=f"Нельзя добавлять блюда в заказ со статусом '{order.status.value}'"
         )
     
-    # Проверяем блюдо
-    dish_query = select(Dish).where(Dish.id == item_data.dish_id)
-    dish_result = await db.execute(dish_query)
-    dish = dish_result.scalar_one_or_none()
-    
-    if not dish:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Блюдо не найдено"
-        )
-    
-    if not dish.is_available:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Блюдо недоступно"
-        )
-    
-    # Получаем вариацию блюда для цены
-    from ..models import DishVariation
-    
-    if hasattr(item_data, 'dish_variation_id') and item_data.dish_variation_id:
-        # Конкретная вариация указана
-        variation_query = select(DishVariation).where(
-            DishVariation.id == item_data.dish_variation_id,
-            DishVariation.dish_id == dish.id,
-            DishVariation.is_available == True
-        )
-        variation_result = await db.execute(variation_query)
-        variation = variation_result.scalar_one_or_none()
-        
-        if not variation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Вариация блюда с ID {item_data.dish_variation_id} не найдена или недоступна"
-            )
-    else:
-        # Берем дефолтную вариацию
-        default_variation_query = select(DishVariation).where(
-            DishVariation.dish_id == dish.id,
-            DishVariation.is_default == True,
-            DishVariation.is_available == True
-        )
-        default_result = await db.execute(default_variation_query)
-        variation = default_result.scalar_one_or_none()
-        
-        if not variation:
-            # Если нет дефолтной, берем первую доступную
-            first_variation_query = select(DishVariation).where(
-                DishVariation.dish_id == dish.id,
-                DishVariation.is_available == True
-            ).limit(1)
-            first_result = await db.execute(first_variation_query)
-            variation = first_result.scalar_one_or_none()
-            
-            if not variation:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"У блюда '{dish.name}' нет доступных вариаций"
-                )
+    # Проверяем блюдо и рассчитываем стоимость позиции
+    try:
+        priced_items, item_total = await OrderPricingService.price_items(db, [item_data.model_dump()])
+    except OrderPricingError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     
     # Создаем новую позицию
-    item_total = Decimal(str(variation.price)) * item_data.quantity
-    
-    new_item = OrderItem(
-        order_id=order_id,
-        dish_id=item_data.dish_id,
-        dish_variation_id=variation.id,
-        quantity=item_data.quantity,
-        price=Decimal(str(variation.price)),
-        total=item_total,
-        comment=getattr(item_data, 'comment', None),
-        status=OrderItemStatus.IN_PREPARATION,
-        preparation_started_at=moscow_now()
-    )
+    new_item = OrderPricingService.build_order_item(order_id, priced_items[0])
     
     db.add(new_item)
     
@@ -147,6 +83,7 @@ async def add_item_to_order(
     
     await db.commit()
     await db.refresh(new_item)
+    notifier.publish_order_updated(order.id, order.table.number if order.table else None, 1)
     
     # Загружаем позицию с информацией о блюде
     item_query = select(OrderItem).options(
@@ -161,7 +98,8 @@ async def add_item_to_order(
         **item_with_dish.__dict__,
         dish_name=item_with_dish.dish.name,
         dish_image_url=item_with_dish.dish.main_image_url,
-        dish_cooking_time=item_with_dish.dish.cooking_time
+        dish_cooking_time=item_with_dish.dish.cooking_time,
+        dish_department=item_with_dish.dish.department
     )
 
 
@@ -246,7 +184,10 @@ async def update_item_status(
     Обновить статус позиции заказа (для кухни)
     """
     # Загружаем позицию
-    item_query = select(OrderItem).where(
+    item_query = select(OrderItem).options(
+        selectinload(OrderItem.order).selectinload(Order.table),
+        selectinload(OrderItem.dish)
+    ).where(
         OrderItem.id == item_id,
         OrderItem.order_id == order_id
     )
@@ -261,10 +202,18 @@ async def update_item_status(
         )
     
     # Обновляем статус
+    old_status = item.status
     item.status = status_data.status
     
     await db.commit()
     
+    if old_status != item.status:
+        notifier.publish_item_status_changed(
+            item.id, order_id, item.dish.name if item.dish else f"Позиция #{item.id}",
+            item.department.value, old_status.value, item.status.value,
+            item.order.table.number if item.order.table else None
+        )
+    
     return APIResponse(
         success=True,
         message=f"Статус позиции обновлён на '{status_data.status.value}'"
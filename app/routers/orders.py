@@ -11,15 +11,22 @@ from sqlalchemy.orm import selectinload
 from decimal import Decimal
 
 from ..deps import DatabaseSession, WaiterUser, KitchenUser, CurrentUser
-from ..models import Order, OrderItem, Table, Dish, User
+from ..models import Order, OrderItem, Table, Dish, User, OrderArchive, OrderItemArchive
 from ..models.order import OrderStatus, PaymentStatus, OrderType
 from ..models.order_item import OrderItemStatus
 from ..schemas import (
-    Order as OrderSchema, OrderCreate, OrderUpdate, OrderWithDetails,
+    Order as OrderSchema, OrderCreate, OrderUpdate, OrderWithDetails, OrderWithItems,
     OrderItem as OrderItemSchema, OrderItemCreate, OrderItemUpdate, 
     OrderItemWithDish, OrderStatusUpdate, OrderPaymentUpdate, OrderPaymentComplete,
     OrderList, OrderStats, APIResponse, DeliveryOrderCreate, DeliveryOrderResponse
 )
+from ..services.order_pricing import OrderPricingService, OrderPricingError
+from ..services.statistics import StatisticsService
+from ..services.archive import ArchiveService
+from ..services.row_counts import RowCountService
+from ..loaders import load_options, parse_expand
+from ..pagination import CountMode, read_cursor, keyset_page, keyset_result, encode_cursor
+from .websocket import notifier
 
 
 def moscow_now() -> datetime:
@@ -30,6 +37,85 @@ def moscow_now() -> datetime:
 router = APIRouter()
 
 
+def _order_filters(model, status, payment_status, table_id, waiter_id) -> list:
+    """Фильтры списка заказов (одинаковые для orders и orders_archive)"""
+    conditions = []
+    if status is not None:
+        conditions.append(model.status == status)
+    if payment_status is not None:
+        conditions.append(model.payment_status == payment_status)
+    if table_id is not None:
+        conditions.append(model.table_id == table_id)
+    if waiter_id is not None:
+        conditions.append(model.waiter_id == waiter_id)
+    return conditions
+
+
+# ?expand= для списка заказов -> схема элемента списка
+ORDER_LIST_EXPANSIONS = {"items": OrderWithItems}
+
+
+def _order_list_schema(expand: Optional[str]):
+    """Схема элемента списка заказов по ?expand="""
+    try:
+        expansions = parse_expand(expand, ORDER_LIST_EXPANSIONS)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORDER_LIST_EXPANSIONS[expansions[0]] if expansions else OrderSchema
+
+
+def _order_list_query(model, filters: list, schema):
+    """Заказы для списка (orders или orders_archive) со связями, нужными схеме"""
+    return select(model).options(*load_options(model, schema)).where(*filters)
+
+
+def _order_list_sort(status: Optional[OrderStatus]) -> list:
+    """
+    Сортировка списка заказов в режиме skip/limit
+
+    Сначала заказы в работе (PENDING/IN_PROGRESS/READY), потом по времени
+    создания (по индексу ix_orders_in_work_created_at; при фильтре по
+    статусу in_work у всех строк одинаковый).
+    """
+    if status:
+        return [Order.created_at.desc()]
+    return [Order.in_work.desc(), Order.created_at.desc()]
+
+
+def _reorder_target_query(table_id: int):
+    """
+    Открытый неоплаченный заказ столика, к которому добавляется дозаказ
+
+    Порядок приоритета: PENDING -> IN_PROGRESS -> READY -> SERVED -> DINING,
+    при равных статусах - самый новый. К оплаченным заказам не добавляем.
+    """
+    return select(Order).where(
+        and_(
+            Order.table_id == table_id,
+            Order.is_active == True,
+            Order.payment_status != PaymentStatus.PAID  # НЕ добавляем к уже оплаченным заказам
+        )
+    ).order_by(
+        case(
+            (Order.status == OrderStatus.PENDING, 1),
+            (Order.status == OrderStatus.IN_PROGRESS, 2),
+            (Order.status == OrderStatus.READY, 3),
+            (Order.status == OrderStatus.SERVED, 4),
+            (Order.status == OrderStatus.DINING, 5),
+            else_=6
+        ),
+        Order.created_at.desc()
+    )
+
+
+def _active_table_orders_query(table_id: int):
+    """Открытые заказы столика (по частичному индексу ix_orders_active_table_id)"""
+    return select(Order).options(*load_options(Order, OrderWithDetails)).where(
+        Order.table_id == table_id,
+        Order.is_active == True
+    )
+
+
 @router.get("/", response_model=OrderList)
 async def get_orders(
     db: DatabaseSession,
@@ -39,54 +125,114 @@ async def get_orders(
     status: Optional[OrderStatus] = Query(None),
     payment_status: Optional[PaymentStatus] = Query(None),
     table_id: Optional[int] = Query(None),
-    waiter_id: Optional[int] = Query(None)
+    waiter_id: Optional[int] = Query(None),
+    include_archived: bool = Query(False, description="Добавить заказы из архива после текущих"),
+    expand: Optional[str] = Query(None, description="Вложить в заказы связи: items"),
+    cursor: Optional[str] = Query(None, description="Постраничный вывод по курсору: пустой - первая страница, дальше - next_cursor"),
+    count: Optional[CountMode] = Query(None, description="total: exact | cached | estimated | none")
 ):
     """
     Получить список заказов с фильтрацией
+
+    Без cursor - прежний режим skip/limit (сначала заказы в работе -
+    PENDING/IN_PROGRESS/READY, total по умолчанию точный). С cursor - страницы по (created_at, id) от новых
+    к старым без OFFSET, total по умолчанию не считается.
+
+    Архивные заказы всегда закрыты и старше текущих, поэтому с
+    include_archived=true они идут в списке после всех заказов из orders.
+
+    Позиции заказов загружаются и возвращаются только с expand=items.
     """
-    query = select(Order).options(
-        selectinload(Order.table),
-        selectinload(Order.waiter),
-        selectinload(Order.payment_method),
-        selectinload(Order.items).selectinload(OrderItem.dish)
-    )
-    
-    # Фильтры
-    if status is not None:
-        query = query.where(Order.status == status)
-    if payment_status is not None:
-        query = query.where(Order.payment_status == payment_status)
-    if table_id is not None:
-        query = query.where(Order.table_id == table_id)
-    if waiter_id is not None:
-        query = query.where(Order.waiter_id == waiter_id)
+    schema = _order_list_schema(expand)
+    filters = _order_filters(Order, status, payment_status, table_id, waiter_id)
+    archive_filters = _order_filters(OrderArchive, status, payment_status, table_id, waiter_id)
+    params = {"status": status, "payment_status": payment_status, "table_id": table_id, "waiter_id": waiter_id}
+    count_mode = count or (CountMode.EXACT if cursor is None else CountMode.NONE)
+
+    if cursor is not None:
+        orders, next_cursor = await _get_orders_page(
+            db, cursor, limit, filters, archive_filters, include_archived, schema
+        )
+
+        total, estimated = await RowCountService.count(db, Order, filters, count_mode, params)
+        if total is not None and include_archived:
+            archived_total, archived_estimated = await RowCountService.count(
+                db, OrderArchive, archive_filters, count_mode, params
+            )
+            total += archived_total
+            estimated = estimated or archived_estimated
+        return OrderList(
+            orders=[schema.model_validate(order) for order in orders],
+            total=total, total_estimated=estimated, next_cursor=next_cursor
+        )
+
+    query = _order_list_query(Order, filters, schema).order_by(*_order_list_sort(status))
     
-    # Сортировка: сначала активные заказы, потом по времени создания
-    query = query.order_by(
-        Order.status.in_([OrderStatus.PENDING, OrderStatus.IN_PROGRESS, OrderStatus.READY]).desc(),
-        Order.created_at.desc()
+    # Подсчет общего количества (для перехода в архив нужен точный)
+    total, estimated = await RowCountService.count(
+        db, Order, filters, CountMode.EXACT if include_archived else count_mode, params
     )
     
-    # Подсчет общего количества
-    count_query = select(func.count(Order.id))
-    if status is not None:
-        count_query = count_query.where(Order.status == status)
-    if payment_status is not None:
-        count_query = count_query.where(Order.payment_status == payment_status)
-    if table_id is not None:
-        count_query = count_query.where(Order.table_id == table_id)
-    if waiter_id is not None:
-        count_query = count_query.where(Order.waiter_id == waiter_id)
-    
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
     # Пагинация
     query = query.offset(skip).limit(limit)
     result = await db.execute(query)
-    orders = result.scalars().all()
+    orders = list(result.scalars().all())
+
+    if include_archived:
+        archived_total = await db.scalar(select(func.count(OrderArchive.id)).where(*archive_filters))
+        if len(orders) < limit and archived_total:
+            archived = await db.execute(
+                _order_list_query(OrderArchive, archive_filters, schema)
+                .order_by(OrderArchive.created_at.desc(), OrderArchive.id.desc())
+                .offset(max(skip - total, 0))
+                .limit(limit - len(orders))
+            )
+            orders.extend(archived.scalars().all())
+        total = total + archived_total if count_mode != CountMode.NONE else None
     
-    return OrderList(orders=orders, total=total)
+    return OrderList(
+        orders=[schema.model_validate(order) for order in orders],
+        total=total, total_estimated=estimated
+    )
+
+
+async def _get_orders_page(
+    db: AsyncSession,
+    cursor: str,
+    limit: int,
+    filters: list,
+    archive_filters: list,
+    include_archived: bool,
+    schema
+):
+    """Страница заказов по курсору: сначала orders, затем (по запросу) архив"""
+    try:
+        cursor_data = read_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    orders, next_cursor = [], None
+    in_archive = bool(cursor_data.get("archive"))
+
+    if not in_archive:
+        result = await db.execute(
+            keyset_page(_order_list_query(Order, filters, schema), Order, cursor_data, limit, descending=True)
+        )
+        orders, next_cursor = keyset_result(list(result.scalars().all()), limit)
+        if next_cursor is not None or not include_archived:
+            return orders, next_cursor
+        # Текущие заказы закончились - страница продолжается архивом
+        if len(orders) == limit:
+            return orders, encode_cursor({"archive": True})
+        cursor_data = {}
+
+    remaining = limit - len(orders)
+    result = await db.execute(keyset_page(
+        _order_list_query(OrderArchive, archive_filters, schema),
+        OrderArchive, cursor_data, remaining, descending=True
+    ))
+    archived, next_cursor = keyset_result(list(result.scalars().all()), remaining, archive=True)
+    return orders + archived, next_cursor
 
 
 @router.post("/", response_model=OrderWithDetails, status_code=status.HTTP_201_CREATED)
@@ -116,150 +262,33 @@ async def create_order(
                 detail="Столик неактивен"
             )
         
-                # Проверяем, есть ли уже активный заказ для этого столика
-        # Ищем в порядке приоритета: PENDING -> IN_PROGRESS -> READY -> SERVED -> DINING
-        # ВАЖНО: не добавляем к оплаченным заказам!
-        existing_order_query = select(Order).where(
-            and_(
-                Order.table_id == table.id,
-                Order.status.in_([
-                    OrderStatus.PENDING,
-                    OrderStatus.IN_PROGRESS,
-                    OrderStatus.READY,
-                    OrderStatus.SERVED,
-                    OrderStatus.DINING
-                ]),
-                Order.payment_status != PaymentStatus.PAID  # НЕ добавляем к уже оплаченным заказам
-            )
-        ).order_by(
-            # Сортируем по приоритету статусов для получения самого подходящего заказа
-            case(
-                (Order.status == OrderStatus.PENDING, 1),
-                (Order.status == OrderStatus.IN_PROGRESS, 2),
-                (Order.status == OrderStatus.READY, 3),
-                (Order.status == OrderStatus.SERVED, 4),
-                (Order.status == OrderStatus.DINING, 5),
-                else_=6
-            ),
-            Order.created_at.desc()  # При равных статусах берем самый новый
-        )
-        existing_order_result = await db.execute(existing_order_query)
+        # Проверяем, есть ли уже активный заказ для этого столика
+        # (ВАЖНО: не добавляем к оплаченным заказам!)
+        existing_order_result = await db.execute(_reorder_target_query(table.id))
         existing_order = existing_order_result.scalars().first()  # Берем первый по приоритету
         
         if existing_order:
             # ДОБАВЛЕНИЕ К СУЩЕСТВУЮЩЕМУ ЗАКАЗУ
             print(f"🔄 Для столика {table.number} уже есть активный заказ #{existing_order.id}, добавляем к нему позиции")
             
-            # Проверяем блюда и рассчитываем стоимость дозаказа
-            additional_price = Decimal('0.00')
-            validated_items = []
-            
-            for item_data in order_data.items:
-                dish_query = select(Dish).where(Dish.id == item_data.dish_id)
-                dish_result = await db.execute(dish_query)
-                dish = dish_result.scalar_one_or_none()
-                
-                if not dish:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"Блюдо с ID {item_data.dish_id} не найдено"
-                    )
-                
-                if not dish.is_available:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Блюдо '{dish.name}' недоступно"
-                    )
-                
-                # Получаем вариацию блюда для цены
-                from ..models import DishVariation
-                
-                if hasattr(item_data, 'dish_variation_id') and item_data.dish_variation_id:
-                    # Конкретная вариация указана
-                    variation_query = select(DishVariation).where(
-                        DishVariation.id == item_data.dish_variation_id,
-                        DishVariation.dish_id == dish.id,
-                        DishVariation.is_available == True
-                    )
-                    variation_result = await db.execute(variation_query)
-                    variation = variation_result.scalar_one_or_none()
-                    
-                    if not variation:
-                        raise HTTPException(
-                            status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"Вариация блюда с ID {item_data.dish_variation_id} не найдена или недоступна"
-                        )
-                else:
-                    # Берем дефолтную вариацию
-                    default_variation_query = select(DishVariation).where(
-                        DishVariation.dish_id == dish.id,
-                        DishVariation.is_default == True,
-                        DishVariation.is_available == True
-                    )
-                    default_result = await db.execute(default_variation_query)
-                    variation = default_result.scalar_one_or_none()
-                    
-                    if not variation:
-                        # Если нет дефолтной, берем первую доступную
-                        first_variation_query = select(DishVariation).where(
-                            DishVariation.dish_id == dish.id,
-                            DishVariation.is_available == True
-                        ).limit(1)
-                        first_result = await db.execute(first_variation_query)
-                        variation = first_result.scalar_one_or_none()
-                        
-                        if not variation:
-                            raise HTTPException(
-                                status_code=status.HTTP_400_BAD_REQUEST,
-                                detail=f"У блюда '{dish.name}' нет доступных вариаций"
-                            )
-                
-                item_total = Decimal(str(variation.price)) * item_data.quantity
-                additional_price += item_total
-                
-                validated_items.append({
-                    'dish': dish,
-                    'variation': variation,
-                    'quantity': item_data.quantity,
-                    'price': Decimal(str(variation.price)),
-                    'total': item_total,
-                    'comment': getattr(item_data, 'comment', None),
-                    'department': getattr(dish, 'department', 'kitchen'),
-                    'estimated_preparation_time': getattr(dish, 'cooking_time', 15)
-                })
+            # Проверяем блюда и рассчитываем стоимость дозаказа (пакетно)
+            validated_items, additional_price = await OrderPricingService.price_items(
+                db, [item.model_dump() for item in order_data.items]
+            )
             
             # Добавляем позиции к существующему заказу
-            order_items = []
             for item_data in validated_items:
-                order_item = OrderItem(
-                    order_id=existing_order.id,
-                    dish_id=item_data['dish'].id,
-                    dish_variation_id=item_data['variation'].id,
-                    quantity=item_data['quantity'],
-                    price=item_data['price'],
-                    total=item_data['total'],
-                    comment=item_data.get('comment'),
-                    status=OrderItemStatus.IN_PREPARATION,
-                    department=item_data['department'],
-                    estimated_preparation_time=item_data['estimated_preparation_time'],
-                    preparation_started_at=moscow_now()
-                )
-                db.add(order_item)
-                order_items.append(order_item)
+                db.add(OrderPricingService.build_order_item(existing_order.id, item_data))
             
             # Обновляем общую стоимость заказа
             existing_order.total_price = Decimal(str(existing_order.total_price)) + additional_price
             existing_order.updated_at = moscow_now()
             
             await db.commit()
+            notifier.publish_order_updated(existing_order.id, table.number, len(validated_items))
             
             # Загружаем обновленный заказ с полной информацией
-            full_order_query = select(Order).options(
-                selectinload(Order.table),
-                selectinload(Order.waiter),
-                selectinload(Order.payment_method),
-                selectinload(Order.items).selectinload(OrderItem.dish)
-            ).where(Order.id == existing_order.id)
+            full_order_query = select(Order).options(*load_options(Order, OrderWithDetails)).where(Order.id == existing_order.id)
             
             full_order_result = await db.execute(full_order_query)
             full_order = full_order_result.scalar_one()
@@ -308,83 +337,10 @@ async def create_order(
             
             return order_response
         
-        # Проверяем блюда и рассчитываем общую стоимость
-        total_price = Decimal('0.00')
-        validated_items = []
-        
-        for item_data in order_data.items:
-            dish_query = select(Dish).where(Dish.id == item_data.dish_id)
-            dish_result = await db.execute(dish_query)
-            dish = dish_result.scalar_one_or_none()
-            
-            if not dish:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Блюдо с ID {item_data.dish_id} не найдено"
-                )
-            
-            if not dish.is_available:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Блюдо '{dish.name}' недоступно"
-                )
-            
-            # Получаем вариацию блюда для цены
-            from ..models import DishVariation
-            
-            if hasattr(item_data, 'dish_variation_id') and item_data.dish_variation_id:
-                # Конкретная вариация указана
-                variation_query = select(DishVariation).where(
-                    DishVariation.id == item_data.dish_variation_id,
-                    DishVariation.dish_id == dish.id,
-                    DishVariation.is_available == True
-                )
-                variation_result = await db.execute(variation_query)
-                variation = variation_result.scalar_one_or_none()
-                
-                if not variation:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"Вариация блюда с ID {item_data.dish_variation_id} не найдена или недоступна"
-                    )
-            else:
-                # Берем дефолтную вариацию
-                default_variation_query = select(DishVariation).where(
-                    DishVariation.dish_id == dish.id,
-                    DishVariation.is_default == True,
-                    DishVariation.is_available == True
-                )
-                default_result = await db.execute(default_variation_query)
-                variation = default_result.scalar_one_or_none()
-                
-                if not variation:
-                    # Если нет дефолтной, берем первую доступную
-                    first_variation_query = select(DishVariation).where(
-                        DishVariation.dish_id == dish.id,
-                        DishVariation.is_available == True
-                    ).limit(1)
-                    first_result = await db.execute(first_variation_query)
-                    variation = first_result.scalar_one_or_none()
-                    
-                    if not variation:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"У блюда '{dish.name}' нет доступных вариаций"
-                        )
-            
-            item_total = Decimal(str(variation.price)) * item_data.quantity
-            total_price += item_total
-            
-            validated_items.append({
-                'dish': dish,
-                'variation': variation,
-                'quantity': item_data.quantity,
-                'price': Decimal(str(variation.price)),
-                'total': item_total,
-                'comment': getattr(item_data, 'comment', None),
-                'department': getattr(dish, 'department', 'kitchen'),  # Используем department из блюда или по умолчанию 'kitchen'
-                'estimated_preparation_time': getattr(dish, 'cooking_time', 15)  # Используем время приготовления из блюда или 15 мин по умолчанию
-            })
+        # Проверяем блюда и рассчитываем общую стоимость (пакетно)
+        validated_items, total_price = await OrderPricingService.price_items(
+            db, [item.model_dump() for item in order_data.items]
+        )
         
         # Создаем заказ
         new_order = Order(
@@ -403,37 +359,18 @@ async def create_order(
         await db.refresh(new_order)
         
         # Создаем позиции заказа
-        order_items = []
         for item_data in validated_items:
-            order_item = OrderItem(
-                order_id=new_order.id,
-                dish_id=item_data['dish'].id,
-                dish_variation_id=item_data['variation'].id,
-                quantity=item_data['quantity'],
-                price=item_data['price'],
-                total=item_data['total'],
-                comment=item_data.get('comment'),
-                status=OrderItemStatus.IN_PREPARATION,
-                department=item_data['department'],
-                estimated_preparation_time=item_data['estimated_preparation_time'],
-                preparation_started_at=moscow_now()
-            )
-            db.add(order_item)
-            order_items.append(order_item)
+            db.add(OrderPricingService.build_order_item(new_order.id, item_data))
         
         # Обновляем статус столика и привязываем заказ
         table.is_occupied = True
         table.current_order_id = new_order.id
         
         await db.commit()
+        notifier.publish_order_created(new_order.id, table.number, waiter_user.full_name)
         
         # Загружаем заказ с полной информацией
-        full_order_query = select(Order).options(
-            selectinload(Order.table),
-            selectinload(Order.waiter),
-            selectinload(Order.payment_method),
-            selectinload(Order.items).selectinload(OrderItem.dish)
-        ).where(Order.id == new_order.id)
+        full_order_query = select(Order).options(*load_options(Order, OrderWithDetails)).where(Order.id == new_order.id)
         
         full_order_result = await db.execute(full_order_query)
         full_order = full_order_result.scalar_one()
@@ -485,6 +422,8 @@ async def create_order(
     except HTTPException:
         # Перебрасываем HTTP исключения как есть
         raise
+    except OrderPricingError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         # Логируем неожиданные ошибки
         print(f"Error creating order: {e}")
@@ -505,23 +444,7 @@ async def get_active_orders_by_table(
     """
     Получить активные заказы для указанного столика
     """
-    query = select(Order).options(
-        selectinload(Order.table),
-        selectinload(Order.waiter),
-        selectinload(Order.payment_method),
-        selectinload(Order.items).selectinload(OrderItem.dish)
-    ).where(
-        Order.table_id == table_id,
-        Order.status.in_([
-            OrderStatus.PENDING, 
-            OrderStatus.IN_PROGRESS, 
-            OrderStatus.READY, 
-            OrderStatus.SERVED,
-            OrderStatus.DINING
-        ])
-    )
-    
-    result = await db.execute(query)
+    result = await db.execute(_active_table_orders_query(table_id))
     orders = result.scalars().all()
     
     return orders
@@ -536,15 +459,14 @@ async def get_order(
     """
     Получить информацию о заказе по ID
     """
-    query = select(Order).options(
-        selectinload(Order.table),
-        selectinload(Order.waiter),
-        selectinload(Order.payment_method),
-        selectinload(Order.items).selectinload(OrderItem.dish)
-    ).where(Order.id == order_id)
+    query = select(Order).options(*load_options(Order, OrderWithDetails)).where(Order.id == order_id)
     
     result = await db.execute(query)
     order = result.scalar_one_or_none()
+
+    if not order:
+        # Закрытые заказы старше archive_after_days лежат в архиве
+        order = await ArchiveService.get_archived_order(db, order_id)
     
     if not order:
         raise HTTPException(
@@ -660,6 +582,12 @@ async def update_order_status(
     
     await db.commit()
     
+    if old_status != order.status:
+        notifier.publish_order_status_changed(
+            order.id, old_status.value, order.status.value,
+            order.table.number if order.table else None
+        )
+    
     status_names = {
         OrderStatus.PENDING: "ожидает",
         OrderStatus.READY: "готов",
@@ -684,7 +612,7 @@ async def update_order_payment_status(
     """
     Обновить статус оплаты заказа (для официантов и администраторов)
     """
-    query = select(Order).where(Order.id == order_id)
+    query = select(Order).options(selectinload(Order.table)).where(Order.id == order_id)
     result = await db.execute(query)
     order = result.scalar_one_or_none()
     
@@ -756,6 +684,10 @@ async def update_order_payment_status(
                 table.current_order_id = None
     
     await db.commit()
+    notifier.publish_payment_status_changed(
+        order.id, order.payment_status.value,
+        order.table.number if order.table else None
+    )
     
     payment_names = {
         PaymentStatus.UNPAID: "не оплачен",
@@ -778,7 +710,7 @@ async def complete_order_payment(
     """
     Завершить оплату заказа с указанием способа оплаты
     """
-    query = select(Order).where(Order.id == order_id)
+    query = select(Order).options(selectinload(Order.table)).where(Order.id == order_id)
     result = await db.execute(query)
     order = result.scalar_one_or_none()
     
@@ -854,6 +786,10 @@ async def complete_order_payment(
                 table.current_order_id = None
     
     await db.commit()
+    notifier.publish_payment_status_changed(
+        order.id, order.payment_status.value,
+        order.table.number if order.table else None
+    )
     
     return APIResponse(
         message=f"Заказ #{order.id} успешно оплачен способом '{payment_method.name}'"
@@ -870,69 +806,20 @@ async def get_order_stats(
     """
     Получить статистику по заказам
     """
-    base_query = select(Order)
-    
-    # Фильтр по датам
-    if date_from:
-        base_query = base_query.where(Order.created_at >= date_from)
-    if date_to:
-        base_query = base_query.where(Order.created_at <= date_to)
-    
-    # Общее количество заказов
-    total_orders_query = select(func.count(Order.id))
-    if date_from:
-        total_orders_query = total_orders_query.where(Order.created_at >= date_from)
-    if date_to:
-        total_orders_query = total_orders_query.where(Order.created_at <= date_to)
-    
-    total_orders_result = await db.execute(total_orders_query)
-    total_orders = total_orders_result.scalar()
-    
-    # Заказы по статусам
-    status_queries = {}
-    for status in OrderStatus:
-        status_query = select(func.count(Order.id)).where(Order.status == status)
-        if date_from:
-            status_query = status_query.where(Order.created_at >= date_from)
-        if date_to:
-            status_query = status_query.where(Order.created_at <= date_to)
-        
-        status_result = await db.execute(status_query)
-        status_queries[status.value + '_orders'] = status_result.scalar()
-    
-    # Общая выручка и средний чек
-    revenue_query = select(func.sum(Order.total_price)).where(Order.payment_status == PaymentStatus.PAID)
-    if date_from:
-        revenue_query = revenue_query.where(Order.created_at >= date_from)
-    if date_to:
-        revenue_query = revenue_query.where(Order.created_at <= date_to)
-    
-    revenue_result = await db.execute(revenue_query)
-    total_revenue = revenue_result.scalar() or Decimal('0.00')
-    
-    # Среднее время приготовления
-    avg_time_query = select(func.avg(Order.time_to_serve)).where(Order.time_to_serve.isnot(None))
-    if date_from:
-        avg_time_query = avg_time_query.where(Order.created_at >= date_from)
-    if date_to:
-        avg_time_query = avg_time_query.where(Order.created_at <= date_to)
-    
-    avg_time_result = await db.execute(avg_time_query)
-    avg_cooking_time = avg_time_result.scalar()
-    
-    # Средний чек
-    paid_orders_count = status_queries.get('paid_orders', 0)
-    average_order_value = total_revenue / paid_orders_count if paid_orders_count > 0 else Decimal('0.00')
-    
+    summary = await StatisticsService.get_order_summary(db, date_from, date_to)
+    by_status = summary["by_status"]
+    avg_cooking_time = summary["average_time_to_serve"]
+
     return OrderStats(
-        total_orders=total_orders,
-        pending_orders=status_queries.get('pending_orders', 0),
-        in_progress_orders=status_queries.get('in_progress_orders', 0),
-        ready_orders=status_queries.get('ready_orders', 0),
-        served_orders=status_queries.get('served_orders', 0),
-        cancelled_orders=status_queries.get('cancelled_orders', 0),
-        total_revenue=total_revenue,
-        average_order_value=average_order_value,
+        total_orders=summary["total_orders"],
+        pending_orders=by_status[OrderStatus.PENDING],
+        ready_orders=by_status[OrderStatus.READY],
+        served_orders=by_status[OrderStatus.SERVED],
+        dining_orders=by_status[OrderStatus.DINING],
+        completed_orders=by_status[OrderStatus.COMPLETED],
+        cancelled_orders=by_status[OrderStatus.CANCELLED],
+        total_revenue=summary["total_revenue"],
+        average_order_value=summary["average_order_value"],
         average_cooking_time=int(avg_cooking_time) if avg_cooking_time else None
     )
 
@@ -947,83 +834,10 @@ async def create_delivery_order(
     Создать новый заказ с доставкой (для официантов и администраторов)
     """
     try:
-        # Для доставки не нужен столик, но проверяем блюда
-        total_price = Decimal('0.00')
-        validated_items = []
-        
-        for item_data in order_data.items:
-            dish_query = select(Dish).where(Dish.id == item_data.dish_id)
-            dish_result = await db.execute(dish_query)
-            dish = dish_result.scalar_one_or_none()
-            
-            if not dish:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Блюдо с ID {item_data.dish_id} не найдено"
-                )
-            
-            if not dish.is_available:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Блюдо '{dish.name}' недоступно"
-                )
-            
-            # Получаем вариацию блюда для цены
-            from ..models import DishVariation
-            
-            if hasattr(item_data, 'dish_variation_id') and item_data.dish_variation_id:
-                # Конкретная вариация указана
-                variation_query = select(DishVariation).where(
-                    DishVariation.id == item_data.dish_variation_id,
-                    DishVariation.dish_id == dish.id,
-                    DishVariation.is_available == True
-                )
-                variation_result = await db.execute(variation_query)
-                variation = variation_result.scalar_one_or_none()
-                
-                if not variation:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"Вариация блюда с ID {item_data.dish_variation_id} не найдена или недоступна"
-                    )
-            else:
-                # Берем дефолтную вариацию
-                default_variation_query = select(DishVariation).where(
-                    DishVariation.dish_id == dish.id,
-                    DishVariation.is_default == True,
-                    DishVariation.is_available == True
-                )
-                default_result = await db.execute(default_variation_query)
-                variation = default_result.scalar_one_or_none()
-                
-                if not variation:
-                    # Если нет дефолтной, берем первую доступную
-                    first_variation_query = select(DishVariation).where(
-                        DishVariation.dish_id == dish.id,
-                        DishVariation.is_available == True
-                    ).limit(1)
-                    first_result = await db.execute(first_variation_query)
-                    variation = first_result.scalar_one_or_none()
-                    
-                    if not variation:
-                        raise HTTPException(
-                            status_code=status.HTTP_400_BAD_REQUEST,
-                            detail=f"У блюда '{dish.name}' нет доступных вариаций"
-                        )
-            
-            item_total = Decimal(str(variation.price)) * item_data.quantity
-            total_price += item_total
-            
-            validated_items.append({
-                'dish': dish,
-                'variation': variation,
-                'quantity': item_data.quantity,
-                'price': Decimal(str(variation.price)),
-                'total': item_total,
-                'comment': getattr(item_data, 'comment', None),
-                'department': getattr(dish, 'department', 'kitchen'),  # Используем department из блюда или по умолчанию 'kitchen'
-                'estimated_preparation_time': getattr(dish, 'cooking_time', 15)  # Используем время приготовления из блюда или 15 мин по умолчанию
-            })
+        # Для доставки не нужен столик, но проверяем блюда (пакетно)
+        validated_items, total_price = await OrderPricingService.price_items(
+            db, [item.model_dump() for item in order_data.items]
+        )
         
         # Создаем заказ с доставкой
         new_order = Order(
@@ -1047,25 +861,11 @@ async def create_delivery_order(
         await db.refresh(new_order)
         
         # Создаем позиции заказа
-        order_items = []
         for item_data in validated_items:
-            order_item = OrderItem(
-                order_id=new_order.id,
-                dish_id=item_data['dish'].id,
-                dish_variation_id=item_data['variation'].id,
-                quantity=item_data['quantity'],
-                price=item_data['price'],
-                total=item_data['total'],
-                comment=item_data.get('comment'),
-                status=OrderItemStatus.IN_PREPARATION,
-                department=item_data['department'],
-                estimated_preparation_time=item_data['estimated_preparation_time'],
-                preparation_started_at=moscow_now()
-            )
-            db.add(order_item)
-            order_items.append(order_item)
+            db.add(OrderPricingService.build_order_item(new_order.id, item_data))
         
         await db.commit()
+        notifier.publish_order_created(new_order.id, None, waiter_user.full_name)
         
         # Загружаем заказ с полной информацией
         full_order_query = select(Order).options(
@@ -1123,6 +923,8 @@ async def create_delivery_order(
     except HTTPException:
         # Перебрасываем HTTP исключения как есть
         raise
+    except OrderPricingError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     except Exception as e:
         # Логируем неожиданные ошибки
         print(f"Error creating delivery order: {e}")
@@ -1160,14 +962,20 @@ async def cancel_order(
         )
     
     # Отменяем заказ
+    old_status = order.status
     order.status = OrderStatus.CANCELLED
     order.cancelled_at = moscow_now()
     
-    # Освобождаем столик
-    order.table.is_occupied = False
-    order.table.current_order_id = None
+    # Освобождаем столик (у заказов на доставку столика нет)
+    if order.table:
+        order.table.is_occupied = False
+        order.table.current_order_id = None
     
     await db.commit()
+    notifier.publish_order_status_changed(
+        order.id, old_status.value, order.status.value,
+        order.table.number if order.table else None
+    )
     
     return APIResponse(
         message=f"Заказ #{order.id} отменен"
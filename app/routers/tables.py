@@ -17,6 +17,8 @@ from ..schemas import (
 )
 from ..config import settings
 from ..services.locations import check_location_has_active_orders
+from ..services.row_counts import RowCountService
+from ..pagination import CountMode, read_cursor, keyset_page, keyset_result
 
 
 router = APIRouter()
@@ -30,42 +32,50 @@ async def get_tables(
     limit: int = Query(100, ge=1, le=100),
     location_id: Optional[int] = Query(None),
     is_occupied: Optional[bool] = Query(None),
-    is_active: Optional[bool] = Query(None)
+    is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None, description="Постраничный вывод по курсору: пустой - первая страница, дальше - next_cursor"),
+    count: Optional[CountMode] = Query(None, description="total: exact | cached | estimated | none")
 ):
     """
     Получить список столиков с фильтрацией
+
+    Без cursor - skip/limit с сортировкой по номеру. С cursor - страницы
+    по (created_at, id) без OFFSET, total только по запросу (count).
     """
-    query = select(Table).options(selectinload(Table.location_obj))
+    conditions = []
     
     # Фильтры
     if location_id is not None:
-        query = query.where(Table.location_id == location_id)
+        conditions.append(Table.location_id == location_id)
     if is_occupied is not None:
-        query = query.where(Table.is_occupied == is_occupied)
+        conditions.append(Table.is_occupied == is_occupied)
     if is_active is not None:
-        query = query.where(Table.is_active == is_active)
+        conditions.append(Table.is_active == is_active)
     
-    # Сортировка по номеру столика
-    query = query.order_by(Table.number)
+    query = select(Table).options(selectinload(Table.location_obj)).where(*conditions)
     
     # Получение общего количества
-    count_query = select(func.count(Table.id))
-    if location_id is not None:
-        count_query = count_query.where(Table.location_id == location_id)
-    if is_occupied is not None:
-        count_query = count_query.where(Table.is_occupied == is_occupied)
-    if is_active is not None:
-        count_query = count_query.where(Table.is_active == is_active)
-    
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    total, estimated = await RowCountService.count(
+        db, Table, conditions,
+        count or (CountMode.EXACT if cursor is None else CountMode.NONE),
+        {"location_id": location_id, "is_occupied": is_occupied, "is_active": is_active}
+    )
     
-    # Пагинация
-    query = query.offset(skip).limit(limit)
+    if cursor is not None:
+        try:
+            query = keyset_page(query, Table, read_cursor(cursor), limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        result = await db.execute(query)
+        tables, next_cursor = keyset_result(list(result.scalars().all()), limit)
+        return TableList(tables=tables, total=total, total_estimated=estimated, next_cursor=next_cursor)
+    
+    # Сортировка по номеру столика и пагинация
+    query = query.order_by(Table.number).offset(skip).limit(limit)
     result = await db.execute(query)
     tables = result.scalars().all()
     
-    return TableList(tables=tables, total=total)
+    return TableList(tables=tables, total=total, total_estimated=estimated)
 
 
 @router.post("/", response_model=TableSchema)
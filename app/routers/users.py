@@ -13,8 +13,10 @@ from ..schemas import (
     UserCreate, UserUpdate, UserChangePassword, User as UserSchema, 
     UserList, APIResponse
 )
-from ..services.auth import AuthService
+from ..services.auth import AuthService, principal_cache
 from ..deps import AdminUser, DatabaseSession, CurrentUser
+from ..services.row_counts import RowCountService
+from ..pagination import CountMode, read_cursor, keyset_page, keyset_result
 
 
 router = APIRouter()
@@ -118,11 +120,16 @@ async def get_users(
     limit: int = Query(100, ge=1, le=100),
     role: Optional[UserRole] = None,
     is_active: Optional[bool] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Постраничный вывод по курсору: пустой - первая страница, дальше - next_cursor"),
+    count: Optional[CountMode] = Query(None, description="total: exact | cached | estimated | none")
 ):
     """
     Получение списка пользователей с фильтрацией
     Только для администраторов
+
+    С cursor - страницы по (created_at, id) от новых к старым без OFFSET,
+    total только по запросу (count).
     """
     query = select(User)
     
@@ -146,18 +153,32 @@ async def get_users(
         query = query.where(and_(*conditions))
     
     # Подсчет общего количества
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    total, estimated = await RowCountService.count(
+        db, User, conditions,
+        count or (CountMode.EXACT if cursor is None else CountMode.NONE),
+        {"role": role, "is_active": is_active, "search": search},
+        estimable=not search
+    )
     
-    # Получение пользователей с пагинацией
-    query = query.offset(skip).limit(limit).order_by(User.created_at.desc())
-    result = await db.execute(query)
-    users = result.scalars().all()
+    next_cursor = None
+    if cursor is not None:
+        try:
+            query = keyset_page(query, User, read_cursor(cursor), limit, descending=True)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        result = await db.execute(query)
+        users, next_cursor = keyset_result(list(result.scalars().all()), limit)
+    else:
+        # Получение пользователей с пагинацией
+        query = query.offset(skip).limit(limit).order_by(User.created_at.desc())
+        result = await db.execute(query)
+        users = result.scalars().all()
     
     return UserList(
         users=[UserSchema.model_validate(user) for user in users],
-        total=total
+        total=total,
+        total_estimated=estimated,
+        next_cursor=next_cursor
     )
 
 
@@ -195,7 +216,7 @@ async def create_user(
     # Создание пользователя
     user = User(
         username=user_data.username,
-        password_hash=AuthService.hash_password(user_data.password),
+        password_hash=await AuthService.hash_password_async(user_data.password),
         full_name=user_data.full_name,
         role=user_data.role,
         phone=user_data.phone,
@@ -332,6 +353,7 @@ async def update_user(
         setattr(user, field, value)
     
     await db.commit()
+    principal_cache.invalidate(user.id)
     await db.refresh(user)
     
     return UserSchema.model_validate(user)
@@ -360,15 +382,16 @@ async def change_user_password(
         )
     
     # Проверка текущего пароля
-    if not AuthService.verify_password(password_data.current_password, user.password_hash):
+    if not await AuthService.verify_password_async(password_data.current_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Неверный текущий пароль"
         )
     
     # Установка нового пароля
-    user.password_hash = AuthService.hash_password(password_data.new_password)
+    user.password_hash = await AuthService.hash_password_async(password_data.new_password)
     await db.commit()
+    principal_cache.invalidate(user.id)
     
     return APIResponse(
         success=True,
@@ -425,6 +448,7 @@ async def delete_user(
     user.is_active = False
     user.shift_active = False
     await db.commit()
+    principal_cache.invalidate(user.id)
     
     return APIResponse(
         success=True,
@@ -2,7 +2,8 @@
 QRes OS 4 - WebSocket Router
 WebSocket для real-time коммуникации между официантами и кухней
 """
-from typing import Dict, List
+from typing import Dict, List, Optional, Iterable, Deque, Tuple
+from collections import deque
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,126 +11,307 @@ import json
 import asyncio
 from datetime import datetime
 
-from ..deps import DatabaseSession
+from ..config import settings
+from ..database import AsyncSessionLocal
 from ..services.auth import AuthService
+from ..services.kitchen import KitchenService
 from ..models import User, UserRole
 from ..schemas import OrderWebSocketMessage
+from ..serialization import dumps_text, loads
 
 
 router = APIRouter()
 security = HTTPBearer()
 
+# Политики обработки медленных клиентов
+SLOW_CONSUMER_POLICIES = ("coalesce", "drop_oldest", "disconnect")
+
+
+class ClientConnection:
+    """
+    WebSocket соединение с собственной исходящей очередью
+
+    Сообщения не отправляются напрямую из рассылки: они кладутся в
+    ограниченную очередь, которую разбирает отдельная задача-писатель.
+    Медленный клиент задерживает только свою очередь.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user: User,
+        max_queue_size: int,
+        policy: str,
+        send_timeout: float
+    ):
+        self.websocket = websocket
+        self.user_id = user.id
+        self.username = user.username
+        self.role = user.role
+        self.max_queue_size = max(1, max_queue_size)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        
+        # Очередь: (ключ объединения, текст сообщения)
+        self._queue: Deque[Tuple[Optional[str], str]] = deque()
+        self._has_messages = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None  # ссылка держит задачу закрытия до завершения
+        self.closed = False
+        
+        # Счетчики отставания
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0
+        self.last_sent_at: Optional[datetime] = None
+    
+    @property
+    def lag(self) -> int:
+        """Количество неотправленных сообщений"""
+        return len(self._queue)
+    
+    def start(self) -> None:
+        """Запустить задачу-писатель"""
+        self._writer = asyncio.create_task(self._write_loop())
+    
+    def enqueue(self, message: str, key: Optional[str] = None) -> bool:
+        """
+        Поставить сообщение в очередь соединения
+        
+        Args:
+            message: Готовый JSON текст (сериализуется один раз на событие)
+            key: Ключ объединения: более новое сообщение с тем же ключом
+                 заменяет еще не отправленное (политика coalesce)
+        
+        Returns:
+            False если соединение закрыто или отключено как медленное
+        """
+        if self.closed:
+            return False
+        
+        if key is not None and self.policy == "coalesce":
+            for index, (queued_key, _) in enumerate(self._queue):
+                if queued_key == key:
+                    self._queue[index] = (key, message)
+                    self.coalesced += 1
+                    return True
+        
+        if len(self._queue) >= self.max_queue_size:
+            if self.policy == "disconnect":
+                self.dropped += len(self._queue)
+                self.close()
+                return False
+            # coalesce / drop_oldest: отбрасываем самое старое сообщение
+            self._queue.popleft()
+            self.dropped += 1
+        
+        self._queue.append((key, message))
+        self.max_lag = max(self.max_lag, len(self._queue))
+        self._has_messages.set()
+        return True
+    
+    def close(self) -> None:
+        """Остановить писателя и очистить очередь"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._has_messages.set()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._closer = asyncio.create_task(self._close_socket())
+        self._closer.add_done_callback(self._log_close)
+    
+    async def _close_socket(self) -> None:
+        """Закрыть сокет (клиент мог уже отключиться - это не ошибка)"""
+        try:
+            await self.websocket.close()
+        except (RuntimeError, WebSocketDisconnect):
+            pass
+    
+    def _log_close(self, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        print(f"⚠️ WebSocket {self.username}: ошибка закрытия ({type(error).__name__}: {error})")
+    
+    async def _write_loop(self) -> None:
+        """Задача-писатель: отправка сообщений из очереди по одному"""
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._has_messages.clear()
+                    await self._has_messages.wait()
+                    continue
+                
+                _, message = self._queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+                self.sent += 1
+                self.last_sent_at = datetime.utcnow()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Ошибка или таймаут отправки - клиент считается отключенным
+            print(f"⚠️ WebSocket {self.username}: отправка прервана ({type(e).__name__})")
+            self.close()
+    
+    def stats(self) -> dict:
+        """Счетчики соединения"""
+        return {
+            "user_id": self.user_id,
+            "username": self.username,
+            "role": self.role.value,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "last_sent_at": self.last_sent_at.isoformat() if self.last_sent_at else None
+        }
+
 
 class ConnectionManager:
-    """Менеджер WebSocket соединений"""
+    """
+    Менеджер WebSocket соединений
+    
+    Рассылка только раскладывает уже сериализованный текст по очередям
+    соединений и не ждет сокетов. Политика для медленных клиентов
+    (settings.websocket_slow_consumer_policy):
+    - coalesce: новое сообщение с тем же ключом заменяет неотправленное,
+      при переполнении отбрасывается самое старое
+    - drop_oldest: при переполнении отбрасывается самое старое
+    - disconnect: при переполнении клиент отключается
+    """
     
-    def __init__(self):
-        # Словарь активных соединений: user_id -> websocket
-        self.active_connections: Dict[int, WebSocket] = {}
+    def __init__(
+        self,
+        max_queue_size: Optional[int] = None,
+        policy: Optional[str] = None,
+        send_timeout: Optional[float] = None
+    ):
+        self.max_queue_size = max_queue_size or settings.websocket_send_queue_size
+        self.policy = policy or settings.websocket_slow_consumer_policy
+        self.send_timeout = send_timeout or settings.websocket_send_timeout
+        if self.policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Неизвестная политика для медленных клиентов: {self.policy}")
+        
+        # Словарь активных соединений: user_id -> соединение
+        self.active_connections: Dict[int, ClientConnection] = {}
         # Группы по ролям
-        self.waiters: Dict[int, WebSocket] = {}
-        self.kitchen: Dict[int, WebSocket] = {}
-        self.admins: Dict[int, WebSocket] = {}
+        self.waiters: Dict[int, ClientConnection] = {}
+        self.kitchen: Dict[int, ClientConnection] = {}
+        self.admins: Dict[int, ClientConnection] = {}
     
-    async def connect(self, websocket: WebSocket, user: User):
+    async def connect(self, websocket: WebSocket, user: User) -> ClientConnection:
         """Подключение пользователя"""
         await websocket.accept()
         
         # Отключаем предыдущее соединение если есть
-        if user.id in self.active_connections:
-            try:
-                await self.active_connections[user.id].close()
-            except:
-                pass
+        previous = self.active_connections.get(user.id)
+        if previous is not None:
+            previous.close()
+        
+        connection = ClientConnection(
+            websocket, user, self.max_queue_size, self.policy, self.send_timeout
+        )
+        connection.start()
         
         # Добавляем новое соединение
-        self.active_connections[user.id] = websocket
+        self.active_connections[user.id] = connection
         
         # Добавляем в соответствующую группу по роли
-        if user.role == UserRole.WAITER:
-            self.waiters[user.id] = websocket
-        elif user.role == UserRole.KITCHEN:
-            self.kitchen[user.id] = websocket
-        elif user.role == UserRole.ADMIN:
-            self.admins[user.id] = websocket
+        group = self._group_for(user.role)
+        if group is not None:
+            group[user.id] = connection
         
         print(f"🔌 Пользователь {user.username} ({user.role}) подключился к WebSocket")
+        return connection
     
-    def disconnect(self, user_id: int):
-        """Отключение пользователя"""
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+    def disconnect(self, user_id: int, connection: Optional[ClientConnection] = None):
+        """
+        Отключение пользователя
         
-        if user_id in self.waiters:
-            del self.waiters[user_id]
+        Если передано соединение, удаляется только оно (а не более новое
+        соединение того же пользователя, открытое при переподключении)
+        """
+        current = self.active_connections.get(user_id)
+        if current is None or (connection is not None and current is not connection):
+            if connection is not None:
+                connection.close()
+            return
         
-        if user_id in self.kitchen:
-            del self.kitchen[user_id]
-        
-        if user_id in self.admins:
-            del self.admins[user_id]
+        current.close()
+        for group in (self.active_connections, self.waiters, self.kitchen, self.admins):
+            group.pop(user_id, None)
         
         print(f"❌ Пользователь {user_id} отключился от WebSocket")
     
+    def _group_for(self, role: UserRole) -> Optional[Dict[int, ClientConnection]]:
+        """Группа соединений по роли"""
+        if role == UserRole.WAITER:
+            return self.waiters
+        if role == UserRole.KITCHEN:
+            return self.kitchen
+        if role == UserRole.ADMIN:
+            return self.admins
+        return None
+    
+    def fan_out(
+        self,
+        message: str,
+        roles: Iterable[UserRole] = (),
+        user_ids: Iterable[int] = (),
+        everyone: bool = False,
+        key: Optional[str] = None
+    ) -> int:
+        """
+        Разложить сообщение по очередям получателей (без ожидания отправки)
+        
+        Получатель, попавший в несколько групп, получает сообщение один раз.
+        
+        Returns:
+            Количество соединений, принявших сообщение
+        """
+        if everyone:
+            recipients = list(self.active_connections.values())
+        else:
+            unique: Dict[int, ClientConnection] = {}
+            for role in roles:
+                unique.update(self._group_for(role) or {})
+            for user_id in user_ids:
+                connection = self.active_connections.get(user_id)
+                if connection is not None:
+                    unique[user_id] = connection
+            recipients = list(unique.values())
+        
+        accepted = 0
+        for connection in recipients:
+            if connection.enqueue(message, key):
+                accepted += 1
+            elif connection.closed:
+                self.disconnect(connection.user_id, connection)
+        return accepted
+    
     async def send_personal_message(self, message: str, user_id: int):
         """Отправка личного сообщения"""
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_text(message)
-            except:
-                self.disconnect(user_id)
+        self.fan_out(message, user_ids=[user_id])
     
     async def send_to_waiters(self, message: str):
         """Отправка сообщения всем официантам"""
-        disconnected = []
-        for user_id, websocket in self.waiters.items():
-            try:
-                await websocket.send_text(message)
-            except:
-                disconnected.append(user_id)
-        
-        # Удаляем отключенных
-        for user_id in disconnected:
-            self.disconnect(user_id)
+        self.fan_out(message, roles=[UserRole.WAITER])
     
     async def send_to_kitchen(self, message: str):
         """Отправка сообщения всей кухне"""
-        disconnected = []
-        for user_id, websocket in self.kitchen.items():
-            try:
-                await websocket.send_text(message)
-            except:
-                disconnected.append(user_id)
-        
-        # Удаляем отключенных
-        for user_id in disconnected:
-            self.disconnect(user_id)
+        self.fan_out(message, roles=[UserRole.KITCHEN])
     
     async def send_to_admins(self, message: str):
         """Отправка сообщения всем администраторам"""
-        disconnected = []
-        for user_id, websocket in self.admins.items():
-            try:
-                await websocket.send_text(message)
-            except:
-                disconnected.append(user_id)
-        
-        # Удаляем отключенных
-        for user_id in disconnected:
-            self.disconnect(user_id)
+        self.fan_out(message, roles=[UserRole.ADMIN])
     
     async def broadcast(self, message: str):
         """Отправка сообщения всем подключенным"""
-        disconnected = []
-        for user_id, websocket in self.active_connections.items():
-            try:
-                await websocket.send_text(message)
-            except:
-                disconnected.append(user_id)
-        
-        # Удаляем отключенных
-        for user_id in disconnected:
-            self.disconnect(user_id)
+        self.fan_out(message, everyone=True)
     
     def get_active_users(self) -> dict:
         """Получение статистики активных пользователей"""
@@ -139,6 +321,10 @@ class ConnectionManager:
             "kitchen": len(self.kitchen),
             "admins": len(self.admins)
         }
+    
+    def get_connection_stats(self) -> List[dict]:
+        """Счетчики отставания по каждому соединению"""
+        return [connection.stats() for connection in self.active_connections.values()]
 
 
 # Глобальный менеджер соединений
@@ -180,12 +366,15 @@ async def get_current_user_ws(
 @router.websocket("/orders")
 async def websocket_orders(
     websocket: WebSocket,
-    token: str,
-    db: DatabaseSession
+    token: str
 ):
     """
     WebSocket эндпоинт для уведомлений о заказах
     
+    Соединение живет всю смену, поэтому сессия БД на него не выделяется:
+    короткая сессия открывается только для аутентификации, а сообщения,
+    которым нужна БД (get_order), берут отдельную сессию из AsyncSessionLocal.
+    
     Параметры:
     - token: JWT токен для аутентификации
     
@@ -194,13 +383,16 @@ async def websocket_orders(
     - order_updated: Заказ обновлен
     - order_status_changed: Изменен статус заказа
     - item_status_changed: Изменен статус позиции заказа
+    - order_ready: Заказ готов (официанту заказа)
+    - payment_status_changed: Изменен статус оплаты
     """
     
-    # Аутентификация
-    user = await get_current_user_ws(websocket, token, db)
+    # Аутентификация (сессия закрывается сразу после проверки)
+    async with AsyncSessionLocal() as db:
+        user = await get_current_user_ws(websocket, token, db)
     
-    # Подключение
-    await manager.connect(websocket, user)
+    # Подключение (ответы клиенту идут через ту же исходящую очередь, что и рассылка)
+    connection = await manager.connect(websocket, user)
     
     try:
         # Отправляем приветственное сообщение
@@ -210,14 +402,14 @@ async def websocket_orders(
             "role": user.role.value,
             "timestamp": datetime.utcnow().isoformat()
         }
-        await websocket.send_text(json.dumps(welcome_message, ensure_ascii=False))
+        connection.enqueue(dumps_text(welcome_message))
         
         # Основной цикл обработки сообщений
         while True:
             try:
                 # Ждем сообщения от клиента
                 data = await websocket.receive_text()
-                message_data = json.loads(data)
+                message_data = loads(data)
                 
                 # Обрабатываем разные типы сообщений
                 message_type = message_data.get("type")
@@ -228,17 +420,40 @@ async def websocket_orders(
                         "type": "pong",
                         "timestamp": datetime.utcnow().isoformat()
                     }
-                    await websocket.send_text(json.dumps(pong_message))
+                    connection.enqueue(dumps_text(pong_message))
                 
                 elif message_type == "get_stats":
                     # Статистика активных пользователей
                     stats = manager.get_active_users()
+                    if user.role == UserRole.ADMIN:
+                        # Отставание клиентов и очередь уведомлений
+                        stats["connections"] = manager.get_connection_stats()
+                        stats["notifier"] = notifier.stats()
                     stats_message = {
                         "type": "stats",
                         "data": stats,
                         "timestamp": datetime.utcnow().isoformat()
                     }
-                    await websocket.send_text(json.dumps(stats_message, ensure_ascii=False))
+                    connection.enqueue(dumps_text(stats_message))
+                
+                elif message_type == "get_order":
+                    # Прогресс заказа (сессия БД только на время запроса)
+                    order_id = message_data.get("order_id")
+                    if not isinstance(order_id, int):
+                        raise ValueError("order_id должен быть целым числом")
+                    
+                    async with AsyncSessionLocal() as db:
+                        progress = await KitchenService.get_order_progress(order_id, db)
+                    
+                    if progress is None:
+                        raise ValueError(f"Заказ #{order_id} не найден")
+                    
+                    order_message = {
+                        "type": "order",
+                        "data": progress,
+                        "timestamp": datetime.utcnow().isoformat()
+                    }
+                    connection.enqueue(dumps_text(order_message))
                 
                 elif message_type == "broadcast" and user.role == UserRole.ADMIN:
                     # Широковещательное сообщение (только для админов)
@@ -248,7 +463,7 @@ async def websocket_orders(
                         "from": user.full_name,
                         "timestamp": datetime.utcnow().isoformat()
                     }
-                    await manager.broadcast(json.dumps(broadcast_message, ensure_ascii=False))
+                    await manager.broadcast(dumps_text(broadcast_message))
                 
                 else:
                     # Неизвестный тип сообщения
@@ -257,7 +472,10 @@ async def websocket_orders(
                         "message": f"Неизвестный тип сообщения: {message_type}",
                         "timestamp": datetime.utcnow().isoformat()
                     }
-                    await websocket.send_text(json.dumps(error_message, ensure_ascii=False))
+                    connection.enqueue(dumps_text(error_message))
+            
+            except WebSocketDisconnect:
+                raise
             
             except json.JSONDecodeError:
                 error_message = {
@@ -265,43 +483,183 @@ async def websocket_orders(
                     "message": "Неверный формат JSON",
                     "timestamp": datetime.utcnow().isoformat()
                 }
-                await websocket.send_text(json.dumps(error_message, ensure_ascii=False))
+                connection.enqueue(dumps_text(error_message))
+            
+            except ValueError as e:
+                error_message = {
+                    "type": "error",
+                    "message": str(e),
+                    "timestamp": datetime.utcnow().isoformat()
+                }
+                connection.enqueue(dumps_text(error_message))
             
             except Exception as e:
                 print(f"Ошибка в WebSocket: {e}")
                 break
     
     except WebSocketDisconnect:
-        manager.disconnect(user.id)
+        pass
     except Exception as e:
         print(f"Ошибка WebSocket соединения: {e}")
-        manager.disconnect(user.id)
+    finally:
+        manager.disconnect(user.id, connection)
 
 
 # Функции для отправки уведомлений из других частей приложения
 class WebSocketNotifier:
-    """Класс для отправки уведомлений через WebSocket"""
+    """
+    Класс для отправки уведомлений через WebSocket
+
+    Обработчики HTTP запросов вызывают синхронные методы publish_*() после
+    commit: событие кладется в очередь asyncio и сразу возвращает управление.
+    Рассылку по сокетам выполняет фоновая задача-диспетчер, поэтому медленный
+    клиент никогда не задерживает ответ на HTTP запрос.
+    """
+    
+    def __init__(self, max_queue_size: int = 1000):
+        self._max_queue_size = max_queue_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._dispatcher: Optional[asyncio.Task] = None
+        # Счетчики для мониторинга
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+    
+    def start(self) -> None:
+        """Запустить фоновую задачу рассылки (идемпотентно)"""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is not None and self._dispatcher.get_loop() is not loop:
+            # Приложение перезапущено в другом event loop: очередь привязана к старому
+            self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+    
+    async def stop(self) -> None:
+        """Остановить фоновую задачу рассылки"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+            # Новый запуск может быть в другом event loop
+            self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+    
+    def stats(self) -> dict:
+        """Статистика очереди уведомлений"""
+        return {
+            "queued": self._queue.qsize(),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+    
+    def _publish(self, handler, *args) -> None:
+        """Поставить событие в очередь (не блокирует вызывающий код)"""
+        try:
+            self.start()
+        except RuntimeError:
+            # Нет запущенного event loop (например, вызов из синхронного скрипта)
+            return
+        
+        try:
+            self._queue.put_nowait((handler, args))
+            self.published += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+    
+    async def _dispatch(self) -> None:
+        """Основной цикл рассылки событий из очереди"""
+        while True:
+            handler, args = await self._queue.get()
+            try:
+                await handler(*args)
+                self.delivered += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Ошибка рассылки WebSocket уведомления: {e}")
+            finally:
+                self._queue.task_done()
+    
+    # Публикация событий (вызывать после commit)
+    
+    def publish_order_created(self, order_id: int, table_number: Optional[int], waiter_name: str) -> None:
+        """Опубликовать создание заказа"""
+        self._publish(self.notify_order_created, order_id, table_number, waiter_name)
+    
+    def publish_order_updated(self, order_id: int, table_number: Optional[int], items_added: int) -> None:
+        """Опубликовать дозаказ (добавление позиций в существующий заказ)"""
+        self._publish(self.notify_order_updated, order_id, table_number, items_added)
+    
+    def publish_order_ready(self, order_id: int, table_number: Optional[int], waiter_id: int) -> None:
+        """Опубликовать готовность заказа"""
+        self._publish(self.notify_order_ready, order_id, table_number, waiter_id)
+    
+    def publish_order_status_changed(
+        self, order_id: int, old_status: str, new_status: str, table_number: Optional[int]
+    ) -> None:
+        """Опубликовать изменение статуса заказа"""
+        self._publish(self.notify_order_status_changed, order_id, old_status, new_status, table_number)
+    
+    def publish_item_status_changed(
+        self, item_id: int, order_id: int, dish_name: str, department: str,
+        old_status: str, new_status: str, table_number: Optional[int]
+    ) -> None:
+        """Опубликовать изменение статуса позиции заказа"""
+        self._publish(
+            self.notify_item_status_changed,
+            item_id, order_id, dish_name, department, old_status, new_status, table_number
+        )
+    
+    def publish_payment_status_changed(
+        self, order_id: int, payment_status: str, table_number: Optional[int]
+    ) -> None:
+        """Опубликовать изменение статуса оплаты заказа"""
+        self._publish(self.notify_payment_status_changed, order_id, payment_status, table_number)
+    
+    # Рассылка (выполняется диспетчером)
     
     @staticmethod
-    async def notify_order_created(order_id: int, table_number: int, waiter_name: str):
+    async def notify_order_created(order_id: int, table_number: Optional[int], waiter_name: str):
         """Уведомление о создании нового заказа"""
+        source = f"от столика {table_number}" if table_number is not None else "на доставку"
         message = {
             "type": "order_created",
             "data": {
                 "order_id": order_id,
                 "table_number": table_number,
                 "waiter_name": waiter_name,
-                "message": f"Новый заказ #{order_id} от столика {table_number}"
+                "message": f"Новый заказ #{order_id} {source}"
             },
             "timestamp": datetime.utcnow().isoformat()
         }
         
         # Отправляем кухне и админам
-        await manager.send_to_kitchen(json.dumps(message, ensure_ascii=False))
-        await manager.send_to_admins(json.dumps(message, ensure_ascii=False))
+        manager.fan_out(dumps_text(message), roles=[UserRole.KITCHEN, UserRole.ADMIN])
     
     @staticmethod
-    async def notify_order_ready(order_id: int, table_number: int, waiter_id: int):
+    async def notify_order_updated(order_id: int, table_number: Optional[int], items_added: int):
+        """Уведомление о дозаказе"""
+        message = {
+            "type": "order_updated",
+            "data": {
+                "order_id": order_id,
+                "table_number": table_number,
+                "items_added": items_added,
+                "message": f"Дозаказ в заказ #{order_id}: +{items_added} поз."
+            },
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        # Отправляем кухне и админам
+        manager.fan_out(dumps_text(message), roles=[UserRole.KITCHEN, UserRole.ADMIN])
+    
+    @staticmethod
+    async def notify_order_ready(order_id: int, table_number: Optional[int], waiter_id: int):
         """Уведомление о готовности заказа"""
         message = {
             "type": "order_ready",
@@ -314,11 +672,15 @@ class WebSocketNotifier:
         }
         
         # Отправляем конкретному официанту и админам
-        await manager.send_personal_message(json.dumps(message, ensure_ascii=False), waiter_id)
-        await manager.send_to_admins(json.dumps(message, ensure_ascii=False))
+        manager.fan_out(
+            dumps_text(message),
+            roles=[UserRole.ADMIN],
+            user_ids=[waiter_id],
+            key=f"order_ready:{order_id}"
+        )
     
     @staticmethod
-    async def notify_order_status_changed(order_id: int, old_status: str, new_status: str, table_number: int):
+    async def notify_order_status_changed(order_id: int, old_status: str, new_status: str, table_number: Optional[int]):
         """Уведомление об изменении статуса заказа"""
         message = {
             "type": "order_status_changed",
@@ -332,8 +694,61 @@ class WebSocketNotifier:
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        # Отправляем всем
-        await manager.broadcast(json.dumps(message, ensure_ascii=False))
+        # Отправляем всем (неотправленный старый статус заменяется новым)
+        manager.fan_out(
+            dumps_text(message),
+            everyone=True,
+            key=f"order_status:{order_id}"
+        )
+    
+    @staticmethod
+    async def notify_item_status_changed(
+        item_id: int, order_id: int, dish_name: str, department: str,
+        old_status: str, new_status: str, table_number: Optional[int]
+    ):
+        """Уведомление об изменении статуса позиции заказа"""
+        message = {
+            "type": "item_status_changed",
+            "data": {
+                "item_id": item_id,
+                "order_id": order_id,
+                "dish_name": dish_name,
+                "department": department,
+                "old_status": old_status,
+                "new_status": new_status,
+                "table_number": table_number,
+                "message": f"{dish_name} (заказ #{order_id}): {old_status} → {new_status}"
+            },
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        # Отправляем всем: доски цехов и планшеты официантов
+        manager.fan_out(
+            dumps_text(message),
+            everyone=True,
+            key=f"item_status:{item_id}"
+        )
+    
+    @staticmethod
+    async def notify_payment_status_changed(order_id: int, payment_status: str, table_number: Optional[int]):
+        """Уведомление об изменении статуса оплаты"""
+        message = {
+            "type": "payment_status_changed",
+            "data": {
+                "order_id": order_id,
+                "payment_status": payment_status,
+                "table_number": table_number,
+                "message": f"Заказ #{order_id}: оплата {payment_status}"
+            },
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        # Отправляем официантам и админам
+        manager.fan_out(
+            dumps_text(message),
+            roles=[UserRole.WAITER, UserRole.ADMIN],
+            key=f"payment:{order_id}"
+        )
 
 
 # Экспортируем нотификатор для использования в других роутерах
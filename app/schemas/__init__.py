@@ -39,7 +39,7 @@ from .dish_variation import (
 
 # Order schemas
 from .order import (
-    Order, OrderCreate, OrderUpdate, OrderWithDetails,
+    Order, OrderCreate, OrderUpdate, OrderWithDetails, OrderWithItems,
     OrderStatusUpdate, OrderPaymentUpdate, OrderPaymentComplete, OrderList, OrderStats,
     OrderWebSocketMessage, DeliveryOrderCreate, DeliveryOrderResponse
 )
@@ -79,7 +79,7 @@ __all__ = [
     "DishAvailabilityUpdate", "DishList", "MenuResponse",
     
     # Order
-    "Order", "OrderCreate", "OrderUpdate", "OrderWithDetails",
+    "Order", "OrderCreate", "OrderUpdate", "OrderWithDetails", "OrderWithItems",
     "OrderItem", "OrderItemCreate", "OrderItemUpdate", "OrderItemWithDish",
     "OrderStatusUpdate", "OrderPaymentUpdate", "OrderPaymentComplete", "OrderList", "OrderStats",
     "OrderWebSocketMessage", "DeliveryOrderCreate", "DeliveryOrderResponse",
@@ -72,7 +72,9 @@ class DishAvailabilityUpdate(BaseModel):
 class DishList(BaseModel):
     """Схема списка блюд"""
     dishes: List[Dish]
-    total: int
+    total: Optional[int] = None  # None - не запрашивался (count=none)
+    total_estimated: bool = False  # total приблизительный (count=cached/estimated)
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (режим cursor)
 
 
 class MenuResponse(BaseModel):
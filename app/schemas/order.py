@@ -3,7 +3,7 @@ QRes OS 4 - Order Schemas
 Pydantic схемы для заказов и позиций заказов
 """
 from pydantic import BaseModel, ConfigDict, Field, validator
-from typing import Optional, List
+from typing import ClassVar, Optional, List, Tuple, Union
 from datetime import datetime
 from decimal import Decimal
 from ..models.order import OrderStatus, PaymentStatus, OrderType
@@ -37,6 +37,9 @@ class Order(OrderBase):
     """Полная схема заказа для ответов"""
     model_config = ConfigDict(from_attributes=True)
     
+    # Связи модели, которые читает схема (см. app/loaders.py)
+    load_relations: ClassVar[Tuple[str, ...]] = ()
+    
     id: int
     waiter_id: int
     status: OrderStatus
@@ -51,8 +54,17 @@ class Order(OrderBase):
     updated_at: datetime
 
 
+class OrderWithItems(Order):
+    """Схема заказа с позициями (список с expand=items)"""
+    load_relations: ClassVar[Tuple[str, ...]] = ("items.dish",)
+    
+    items: List[OrderItemWithDish] = []
+
+
 class OrderWithDetails(Order):
     """Схема заказа с детальной информацией"""
+    load_relations: ClassVar[Tuple[str, ...]] = ("table", "waiter", "payment_method", "items.dish")
+    
     table_number: int
     waiter_name: str
     payment_method_name: Optional[str] = None
@@ -78,8 +90,10 @@ class OrderPaymentComplete(BaseModel):
 
 class OrderList(BaseModel):
     """Схема списка заказов"""
-    orders: List[Order]
-    total: int
+    orders: List[Union[OrderWithItems, Order]]  # С позициями - только с expand=items
+    total: Optional[int] = None  # None - не запрашивался (count=none)
+    total_estimated: bool = False  # total приблизительный (count=cached/estimated)
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (режим cursor)
 
 
 class OrderStats(BaseModel):
@@ -3,7 +3,7 @@ QRes OS 4 - OrderItem Schemas
 Pydantic схемы для позиций заказов (отдельный файл согласно ТЗ)
 """
 from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 from ..models.order_item import OrderItemStatus, KitchenDepartment
@@ -84,6 +84,14 @@ class KitchenOrderItem(BaseModel):
     created_at: datetime
 
 
+class KitchenBoardChanges(BaseModel):
+    """Изменения доски кухни после курсора клиента"""
+    cursor: int  # Передать в since при следующем запросе
+    full: bool  # True - items содержит всю доску, локальную копию нужно заменить
+    items: List[KitchenOrderItem]  # Новые и измененные позиции
+    removed: List[int]  # ID позиций, которые нужно убрать с доски
+
+
 class OrderItemStatusUpdate(BaseModel):
     """Схема обновления статуса позиции заказа"""
     status: OrderItemStatus
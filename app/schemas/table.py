@@ -62,7 +62,9 @@ class TableWithOrder(Table):
 class TableList(BaseModel):
     """Схема списка столиков"""
     tables: List[Table]
-    total: int
+    total: Optional[int] = None  # None - не запрашивался (count=none)
+    total_estimated: bool = False  # total приблизительный (count=cached/estimated)
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (режим cursor)
 
 
 class QRCodeResponse(BaseModel):
@@ -186,7 +186,9 @@ class User(UserBase):
 class UserList(BaseModel):
     """Схема списка пользователей"""
     users: List[User]
-    total: int
+    total: Optional[int] = None  # None - не запрашивался (count=none)
+    total_estimated: bool = False  # total приблизительный (count=cached/estimated)
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (режим cursor)
 
 
 class UserLogin(BaseModel):
@@ -4,8 +4,17 @@ QRes OS 4 - Services Package
 """
 
 from . import auth
+from . import change_tracking
 from .orders import OrderService
 from .dishes import DishService
+from .order_pricing import OrderPricingService, OrderPricingError
+from .statistics import StatisticsService
+from .archive import ArchiveService, archive_progress
+from .rollups import RollupService
+from .menu_cache import MenuCache, menu_cache
+from .dashboard import DashboardCache, dashboard_cache
+from .row_counts import RowCountService
+from .dish_search import DishSearchService
 from .utils import (
     generate_qr_code, generate_unique_code, format_price,
     calculate_cooking_time, validate_phone_number,
@@ -14,8 +23,21 @@ from .utils import (
 
 __all__ = [
     "auth",
+    "change_tracking",
     "OrderService", 
     "DishService",
+    "OrderPricingService",
+    "OrderPricingError",
+    "StatisticsService",
+    "ArchiveService",
+    "archive_progress",
+    "RollupService",
+    "MenuCache",
+    "menu_cache",
+    "DashboardCache",
+    "dashboard_cache",
+    "RowCountService",
+    "DishSearchService",
     "generate_qr_code",
     "generate_unique_code",
     "format_price",
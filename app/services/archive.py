@@ -0,0 +1,258 @@
+"""
+QRes OS 4 - Archive Service
+Перенос закрытых заказов в архивные таблицы и чтение истории из обоих источников
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, exists, func, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models import Order, OrderItem, Table, OrderArchive, OrderItemArchive
+from .order_pricing import moscow_now
+
+
+def _archived_columns(archive_model) -> List[str]:
+    """Колонки, которые переносятся из горячей таблицы (все, кроме archived_at)"""
+    return [column.name for column in archive_model.__table__.columns if column.name != "archived_at"]
+
+
+def _copy_select(source_model, archive_model, *criteria):
+    """SELECT общих колонок горячей таблицы + время архивации для INSERT ... SELECT"""
+    source = source_model.__table__
+    return select(
+        *[source.c[name] for name in _archived_columns(archive_model)],
+        func.datetime('now', '+3 hours')
+    ).where(*criteria)
+
+
+class ArchiveProgress:
+    """Состояние архивации (для эндпоинта администратора)"""
+
+    def __init__(self):
+        self.running = False
+        self.runs = 0
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.last_batch_at: Optional[datetime] = None
+        self.last_run_orders = 0
+        self.orders_archived = 0
+        self.items_archived = 0
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_batch_at": self.last_batch_at,
+            "last_run_orders": self.last_run_orders,
+            "orders_archived": self.orders_archived,
+            "items_archived": self.items_archived,
+            "last_error": self.last_error
+        }
+
+
+archive_progress = ArchiveProgress()
+
+
+class ArchiveService:
+    """
+    Сервис архивации заказов
+
+    Закрытые (COMPLETED/CANCELLED) заказы старше archive_after_days
+    переносятся вместе с позициями в orders_archive /
+    order_items_archive. Каждая пачка - отдельная короткая транзакция,
+    поэтому запись в горячие таблицы между пачками не блокируется.
+    """
+
+    @staticmethod
+    def cutoff(days: Optional[int] = None) -> datetime:
+        """Заказы, созданные раньше этой даты, подлежат архивации"""
+        return moscow_now() - timedelta(days=settings.archive_after_days if days is None else days)
+
+    @staticmethod
+    def eligible_orders_query(cutoff: datetime):
+        """
+        id заказов, которые можно перенести в архив
+
+        Только закрытые заказы: оплаченный, но еще открытый заказ (SERVED,
+        DINING...) остается на столике и на доске кухни.
+
+        Заказ с максимальным id и заказ с последней позицией всегда остаются
+        в горячих таблицах: SQLite выдает новый rowid как max(id) + 1, и без
+        них id архивных строк достались бы новым заказам.
+        """
+        newest_item_order = select(OrderItem.order_id).where(
+            OrderItem.id == select(func.max(OrderItem.id)).scalar_subquery()
+        ).scalar_subquery()
+
+        return select(Order.id).where(
+            Order.is_active == False,
+            Order.created_at < cutoff,
+            ~exists().where(Table.current_order_id == Order.id),
+            Order.id != select(func.max(Order.id)).scalar_subquery(),
+            Order.id != func.coalesce(newest_item_order, 0)
+        )
+
+    @staticmethod
+    async def archive_batch(db: AsyncSession, cutoff: datetime, batch_size: int) -> Dict[str, int]:
+        """
+        Перенести одну пачку заказов в архив и зафиксировать транзакцию
+
+        Первый оператор пачки - запись, поэтому транзакция сразу берет
+        блокировку записи и выбранные заказы не меняются до коммита.
+        Остальные шаги находят пачку как "заказы, уже скопированные в архив".
+        """
+        batch_ids = ArchiveService.eligible_orders_query(cutoff).order_by(Order.id).limit(batch_size)
+        copied = await db.execute(
+            insert(OrderArchive).from_select(
+                _archived_columns(OrderArchive) + ["archived_at"],
+                _copy_select(Order, OrderArchive, Order.id.in_(batch_ids))
+            )
+        )
+        if not copied.rowcount:
+            await db.rollback()
+            return {"orders": 0, "items": 0}
+
+        moved = select(Order.id).join(OrderArchive, OrderArchive.id == Order.id)
+        items = await db.execute(
+            insert(OrderItemArchive).from_select(
+                _archived_columns(OrderItemArchive) + ["archived_at"],
+                _copy_select(OrderItem, OrderItemArchive, OrderItem.order_id.in_(moved))
+            )
+        )
+        await db.execute(delete(OrderItem.__table__).where(OrderItem.order_id.in_(moved)))
+        await db.execute(delete(Order.__table__).where(Order.id.in_(moved)))
+        await db.commit()
+
+        return {"orders": copied.rowcount, "items": items.rowcount}
+
+    @staticmethod
+    async def run(days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Архивировать все подходящие заказы пачками
+
+        Граница по дате фиксируется в начале прогона. Между пачками -
+        пауза archive_batch_pause, чтобы дать место обычным запросам.
+        """
+        if archive_progress.running:
+            raise ValueError("Архивация уже выполняется")
+
+        cutoff = ArchiveService.cutoff(days)
+        batch_size = batch_size or settings.archive_batch_size
+        totals = {"orders": 0, "items": 0}
+
+        archive_progress.running = True
+        archive_progress.runs += 1
+        archive_progress.started_at = moscow_now()
+        archive_progress.last_error = None
+        try:
+            while True:
+                async with AsyncSessionLocal() as session:
+                    moved = await ArchiveService.archive_batch(session, cutoff, batch_size)
+                if not moved["orders"]:
+                    break
+
+                totals["orders"] += moved["orders"]
+                totals["items"] += moved["items"]
+                archive_progress.orders_archived += moved["orders"]
+                archive_progress.items_archived += moved["items"]
+                archive_progress.last_batch_at = moscow_now()
+                await asyncio.sleep(settings.archive_batch_pause)
+        except Exception as e:
+            archive_progress.last_error = str(e)
+            raise
+        finally:
+            archive_progress.running = False
+            archive_progress.finished_at = moscow_now()
+            archive_progress.last_run_orders = totals["orders"]
+
+        return totals
+
+    @staticmethod
+    async def get_status(db: AsyncSession) -> Dict[str, Any]:
+        """Прогресс архивации и размеры горячих/архивных таблиц"""
+        cutoff = ArchiveService.cutoff()
+        pending = ArchiveService.eligible_orders_query(cutoff).subquery()
+
+        row = (await db.execute(select(
+            select(func.count(Order.id)).scalar_subquery().label("hot_orders"),
+            select(func.count(OrderItem.id)).scalar_subquery().label("hot_items"),
+            select(func.count(OrderArchive.id)).scalar_subquery().label("archived_orders"),
+            select(func.count(OrderItemArchive.id)).scalar_subquery().label("archived_items"),
+            select(func.count()).select_from(pending).scalar_subquery().label("pending_orders")
+        ))).one()
+
+        return {
+            **archive_progress.as_dict(),
+            "enabled": settings.archive_enabled,
+            "archive_after_days": settings.archive_after_days,
+            "batch_size": settings.archive_batch_size,
+            "interval": settings.archive_interval,
+            "cutoff": cutoff,
+            "hot_orders": row.hot_orders,
+            "hot_items": row.hot_items,
+            "archived_orders": row.archived_orders,
+            "archived_items": row.archived_items,
+            "pending_orders": row.pending_orders
+        }
+
+    @staticmethod
+    async def get_archived_order(db: AsyncSession, order_id: int) -> Optional[OrderArchive]:
+        """Архивный заказ со связями (для GET /orders/{id})"""
+        result = await db.execute(
+            select(OrderArchive).options(
+                selectinload(OrderArchive.table),
+                selectinload(OrderArchive.waiter),
+                selectinload(OrderArchive.payment_method),
+                selectinload(OrderArchive.items).selectinload(OrderItemArchive.dish)
+            ).where(OrderArchive.id == order_id)
+        )
+        return result.scalar_one_or_none()
+
+
+def orders_with_archive(*columns: str, where=None):
+    """
+    Подзапрос UNION ALL по orders и orders_archive (для отчетов за период)
+
+    where(model) возвращает список условий для модели; условия применяются
+    в каждой ветке отдельно, чтобы работали индексы обеих таблиц.
+    """
+    branches = []
+    for model in (Order, OrderArchive):
+        branch = select(*[getattr(model, name) for name in columns])
+        if where is not None:
+            branch = branch.where(*where(model))
+        branches.append(branch)
+    return union_all(*branches).subquery()
+
+
+def order_items_with_archive(*columns: str, where=None):
+    """Подзапрос UNION ALL по order_items и order_items_archive"""
+    branches = []
+    for model in (OrderItem, OrderItemArchive):
+        branch = select(*[getattr(model, name) for name in columns])
+        if where is not None:
+            branch = branch.where(*where(model))
+        branches.append(branch)
+    return union_all(*branches).subquery()
+
+
+async def archive_worker():
+    """Фоновая архивация раз в archive_interval секунд (если включена)"""
+    while True:
+        await asyncio.sleep(settings.archive_interval)
+        if not settings.archive_enabled or archive_progress.running:
+            continue
+        try:
+            totals = await ArchiveService.run()
+            if totals["orders"]:
+                print(f"🗄️ В архив перенесено заказов: {totals['orders']}, позиций: {totals['items']}")
+        except Exception as e:
+            print(f"❌ Ошибка архивации заказов: {e}")
@@ -2,13 +2,21 @@
 QRes OS 4 - Authentication Service
 Сервис аутентификации и авторизации
 """
+import asyncio
+import hashlib
 import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Optional, Union, Callable, Any, Dict, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 from fastapi import HTTPException, status
 
 from ..models import User, UserRole
@@ -20,19 +28,259 @@ from ..config import settings
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
+class PasswordHasher:
+    """
+    Выполнение bcrypt в отдельном ограниченном пуле потоков
+
+    Одна операция bcrypt занимает сотни миллисекунд CPU. В async обработчике
+    она блокировала бы event loop целиком (WebSocket, кухня, все запросы),
+    поэтому хеширование и проверка выполняются в собственном пуле из
+    settings.password_hash_workers потоков. Если в очереди уже
+    password_hash_max_queue операций, новая отклоняется с 503.
+    """
+    
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="password-hasher"
+        )
+        self._lock = threading.Lock()
+        
+        # Метрики очереди
+        self.queued = 0  # ожидают свободного потока
+        self.running = 0  # выполняются
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+    
+    async def hash(self, password: str) -> str:
+        """Хеширование пароля без блокировки event loop"""
+        return await self._submit(pwd_context.hash, password)
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля без блокировки event loop"""
+        return await self._submit(pwd_context.verify, plain_password, hashed_password)
+    
+    async def _submit(self, func: Callable, *args) -> Any:
+        """Поставить операцию в пул с учетом лимита очереди"""
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Сервер перегружен, повторите попытку входа через несколько секунд"
+                )
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        
+        # Операция ушла из очереди: ее забрал поток пула (_run) или ожидание
+        # прервано раньше (отмена задачи, пул остановлен). Счетчик queued
+        # уменьшает тот, кто успел первым, иначе очередь "заполнилась" бы навсегда.
+        job = {"dequeued": False}
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._run, job, func, args)
+        finally:
+            self._dequeue(job)
+    
+    def _dequeue(self, job: Dict[str, bool]) -> None:
+        """Убрать операцию из счетчика очереди (не больше одного раза)"""
+        with self._lock:
+            if not job["dequeued"]:
+                job["dequeued"] = True
+                self.queued -= 1
+    
+    def _run(self, job: Dict[str, bool], func: Callable, args: tuple) -> Any:
+        """Выполнение в потоке пула"""
+        self._dequeue(job)
+        with self._lock:
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Метрики пула хеширования"""
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+# Глобальный пул хеширования паролей
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue
+)
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    """Результат проверки подписи и claims JWT"""
+    token_data: TokenData
+    expires_at: float  # exp (UNIX-время)
+    issued_at: Optional[float]
+    fresh: bool
+
+
+class TokenCache:
+    """
+    LRU-кэш проверенных JWT токенов
+
+    Проверка подписи и claims выполняется один раз на токен, повторные
+    запросы с тем же токеном берут результат из кэша. Ключ - SHA-256
+    токена (сам токен в памяти не хранится), запись живет не дольше exp
+    токена. Невалидные токены не кэшируются.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[bytes, VerifiedToken]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    def get(self, token: str) -> Optional[VerifiedToken]:
+        """Проверенный токен из кэша (None - нет в кэше или истек)"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+    
+    def put(self, token: str, entry: VerifiedToken) -> None:
+        """Сохранить проверенный токен, вытесняя самый старый при переполнении"""
+        key = self._key(token)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class PrincipalCache:
+    """
+    Кэш строк пользователей для аутентификации запросов
+
+    Хранит значения колонок активного пользователя не дольше ttl секунд.
+    Из кэша в сессию запроса пользователь добавляется через merge(load=False)
+    без запроса к БД, поэтому обработчики получают обычный объект сессии.
+    После изменения, смены пароля или деактивации пользователя запись
+    сбрасывается через invalidate(user_id).
+    """
+    
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """Пользователь из кэша, присоединенный к сессии db (None - нет в кэше)"""
+        if self.ttl <= 0:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self.hits += 1
+        
+        user = User(**entry[1])
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+    
+    def put(self, user: User) -> None:
+        """Запомнить загруженного из БД пользователя"""
+        if self.ttl <= 0:
+            return
+        values = {
+            attr.key: getattr(user, attr.key)
+            for attr in User.__mapper__.column_attrs
+        }
+        self._entries[user.id] = (time.monotonic() + self.ttl, values)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, user_id: int) -> None:
+        """Сбросить запись пользователя (после изменения в БД)"""
+        self._entries.pop(user_id, None)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Глобальные кэши аутентификации
+token_cache = TokenCache(max_size=settings.token_cache_size)
+principal_cache = PrincipalCache(
+    ttl=settings.principal_cache_ttl,
+    max_size=settings.token_cache_size
+)
+
+
 class AuthService:
     """Сервис аутентификации"""
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Проверка пароля"""
+        """Проверка пароля (синхронно - только для скриптов вне event loop)"""
         return pwd_context.verify(plain_password, hashed_password)
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Хеширование пароля"""
+        """Хеширование пароля (синхронно - только для скриптов вне event loop)"""
         return pwd_context.hash(password)
     
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля в пуле потоков хеширования"""
+        return await password_hasher.verify(plain_password, hashed_password)
+    
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Хеширование пароля в пуле потоков хеширования"""
+        return await password_hasher.hash(password)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, fresh: bool = False) -> str:
         """Создание JWT токена с улучшенной безопасностью"""
@@ -70,41 +318,54 @@ class AuthService:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
-        try:
-            payload = jwt.decode(
-                token, 
-                settings.secret_key, 
-                algorithms=[settings.algorithm],
-                audience=settings.jwt_audience,
-                issuer=settings.jwt_issuer
-            )
+        verified = token_cache.get(token)
+        if verified is None:
+            try:
+                payload = jwt.decode(
+                    token, 
+                    settings.secret_key, 
+                    algorithms=[settings.algorithm],
+                    audience=settings.jwt_audience,
+                    issuer=settings.jwt_issuer
+                )
+            except JWTError:
+                raise credentials_exception
             
             username: str = payload.get("sub")
             user_id: int = payload.get("user_id")
             role: str = payload.get("role")
-            issued_at: int = payload.get("iat")
-            fresh: bool = payload.get("fresh", False)
             
             if username is None or user_id is None:
                 raise credentials_exception
             
-            # Проверяем требование "свежести" токена
-            if require_fresh and not fresh:
-                # Проверяем, не слишком ли старый токен
-                if issued_at:
-                    token_age_minutes = (datetime.utcnow().timestamp() - issued_at) / 60
-                    if token_age_minutes > settings.require_fresh_token_minutes:
-                        raise fresh_token_required_exception
-                
-            token_data = TokenData(
-                username=username,
-                user_id=user_id,
-                role=UserRole(role) if role else None
-            )
-            return token_data
+            try:
+                token_data = TokenData(
+                    username=username,
+                    user_id=user_id,
+                    role=UserRole(role) if role else None
+                )
+            except ValueError:
+                raise credentials_exception
             
-        except JWTError:
-            raise credentials_exception
+            verified = VerifiedToken(
+                token_data=token_data,
+                expires_at=float(payload.get("exp") or 0),
+                issued_at=payload.get("iat"),
+                fresh=payload.get("fresh", False)
+            )
+            # Токены без exp не кэшируем
+            if verified.expires_at:
+                token_cache.put(token, verified)
+        
+        # Проверяем требование "свежести" токена (и для токенов из кэша)
+        if require_fresh and not verified.fresh:
+            # Проверяем, не слишком ли старый токен
+            if verified.issued_at:
+                token_age_minutes = (datetime.utcnow().timestamp() - verified.issued_at) / 60
+                if token_age_minutes > settings.require_fresh_token_minutes:
+                    raise fresh_token_required_exception
+        
+        return verified.token_data
     
     @staticmethod
     async def authenticate_user(
@@ -123,12 +384,13 @@ class AuthService:
         if not user:
             return None
         
-        if not AuthService.verify_password(password, user.password_hash):
+        if not await AuthService.verify_password_async(password, user.password_hash):
             return None
         
         # Обновляем время последнего входа
         user.last_login = datetime.utcnow()
         await db.commit()
+        principal_cache.invalidate(user.id)
         
         return user
     
@@ -154,12 +416,13 @@ class AuthService:
             # Обновляем время последнего входа
             user.last_login = datetime.utcnow()
             await db.commit()
+            principal_cache.invalidate(user.id)
         
         return user
     
     @staticmethod
     async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-        """Получение пользователя по ID"""
+        """Получение пользователя по ID (без кэша)"""
         query = select(User).where(
             User.id == user_id,
             User.is_active == True
@@ -167,6 +430,18 @@ class AuthService:
         result = await db.execute(query)
         return result.scalar_one_or_none()
     
+    @staticmethod
+    async def get_principal(db: AsyncSession, user_id: int) -> Optional[User]:
+        """Активный пользователь для аутентификации запроса (через кэш принципалов)"""
+        user = await principal_cache.get(db, user_id)
+        if user is not None:
+            return user
+        
+        user = await AuthService.get_user_by_id(db, user_id)
+        if user is not None:
+            principal_cache.put(user)
+        return user
+    
     @staticmethod
     def check_role_permission(user_role: UserRole, required_roles: list[UserRole]) -> bool:
         """Проверка прав доступа по роли"""
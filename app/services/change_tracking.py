@@ -0,0 +1,67 @@
+"""
+QRes OS 4 - Change Tracking
+Нумерация изменений позиций заказа для инкрементальной синхронизации доски кухни
+"""
+from typing import List
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import OrderItem, SyncCounter, OrderItemDeletion
+
+
+# Поток изменений позиций заказа
+ORDER_ITEMS_STREAM = "order_items"
+
+
+def reserve_change_seq(connection: Connection, stream: str, count: int) -> int:
+    """
+    Зарезервировать count номеров изменений, вернуть первый
+
+    Счетчик увеличивается в текущей транзакции: пишущая транзакция держит
+    блокировку строки (в SQLite - всей БД) до коммита, поэтому номера
+    растут в порядке коммитов и клиент не пропустит изменение, закоммиченное
+    позже чтения его курсора.
+    """
+    updated = connection.execute(
+        update(SyncCounter)
+        .where(SyncCounter.name == stream)
+        .values(value=SyncCounter.value + count)
+    )
+    if updated.rowcount == 0:
+        connection.execute(insert(SyncCounter).values(name=stream, value=count))
+        return 1
+    last = connection.execute(
+        select(SyncCounter.value).where(SyncCounter.name == stream)
+    ).scalar_one()
+    return last - count + 1
+
+
+async def current_change_seq(db: AsyncSession, stream: str = ORDER_ITEMS_STREAM) -> int:
+    """Номер последнего закоммиченного изменения потока (0 - изменений не было)"""
+    value = await db.scalar(select(SyncCounter.value).where(SyncCounter.name == stream))
+    return value or 0
+
+
+@event.listens_for(Session, "before_flush")
+def _track_order_item_changes(session: Session, flush_context, instances) -> None:
+    """Присвоить номера изменений новым/измененным позициям и записать удаленные"""
+    changed: List[OrderItem] = [
+        obj for obj in session.new if isinstance(obj, OrderItem)
+    ] + [
+        obj for obj in session.dirty
+        if isinstance(obj, OrderItem) and session.is_modified(obj, include_collections=False)
+    ]
+    deleted: List[OrderItem] = [obj for obj in session.deleted if isinstance(obj, OrderItem)]
+    if not changed and not deleted:
+        return
+
+    seq = reserve_change_seq(session.connection(), ORDER_ITEMS_STREAM, len(changed) + len(deleted))
+    for item in changed:
+        item.change_seq = seq
+        seq += 1
+    for item in deleted:
+        session.add(OrderItemDeletion(order_item_id=item.id, department=item.department, change_seq=seq))
+        seq += 1
@@ -0,0 +1,157 @@
+"""
+QRes OS 4 - Dashboard Cache
+Снимок статистики дашборда: один запрос, короткий TTL, сброс при изменениях
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import run_after_commit
+from ..models import User, Order, Table, Location, Category, Dish, Ingredient, PaymentMethod
+from ..models.order import PaymentStatus
+from ..pagination import datetime_key
+from .rollups import today_start
+
+
+# Изменения этих моделей влияют на цифры дашборда
+DASHBOARD_MODELS = (User, Order, Table, Location, Category, Dish, Ingredient, PaymentMethod)
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """Посчитанная статистика дашборда"""
+    version: int
+    stats: Dict[str, Any]
+    built_at: datetime
+    built_monotonic: float
+
+    @property
+    def age(self) -> float:
+        """Возраст снимка (сек)"""
+        return time.monotonic() - self.built_monotonic
+
+
+class DashboardCache:
+    """
+    Кэш статистики дашборда (в памяти процесса)
+
+    Экран администратора обновляется часто, а цифры меняются медленно.
+    Снимок считается одним запросом (все счетчики - скалярные подзапросы
+    одного SELECT) и живет dashboard_cache_ttl секунд. Одновременные
+    запросы ждут одно вычисление, а коммит изменений пользователей,
+    заказов, столиков и справочников сбрасывает снимок.
+    """
+
+    def __init__(self):
+        self._version = 0
+        self._snapshot: Optional[DashboardSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Сбросить снимок (вызывается после коммита изменений)"""
+        self._version += 1
+        self._snapshot = None
+
+    def _fresh(self, snapshot: Optional[DashboardSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and snapshot.age < settings.dashboard_cache_ttl
+        )
+
+    async def get(self, db: AsyncSession) -> DashboardSnapshot:
+        """Получить актуальный снимок, при необходимости пересчитав его"""
+        snapshot = self._snapshot
+        if self._fresh(snapshot):
+            return snapshot
+
+        # Считает только один запрос, остальные ждут готовый снимок
+        async with self._lock:
+            snapshot = self._snapshot
+            if self._fresh(snapshot):
+                return snapshot
+
+            version = self._version
+            snapshot = DashboardSnapshot(
+                version=version,
+                stats=await self._load_stats(db),
+                built_at=datetime.now(),
+                built_monotonic=time.monotonic()
+            )
+
+            # Если данные изменили во время подсчета, снимок не сохраняем
+            if version == self._version:
+                self._snapshot = snapshot
+            return snapshot
+
+    @staticmethod
+    async def _load_stats(db: AsyncSession) -> Dict[str, Any]:
+        """Все счетчики дашборда одним SELECT"""
+        today = datetime_key(today_start())
+
+        def count(column, *criteria):
+            return select(func.count(column)).where(*criteria).scalar_subquery()
+
+        row = (await db.execute(select(
+            count(User.id, User.is_active == True).label("users"),
+            count(Order.id, Order.created_at >= today).label("orders"),
+            select(func.coalesce(func.sum(Order.total_price), 0)).where(
+                Order.payment_status == PaymentStatus.PAID,
+                Order.created_at >= today
+            ).scalar_subquery().label("revenue"),
+            count(Table.id, Table.is_active == True).label("tables"),
+            count(Location.id, Location.is_active == True).label("locations"),
+            count(Category.id, Category.is_active == True).label("categories"),
+            count(Dish.id, Dish.is_available == True).label("dishes"),
+            count(Ingredient.id).label("ingredients"),
+            count(PaymentMethod.id, PaymentMethod.is_active == True).label("payment_methods")
+        ))).one()
+
+        return {
+            "totalUsers": row.users,
+            "totalOrders": row.orders,
+            "totalRevenue": float(row.revenue),
+            "activeTables": row.tables,
+            "totalLocations": row.locations,
+            "totalCategories": row.categories,
+            "totalDishes": row.dishes,
+            "totalIngredients": row.ingredients,
+            "totalPaymentMethods": row.payment_methods
+        }
+
+
+# Глобальный кэш дашборда
+dashboard_cache = DashboardCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_dashboard_changes(session: Session, flush_context) -> None:
+    """Запомнить, что транзакция меняет данные дашборда"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, DASHBOARD_MODELS):
+            session.info["dashboard_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dashboard(session: Session) -> None:
+    """
+    Сбросить снимок после коммита (до коммита новые данные еще не видны)
+
+    В очереди записи - после группового COMMIT: иначе запрос дашборда
+    между ними сохранил бы старые цифры под новой версией на весь TTL.
+    """
+    if session.info.pop("dashboard_changed", False):
+        run_after_commit(session, dashboard_cache.invalidate)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dashboard_changes(session: Session) -> None:
+    session.info.pop("dashboard_changed", None)
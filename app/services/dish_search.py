@@ -0,0 +1,160 @@
+"""
+QRes OS 4 - Dish Search
+Поиск блюд по индексу FTS5: регистр кириллицы, ё/е, префиксы, ранжирование
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, inspect, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import Dish, dish_search
+
+
+# Поля блюда в индексе (в порядке колонок dish_search)
+SEARCH_FIELDS = ("name", "description", "ingredients", "code")
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(value: Optional[str]) -> str:
+    """
+    Текст для индекса и запроса
+
+    LIKE в SQLite не различает регистр только для ASCII; здесь регистр
+    снимается для любого алфавита, а ё приравнивается к е.
+    """
+    return (value or "").casefold().replace("ё", "е")
+
+
+def _row(dish) -> Dict[str, Any]:
+    return {"rowid": dish.id, **{name: normalize(getattr(dish, name)) for name in SEARCH_FIELDS}}
+
+
+def _uses_index(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+@event.listens_for(Session, "after_flush")
+def _update_dish_search(session: Session, flush_context) -> None:
+    """
+    Обновить индекс поиска в транзакции изменения блюда
+
+    Строка индекса заменяется целиком при создании блюда и изменении
+    любого из полей поиска, при удалении блюда - удаляется.
+    """
+    stale: List[int] = []
+    fresh: List[Dict[str, Any]] = []
+    for dish in session.new:
+        if isinstance(dish, Dish):
+            fresh.append(_row(dish))
+    for dish in session.dirty:
+        if isinstance(dish, Dish):
+            state = inspect(dish)
+            if any(state.attrs[name].history.has_changes() for name in SEARCH_FIELDS):
+                stale.append(dish.id)
+                fresh.append(_row(dish))
+    for dish in session.deleted:
+        if isinstance(dish, Dish):
+            stale.append(dish.id)
+
+    if not (stale or fresh):
+        return
+    connection = session.connection()
+    if not _uses_index(connection):
+        return
+    if stale:
+        connection.execute(delete(dish_search).where(dish_search.c.rowid.in_(stale)))
+    if fresh:
+        connection.execute(insert(dish_search), fresh)
+
+
+class DishSearchService:
+    """
+    Полнотекстовый поиск блюд
+
+    В SQLite запрос идет по виртуальной таблице dish_search (FTS5): каждое
+    слово запроса ищется как префикс, результаты ранжируются bm25 с большим
+    весом названия. На других СУБД остается ILIKE по полям блюда.
+    """
+
+    @staticmethod
+    def match_query(term: str) -> Optional[str]:
+        """
+        Запрос FTS5 из строки пользователя: "борщ укр" -> "борщ"* "укр"*
+
+        Слова берутся в кавычки, поэтому операторы FTS5 (AND, NEAR, *)
+        из пользовательского ввода не интерпретируются.
+        """
+        words = _WORD.findall(normalize(term))
+        if not words:
+            return None
+        return " ".join(f'"{word}"*' for word in words)
+
+    @staticmethod
+    def search_filter(db: AsyncSession, term: str) -> Tuple[Any, Optional[Any]]:
+        """
+        Условие поиска для запроса блюд и выражение ранга для сортировки
+
+        Returns:
+            (условие для where, ранг или None - ранжирования нет)
+        """
+        query = DishSearchService.match_query(term)
+        if query is None or not _uses_index(db.bind):
+            pattern = f"%{term}%"
+            return or_(
+                Dish.name.ilike(pattern),
+                Dish.description.ilike(pattern),
+                Dish.ingredients.ilike(pattern),
+                Dish.code.ilike(pattern)
+            ), None
+
+        matches = literal_column("dish_search").op("MATCH")(query)
+        condition = Dish.id.in_(select(dish_search.c.rowid).where(matches))
+        rank = select(dish_search.c.rank).where(
+            dish_search.c.rowid == Dish.id, matches
+        ).scalar_subquery()
+        return condition, rank
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """Пересобрать индекс по всем блюдам (одной транзакцией)"""
+        return await DishSearchService._write_index(db, await DishSearchService._expected_rows(db))
+
+    @staticmethod
+    async def ensure_built(db: AsyncSession) -> bool:
+        """
+        Пересобрать индекс, если он не совпадает с таблицей блюд
+
+        Вызывается при запуске: после обновления индекс пуст, а блюда,
+        добавленные, измененные или удаленные в обход приложения, в нем
+        устарели бы. Сравнивается содержимое: нормализованные поля каждого
+        блюда с его строкой индекса (меню - сотни строк, это дешево).
+        """
+        if not _uses_index(db.bind):
+            return False
+        expected = await DishSearchService._expected_rows(db)
+        result = await db.execute(select(dish_search.c.rowid, *[dish_search.c[name] for name in SEARCH_FIELDS]))
+        indexed = {row[0]: tuple(row[1:]) for row in result.all()}
+        if indexed == {row["rowid"]: tuple(row[name] for name in SEARCH_FIELDS) for row in expected}:
+            return False
+        await DishSearchService._write_index(db, expected)
+        return True
+
+    @staticmethod
+    async def _expected_rows(db: AsyncSession) -> List[Dict[str, Any]]:
+        """Строки индекса по текущим данным блюд"""
+        result = await db.execute(select(Dish.id, *[getattr(Dish, name) for name in SEARCH_FIELDS]))
+        return [
+            {"rowid": row.id, **{name: normalize(getattr(row, name)) for name in SEARCH_FIELDS}}
+            for row in result.all()
+        ]
+
+    @staticmethod
+    async def _write_index(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+        await db.execute(delete(dish_search))
+        if rows:
+            await db.execute(insert(dish_search), rows)
+        await db.commit()
+        return len(rows)
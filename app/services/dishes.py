@@ -8,7 +8,10 @@ from sqlalchemy import select, func, update
 from sqlalchemy.orm import selectinload
 from decimal import Decimal
 
-from ..models import Dish, Category, OrderItem
+from ..models import Dish, Category, OrderItem, DishVariation
+from .menu_cache import menu_cache
+from .statistics import StatisticsService
+from .dish_search import DishSearchService
 
 
 class DishService:
@@ -47,14 +50,13 @@ class DishService:
     
     @staticmethod
     async def search_dishes(db: AsyncSession, search_term: str) -> List[Dish]:
-        """Поиск блюд по названию или описанию"""
+        """Поиск блюд по названию, описанию, ингредиентам и коду (по релевантности)"""
+        condition, rank = DishSearchService.search_filter(db, search_term)
+        order = [Dish.name] if rank is None else [rank, Dish.name]
         query = select(Dish).where(
-            (Dish.name.ilike(f"%{search_term}%")) |
-            (Dish.description.ilike(f"%{search_term}%")) |
-            (Dish.ingredients.ilike(f"%{search_term}%"))
-        ).where(
+            condition,
             Dish.is_available == True
-        ).order_by(Dish.name)
+        ).order_by(*order)
         
         result = await db.execute(query)
         return result.scalars().all()
@@ -69,25 +71,21 @@ class DishService:
         if not dish:
             return {}
         
-        # Количество заказов блюда
-        orders_query = select(func.sum(OrderItem.quantity)).where(
-            OrderItem.dish_id == dish_id
-        )
-        orders_result = await db.execute(orders_query)
-        total_orders = orders_result.scalar() or 0
+        # Продажи: закрытые дни - из агрегатов, сегодня - из позиций заказов
+        sales = await StatisticsService.get_dish_sales(db, dish_id)
         
-        # Общая выручка от блюда
-        revenue_query = select(func.sum(OrderItem.total)).where(
-            OrderItem.dish_id == dish_id
+        # Цена - минимальная среди доступных вариаций
+        price_query = select(func.min(DishVariation.price)).where(
+            DishVariation.dish_id == dish_id,
+            DishVariation.is_available == True
         )
-        revenue_result = await db.execute(revenue_query)
-        total_revenue = revenue_result.scalar() or Decimal('0.00')
+        current_price = (await db.execute(price_query)).scalar()
         
         return {
             "dish_name": dish.name,
-            "total_orders": total_orders,
-            "total_revenue": total_revenue,
-            "current_price": dish.price,
+            "total_orders": sales["quantity"],
+            "total_revenue": sales["revenue"],
+            "current_price": current_price,
             "is_available": dish.is_available
         }
     
@@ -104,6 +102,7 @@ class DishService:
         query = update(Dish).where(Dish.id == dish_id).values(is_available=is_available)
         result = await db.execute(query)
         await db.commit()
+        menu_cache.invalidate()
         return result.rowcount > 0
     
     @staticmethod
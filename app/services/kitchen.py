@@ -2,17 +2,22 @@
 QRes OS 4 - Kitchen Service
 Сервис для управления кухонными цехами и позициями заказов
 """
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload, joinedload
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from ..models import Order, OrderItem, Table, Dish, User
+from ..models import Order, OrderItem, Table, Dish, User, OrderItemDeletion
 from ..models.order import OrderStatus
 from ..models.order_item import OrderItemStatus, KitchenDepartment
 from ..deps import moscow_now
+from .order_pricing import OrderPricingService
+from .statistics import StatisticsService
+from .change_tracking import current_change_seq
+from ..config import settings
+from ..pagination import encode_cursor, decode_cursor, parse_key_datetime, keyset_after
 
 
 def moscow_now() -> datetime:
@@ -20,6 +25,12 @@ def moscow_now() -> datetime:
     return datetime.utcnow() + timedelta(hours=3)
 
 
+def _notifier():
+    """WebSocket нотификатор (импорт при вызове - пакет routers импортирует этот сервис)"""
+    from ..routers.websocket import notifier
+    return notifier
+
+
 class KitchenService:
     """Сервис для работы с кухонными цехами"""
     
@@ -75,7 +86,7 @@ class KitchenService:
         """Обновить статус позиции заказа"""
         
         query = select(OrderItem).options(
-            joinedload(OrderItem.order),
+            joinedload(OrderItem.order).joinedload(Order.table),
             joinedload(OrderItem.dish)
         ).where(OrderItem.id == item_id)
         
@@ -86,6 +97,7 @@ class KitchenService:
             return False
         
         old_status = item.status
+        old_order_status = item.order.status
         item.status = new_status
         current_time = datetime.utcnow()
         
@@ -107,6 +119,25 @@ class KitchenService:
         await KitchenService._update_order_status(item.order, db)
         
         await db.commit()
+        
+        # Уведомления после commit (только постановка в очередь, без ожидания сокетов)
+        order = item.order
+        table_number = order.table.number if order.table else None
+        
+        if old_status != new_status:
+            _notifier().publish_item_status_changed(
+                item.id, order.id,
+                item.dish.name if item.dish else f"Позиция #{item.id}",
+                item.department.value, old_status.value, new_status.value, table_number
+            )
+        
+        if old_order_status != order.status:
+            _notifier().publish_order_status_changed(
+                order.id, old_order_status.value, order.status.value, table_number
+            )
+            if order.status == OrderStatus.READY:
+                _notifier().publish_order_ready(order.id, table_number, order.waiter_id)
+        
         return True
     
     @staticmethod
@@ -172,8 +203,6 @@ class KitchenService:
             if in_prep_items:
                 prep_names = [item.dish.name if item.dish else f"Позиция #{item.id}" for item in in_prep_items]
                 print(f"   🔥 Готовятся: {', '.join(prep_names)}")
-                
-        # TODO: Здесь можно добавить отправку WebSocket уведомлений официантам
     
     @staticmethod
     async def get_order_progress(order_id: int, db: AsyncSession) -> Dict:
@@ -250,7 +279,7 @@ class KitchenService:
         """Добавить позиции к существующему заказу"""
         
         # Получаем заказ
-        order_query = select(Order).where(Order.id == order_id)
+        order_query = select(Order).options(selectinload(Order.table)).where(Order.id == order_id)
         order_result = await db.execute(order_query)
         order = order_result.scalar_one_or_none()
         
@@ -265,43 +294,17 @@ class KitchenService:
         if order.status == OrderStatus.PENDING:
             order.status = OrderStatus.IN_PROGRESS
         
-        new_items = []
-        total_addition = Decimal('0.00')
+        # Проверяем блюда и рассчитываем стоимость пакетно (OrderPricingError - подкласс ValueError)
+        priced_items, total_addition = await OrderPricingService.price_items(db, items_data)
         
-        for item_data in items_data:
-            # Получаем блюдо
-            dish_query = select(Dish).where(Dish.id == item_data['dish_id'])
-            dish_result = await db.execute(dish_query)
-            dish = dish_result.scalar_one_or_none()
-            
-            if not dish or not dish.is_available:
-                raise ValueError(f"Блюдо с ID {item_data['dish_id']} недоступно")
-            
-            # Рассчитываем стоимость
-            quantity = item_data['quantity']
-            item_total = Decimal(str(dish.price)) * quantity
-            total_addition += item_total
-            
-            # Создаем позицию заказа
-            order_item = OrderItem(
-                order_id=order.id,
-                dish_id=dish.id,
-                dish_variation_id=item_data.get('dish_variation_id'),
-                quantity=quantity,
-                price=Decimal(str(dish.price)),
-                total=item_total,
-                comment=item_data.get('comment'),
-                status=OrderItemStatus.IN_PREPARATION,
-                department=dish.department,
-                estimated_preparation_time=dish.cooking_time,
-                preparation_started_at=moscow_now()
-            )
-            
+        new_items = []
+        for priced_item in priced_items:
+            order_item = OrderPricingService.build_order_item(order.id, priced_item)
             db.add(order_item)
             new_items.append(order_item)
         
         # Обновляем общую сумму заказа
-        order.total_price += total_addition
+        order.total_price = Decimal(str(order.total_price)) + total_addition
         
         # Обновляем статус заказа в зависимости от текущего статуса
         if order.status == OrderStatus.SERVED:
@@ -316,6 +319,9 @@ class KitchenService:
                 order.status = OrderStatus.IN_PROGRESS
         
         await db.commit()
+        _notifier().publish_order_updated(
+            order.id, order.table.number if order.table else None, len(new_items)
+        )
         
         # Обновляем позиции с полной информацией
         for item in new_items:
@@ -332,46 +338,17 @@ class KitchenService:
         """Получить статистику по цеху"""
         
         since_time = datetime.utcnow() - timedelta(hours=hours)
-        
-        # Общее количество позиций
-        total_query = select(func.count(OrderItem.id)).where(
-            and_(
-                OrderItem.department == department,
-                OrderItem.created_at >= since_time
-            )
-        )
-        total_result = await db.execute(total_query)
-        total_items = total_result.scalar()
-        
-        # Статистика по статусам
-        status_stats = {}
-        for status in OrderItemStatus:
-            status_query = select(func.count(OrderItem.id)).where(
-                and_(
-                    OrderItem.department == department,
-                    OrderItem.status == status,
-                    OrderItem.created_at >= since_time
-                )
-            )
-            status_result = await db.execute(status_query)
-            status_stats[f"{status.value}_items"] = status_result.scalar()
-        
-        # Среднее время приготовления
-        avg_time_query = select(func.avg(OrderItem.actual_preparation_time)).where(
-            and_(
-                OrderItem.department == department,
-                OrderItem.actual_preparation_time.is_not(None),
-                OrderItem.created_at >= since_time
-            )
-        )
-        avg_time_result = await db.execute(avg_time_query)
-        avg_preparation_time = avg_time_result.scalar()
+        summary = await StatisticsService.get_order_item_summary(db, department, since_time)
+        avg_preparation_time = summary["average_preparation_time"]
         
         return {
             "department": department.value,
-            "total_items": total_items,
+            "total_items": summary["total_items"],
             "average_preparation_time": int(avg_preparation_time) if avg_preparation_time else None,
-            **status_stats
+            **{
+                f"{status.value}_items": count
+                for status, count in summary["by_status"].items()
+            }
         }
     
     @staticmethod
@@ -387,70 +364,268 @@ class KitchenService:
         # Все позиции уже в статусе IN_PREPARATION, ничего делать не нужно
         return True
 
+    # Статусы доски кухни по умолчанию
+    BOARD_STATUSES = [
+        OrderItemStatus.IN_PREPARATION,
+        OrderItemStatus.READY,
+        OrderItemStatus.SERVED
+    ]
+    
     @staticmethod
-    async def get_all_kitchen_dishes(
-        db: AsyncSession,
-        department: Optional[KitchenDepartment] = None,
-        status_filter: Optional[List[OrderItemStatus]] = None
-    ) -> List[Dict]:
-        """Получить все блюда для кухни из всех заказов"""
-        
-        # Если фильтр статусов не указан, показываем активные статусы
-        if status_filter is None:
-            status_filter = [
-                OrderItemStatus.IN_PREPARATION,
-                OrderItemStatus.READY,
-                OrderItemStatus.SERVED
-            ]
+    def _board_query(
+        department: Optional[KitchenDepartment],
+        status_filter: Optional[List[OrderItemStatus]],
+        served_window_minutes: Optional[int] = None
+    ):
+        """
+        Запрос позиций доски кухни с блюдом, заказом и столиком
         
-        # Строим базовый запрос
+        served_window_minutes: поданные позиции - только измененные за
+        последние N минут (None - без ограничения).
+        """
         query = select(OrderItem).options(
             joinedload(OrderItem.dish),
             joinedload(OrderItem.order).joinedload(Order.table)
-        ).where(
-            OrderItem.status.in_(status_filter)
         )
+        if status_filter is not None:
+            statuses = list(status_filter)
+            if served_window_minutes is not None and OrderItemStatus.SERVED in statuses:
+                served_since = moscow_now() - timedelta(minutes=served_window_minutes)
+                other_statuses = [item_status for item_status in statuses if item_status != OrderItemStatus.SERVED]
+                query = query.where(or_(
+                    OrderItem.status.in_(other_statuses),
+                    and_(OrderItem.status == OrderItemStatus.SERVED, OrderItem.updated_at >= served_since)
+                ))
+            else:
+                query = query.where(OrderItem.status.in_(statuses))
         
         # Добавляем фильтр по цеху, если указан
         if department:
             query = query.where(OrderItem.department == department)
+        return query
+    
+    @staticmethod
+    def _board_page_query(
+        department: KitchenDepartment,
+        status_filter: Optional[List[OrderItemStatus]],
+        served_window_minutes: Optional[int],
+        limit: int,
+        key: Optional[tuple] = None
+    ):
+        """
+        Страница доски одного цеха: позиции после ключа (created_at, id), старые первыми
+
+        Выбирается limit + 1 строка: лишняя показывает, что есть следующая страница.
+        """
+        query = KitchenService._board_query(department, status_filter, served_window_minutes)
+        if key is not None:
+            query = query.where(keyset_after([OrderItem.created_at, OrderItem.id], key))
+        return query.order_by(OrderItem.created_at.asc(), OrderItem.id.asc()).limit(limit + 1)
+    
+    @staticmethod
+    def department_limit(department: KitchenDepartment) -> int:
+        """Лимит позиций цеха на доске (настройка цеха или общий)"""
+        return settings.kitchen_board_department_limits.get(
+            department.value, settings.kitchen_board_limit
+        )
+    
+    @staticmethod
+    def _decode_board_cursor(cursor: str) -> Dict[KitchenDepartment, Optional[tuple]]:
+        """Ключи (created_at, id) цехов из курсора доски; None - цех выбран полностью"""
+        data = decode_cursor(cursor)
+        keys: Dict[KitchenDepartment, Optional[tuple]] = {}
+        for department_value, key in data.items():
+            try:
+                department = KitchenDepartment(department_value)
+            except ValueError:
+                raise ValueError("Некорректный курсор")
+            if key is None:
+                keys[department] = None
+                continue
+            if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], int):
+                raise ValueError("Некорректный курсор")
+            keys[department] = (parse_key_datetime(key[0]), key[1])
+        return keys
+    
+    @staticmethod
+    def _board_item(item: OrderItem) -> Dict:
+        """Позиция доски кухни в виде словаря ответа"""
+        # Вычисляем время в готовке, если блюдо готовится
+        preparation_time = None
+        if item.status == OrderItemStatus.IN_PREPARATION and item.preparation_started_at:
+            time_diff = moscow_now() - item.preparation_started_at
+            preparation_time = int(time_diff.total_seconds() / 60)  # в минутах
+        
+        # Вычисляем фактическое время готовки, если блюдо готово
+        actual_time = None
+        if item.ready_at and item.preparation_started_at:
+            time_diff = item.ready_at - item.preparation_started_at
+            actual_time = int(time_diff.total_seconds() / 60)  # в минутах
         
-        # Сортируем по времени создания (старые первыми)
-        query = query.order_by(OrderItem.created_at.asc())
+        return {
+            'id': item.id,
+            'order_id': item.order_id,
+            'dish_name': item.dish.name,
+            'quantity': item.quantity,
+            'status': item.status.value,
+            'department': item.department.value,
+            'comment': item.comment,
+            'estimated_preparation_time': item.dish.cooking_time,
+            'actual_preparation_time': actual_time,
+            'preparation_started_at': item.preparation_started_at.isoformat() if item.preparation_started_at else None,
+            'ready_at': item.ready_at.isoformat() if item.ready_at else None,
+            'served_at': item.served_at.isoformat() if item.served_at else None,
+            'created_at': item.order.created_at.isoformat(),  # Используем время создания заказа, а не элемента
+            'table_number': item.order.table.number if item.order.table else None,
+            'current_preparation_time': preparation_time
+        }
+    
+    @staticmethod
+    async def get_all_kitchen_dishes(
+        db: AsyncSession,
+        department: Optional[KitchenDepartment] = None,
+        status_filter: Optional[List[OrderItemStatus]] = None,
+        served_window_minutes: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Dict:
+        """
+        Получить блюда для кухни из всех заказов (одна страница доски)
         
-        result = await db.execute(query)
-        items = result.scalars().all()
+        Поданные позиции показываются только за последние served_window_minutes
+        минут (по умолчанию - из настроек). Каждый цех выбирается отдельно по
+        ключу (created_at, id): не более limit позиций (по умолчанию - лимит
+        цеха из настроек), так что один загруженный цех не вытесняет остальные.
         
-        kitchen_dishes = []
-        for item in items:
-            # Вычисляем время в готовке, если блюдо готовится
-            preparation_time = None
-            if item.status == OrderItemStatus.IN_PREPARATION and item.preparation_started_at:
-                time_diff = moscow_now() - item.preparation_started_at
-                preparation_time = int(time_diff.total_seconds() / 60)  # в минутах
-            
-            # Вычисляем фактическое время готовки, если блюдо готово
-            actual_time = None
-            if item.ready_at and item.preparation_started_at:
-                time_diff = item.ready_at - item.preparation_started_at
-                actual_time = int(time_diff.total_seconds() / 60)  # в минутах
-            
-            kitchen_dishes.append({
-                'id': item.id,
-                'order_id': item.order_id,
-                'dish_name': item.dish.name,
-                'quantity': item.quantity,
-                'status': item.status.value,
-                'department': item.department.value,
-                'comment': item.comment,
-                'estimated_preparation_time': item.dish.cooking_time,
-                'actual_preparation_time': actual_time,
-                'preparation_started_at': item.preparation_started_at.isoformat() if item.preparation_started_at else None,
-                'ready_at': item.ready_at.isoformat() if item.ready_at else None,
-                'served_at': item.served_at.isoformat() if item.served_at else None,
-                'created_at': item.order.created_at.isoformat(),  # Используем время создания заказа, а не элемента
-                'table_number': item.order.table.number if item.order.table else None,
-                'current_preparation_time': preparation_time
-            })
+        Returns:
+            {'items': позиции по возрастанию created_at,
+             'next_cursor': курсор следующей страницы или None}
+        
+        Raises:
+            ValueError: некорректный курсор
+        """
+        items, next_cursor = await KitchenService._board_page(
+            db, department, status_filter, served_window_minutes, limit, cursor
+        )
+        return {
+            'items': [KitchenService._board_item(item) for item in items],
+            'next_cursor': next_cursor
+        }
+    
+    @staticmethod
+    async def _board_page(
+        db: AsyncSession,
+        department: Optional[KitchenDepartment],
+        status_filter: Optional[List[OrderItemStatus]],
+        served_window_minutes: Optional[int],
+        limit: Optional[int],
+        cursor: Optional[str]
+    ) -> Tuple[List[OrderItem], Optional[str]]:
+        """Страница доски: позиции (ORM) по возрастанию created_at и курсор следующей"""
+        # Если фильтр статусов не указан, показываем активные статусы
+        if status_filter is None:
+            status_filter = KitchenService.BOARD_STATUSES
+        if served_window_minutes is None:
+            served_window_minutes = settings.kitchen_served_window_minutes
+        
+        if cursor:
+            # Продолжение: только цеха, у которых остались позиции
+            after = KitchenService._decode_board_cursor(cursor)
+            departments = [
+                item_department for item_department, key in after.items()
+                if key is not None and (department is None or item_department == department)
+            ]
+        else:
+            after = {}
+            departments = [department] if department else list(KitchenDepartment)
+        
+        items: List[OrderItem] = []
+        next_keys: Dict[str, Optional[list]] = {}
+        for item_department in departments:
+            department_limit = limit or KitchenService.department_limit(item_department)
+            query = KitchenService._board_page_query(
+                item_department, status_filter, served_window_minutes, department_limit, after.get(item_department)
+            )
+            rows = (await db.execute(query)).scalars().all()
+            if len(rows) > department_limit:
+                rows = rows[:department_limit]
+                next_keys[item_department.value] = [rows[-1].created_at, rows[-1].id]
+            else:
+                next_keys[item_department.value] = None
+            items.extend(rows)
+        
+        items.sort(key=lambda item: (item.created_at, item.id))
+        next_cursor = None
+        if any(key is not None for key in next_keys.values()):
+            next_cursor = encode_cursor(next_keys)
+        
+        return items, next_cursor
+    
+    @staticmethod
+    async def get_kitchen_changes(
+        db: AsyncSession,
+        since: Optional[int] = None,
+        department: Optional[KitchenDepartment] = None,
+        status_filter: Optional[List[OrderItemStatus]] = None
+    ) -> Dict:
+        """
+        Изменения доски кухни после курсора клиента
+        
+        Курсор - номер последнего изменения позиций (sync_counters). Без
+        курсора (или с курсором из будущего, например после пересоздания БД)
+        возвращается полная доска (все страницы, без лимита цеха) и
+        full=True. Иначе - только позиции, созданные или измененные после
+        курсора: попадающие в фильтр - в items, вышедшие из него (другой
+        статус) и удаленные - в removed.
+        
+        Поданная позиция уходит с доски по времени (served_window_minutes),
+        а не по изменению, поэтому клиент убирает такие позиции сам.
+        """
+        if status_filter is None:
+            status_filter = KitchenService.BOARD_STATUSES
+        
+        # Курсор читается до выборки: изменения, закоммиченные позже,
+        # получат больший номер и придут в следующем ответе
+        cursor = await current_change_seq(db)
+        
+        if not since or since > cursor:
+            # Дельты применяются к этой копии, поэтому она должна быть полной:
+            # страницы доски ограничены лимитом цеха - проходим их все
+            items, page_cursor = [], None
+            while True:
+                page, page_cursor = await KitchenService._board_page(
+                    db, department, status_filter, None, None, page_cursor
+                )
+                items.extend(page)
+                if page_cursor is None:
+                    break
+            items.sort(key=lambda item: (item.created_at, item.id))
+            return {
+                'cursor': cursor,
+                'full': True,
+                'items': [KitchenService._board_item(item) for item in items],
+                'removed': []
+            }
+        
+        if since == cursor:
+            return {'cursor': cursor, 'full': False, 'items': [], 'removed': []}
+        
+        changed_query = KitchenService._board_query(department, None).where(
+            OrderItem.change_seq > since,
+            OrderItem.change_seq <= cursor
+        ).order_by(OrderItem.created_at.asc())
+        changed = (await db.execute(changed_query)).scalars().all()
+        
+        statuses = set(status_filter)
+        items = [KitchenService._board_item(item) for item in changed if item.status in statuses]
+        removed = [item.id for item in changed if item.status not in statuses]
+        
+        deletions_query = select(OrderItemDeletion.order_item_id).where(
+            OrderItemDeletion.change_seq > since,
+            OrderItemDeletion.change_seq <= cursor
+        )
+        if department:
+            deletions_query = deletions_query.where(OrderItemDeletion.department == department)
+        removed.extend((await db.execute(deletions_query)).scalars().all())
         
-        return kitchen_dishes
+        return {'cursor': cursor, 'full': False, 'items': items, 'removed': removed}
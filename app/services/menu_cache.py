@@ -0,0 +1,143 @@
+"""
+QRes OS 4 - Menu Cache
+Кэш публичного меню: снимок строится одним запросом и хранится в виде готовых байт
+"""
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Dict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from ..models import Dish, Category
+from ..schemas import MenuResponse
+
+
+@dataclass(frozen=True)
+class MenuSnapshot:
+    """Готовый к отправке снимок меню"""
+    version: int
+    body: bytes
+    etag: str
+    built_at: datetime
+
+
+class MenuCache:
+    """
+    Кэш публичного меню (в памяти процесса)
+
+    Меню меняется несколько раз в день, а запрашивается каждым гостем,
+    отсканировавшим QR-код столика. Поэтому снимок строится один раз
+    (один запрос категорий с блюдами), сразу сериализуется в JSON и
+    отдается как есть до следующего изменения категорий/блюд/вариаций.
+
+    Каждая запись в меню вызывает invalidate(), что увеличивает версию;
+    снимок со старой версией перестраивается при следующем запросе.
+    Кэш локален для процесса: при нескольких воркерах каждый хранит свой снимок.
+    """
+
+    def __init__(self):
+        self._version = 0
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        """Текущая версия меню"""
+        return self._version
+
+    def invalidate(self) -> None:
+        """Сбросить снимок (вызывается после изменения категорий, блюд и вариаций)"""
+        self._version += 1
+        self._snapshot = None
+
+    async def get(self, db: AsyncSession) -> MenuSnapshot:
+        """Получить актуальный снимок меню, при необходимости перестроив его"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+
+        # Перестраивает только один запрос, остальные ждут готовый снимок
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == self._version:
+                return snapshot
+
+            version = self._version
+            categories = await self._load_menu(db)
+            body = MenuResponse(categories=categories).model_dump_json().encode("utf-8")
+            snapshot = MenuSnapshot(
+                version=version,
+                body=body,
+                etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+                built_at=datetime.now()
+            )
+
+            # Если меню изменили во время построения, снимок не сохраняем
+            if version == self._version:
+                self._snapshot = snapshot
+            return snapshot
+
+    @staticmethod
+    async def _load_menu(db: AsyncSession) -> List[Dict]:
+        """Активные категории с доступными блюдами одним запросом"""
+        query = select(Category, Dish).join(
+            Dish, Dish.category_id == Category.id
+        ).where(
+            Category.is_active == True,
+            Dish.is_available == True
+        ).order_by(Category.sort_order, Category.name, Category.id, Dish.name)
+
+        result = await db.execute(query)
+
+        menu_categories = []
+        current_category_id = None
+        for category, dish in result.all():
+            # Категория попадает в меню только если в ней есть доступные блюда
+            if category.id != current_category_id:
+                current_category_id = category.id
+                menu_categories.append({
+                    "category": {
+                        "id": category.id,
+                        "name": category.name,
+                        "description": category.description,
+                        "image_url": category.image_url,
+                        "sort_order": category.sort_order
+                    },
+                    "dishes": []
+                })
+
+            menu_categories[-1]["dishes"].append({
+                "id": dish.id,
+                "name": dish.name,
+                "description": dish.description,
+                "main_image_url": dish.main_image_url,
+                "cooking_time": dish.cooking_time,
+                "weight": dish.weight,
+                "calories": dish.calories,
+                "ingredients": dish.ingredients,
+                "sort_order": dish.sort_order,
+                "is_popular": dish.is_popular
+            })
+
+        return menu_categories
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка заголовка If-None-Match (поддерживает списки и слабые ETag)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+# Глобальный кэш меню
+menu_cache = MenuCache()
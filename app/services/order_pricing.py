@@ -0,0 +1,155 @@
+"""
+QRes OS 4 - Order Pricing Service
+Проверка блюд/вариаций и расчет стоимости позиций заказа пакетными запросами
+"""
+from typing import List, Dict, Tuple, Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+from ..models import Dish, DishVariation, OrderItem
+from ..models.order_item import OrderItemStatus
+
+
+def moscow_now() -> datetime:
+    """Получить текущее время в московском часовом поясе (UTC+3)"""
+    return datetime.utcnow() + timedelta(hours=3)
+
+
+class OrderPricingError(ValueError):
+    """Ошибка проверки позиции заказа (содержит HTTP статус для роутеров)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class OrderPricingService:
+    """
+    Сервис расчета стоимости позиций заказа
+
+    Все блюда и все доступные вариации заказа загружаются двумя запросами
+    с IN (...), после чего цена каждой позиции определяется в памяти:
+    указанная вариация -> вариация по умолчанию -> первая доступная.
+    """
+
+    @staticmethod
+    async def price_items(
+        db: AsyncSession,
+        items: Iterable[Dict]
+    ) -> Tuple[List[Dict], Decimal]:
+        """
+        Проверить позиции и рассчитать их стоимость
+
+        Args:
+            db: Сессия БД
+            items: Позиции в виде словарей (dish_id, quantity, dish_variation_id, comment)
+
+        Returns:
+            (список позиций с ценами, общая стоимость)
+
+        Raises:
+            OrderPricingError: блюдо/вариация не найдены или недоступны
+        """
+        items = list(items)
+        if not items:
+            return [], Decimal('0.00')
+
+        dish_ids = {item['dish_id'] for item in items}
+
+        # Запрос 1: все блюда заказа
+        dishes_result = await db.execute(select(Dish).where(Dish.id.in_(dish_ids)))
+        dishes = {dish.id: dish for dish in dishes_result.scalars().all()}
+
+        # Запрос 2: все доступные вариации этих блюд (покрывает явные, дефолтные и первые)
+        variations_result = await db.execute(
+            select(DishVariation).where(
+                DishVariation.dish_id.in_(dish_ids),
+                DishVariation.is_available == True
+            ).order_by(DishVariation.dish_id, DishVariation.id)
+        )
+        variations_by_id: Dict[int, DishVariation] = {}
+        variations_by_dish: Dict[int, List[DishVariation]] = {}
+        for variation in variations_result.scalars().all():
+            variations_by_id[variation.id] = variation
+            variations_by_dish.setdefault(variation.dish_id, []).append(variation)
+
+        total_price = Decimal('0.00')
+        priced_items = []
+
+        for item in items:
+            dish = dishes.get(item['dish_id'])
+
+            if not dish:
+                raise OrderPricingError(f"Блюдо с ID {item['dish_id']} не найдено", 404)
+
+            if not dish.is_available:
+                raise OrderPricingError(f"Блюдо '{dish.name}' недоступно", 400)
+
+            variation = OrderPricingService._resolve_variation(
+                dish,
+                item.get('dish_variation_id'),
+                variations_by_id,
+                variations_by_dish
+            )
+
+            price = Decimal(str(variation.price))
+            item_total = price * item['quantity']
+            total_price += item_total
+
+            priced_items.append({
+                'dish': dish,
+                'variation': variation,
+                'quantity': item['quantity'],
+                'price': price,
+                'total': item_total,
+                'comment': item.get('comment'),
+                'department': dish.department,
+                'estimated_preparation_time': dish.cooking_time
+            })
+
+        return priced_items, total_price
+
+    @staticmethod
+    def _resolve_variation(
+        dish: Dish,
+        variation_id,
+        variations_by_id: Dict[int, DishVariation],
+        variations_by_dish: Dict[int, List[DishVariation]]
+    ) -> DishVariation:
+        """Выбрать вариацию для цены: указанная -> по умолчанию -> первая доступная"""
+        if variation_id:
+            variation = variations_by_id.get(variation_id)
+            if not variation or variation.dish_id != dish.id:
+                raise OrderPricingError(
+                    f"Вариация блюда с ID {variation_id} не найдена или недоступна", 404
+                )
+            return variation
+
+        candidates = variations_by_dish.get(dish.id, [])
+        for variation in candidates:
+            if variation.is_default:
+                return variation
+
+        if candidates:
+            return candidates[0]
+
+        raise OrderPricingError(f"У блюда '{dish.name}' нет доступных вариаций", 400)
+
+    @staticmethod
+    def build_order_item(order_id: int, priced_item: Dict) -> OrderItem:
+        """Создать OrderItem из рассчитанной позиции (сразу в статусе IN_PREPARATION)"""
+        return OrderItem(
+            order_id=order_id,
+            dish_id=priced_item['dish'].id,
+            dish_variation_id=priced_item['variation'].id,
+            quantity=priced_item['quantity'],
+            price=priced_item['price'],
+            total=priced_item['total'],
+            comment=priced_item.get('comment'),
+            status=OrderItemStatus.IN_PREPARATION,
+            department=priced_item['department'],
+            estimated_preparation_time=priced_item['estimated_preparation_time'],
+            preparation_started_at=moscow_now()
+        )
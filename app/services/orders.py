@@ -12,6 +12,7 @@ from datetime import datetime
 from ..models import Order, OrderItem, Table, Dish, User
 from ..models.order import OrderStatus, PaymentStatus
 from ..models.order_item import OrderItemStatus
+from .statistics import StatisticsService
 
 
 class OrderService:
@@ -79,7 +80,7 @@ class OrderService:
         # Проверяем, нет ли уже активного заказа
         existing_order_query = select(Order).where(
             Order.table_id == table_id,
-            Order.status.in_([OrderStatus.PENDING, OrderStatus.READY, OrderStatus.SERVED, OrderStatus.DINING])
+            Order.is_active == True
         )
         existing_order_result = await db.execute(existing_order_query)
         existing_order = existing_order_result.scalar_one_or_none()
@@ -92,37 +93,16 @@ class OrderService:
     @staticmethod
     async def get_order_statistics(db: AsyncSession) -> dict:
         """Получить статистику заказов"""
-        # Общее количество заказов
-        total_query = select(func.count(Order.id))
-        total_result = await db.execute(total_query)
-        total_orders = total_result.scalar()
-        
-        # Статистика по статусам
-        status_stats = {}
-        for status in OrderStatus:
-            status_query = select(func.count(Order.id)).where(Order.status == status)
-            status_result = await db.execute(status_query)
-            status_stats[f"{status.value}_orders"] = status_result.scalar()
-        
-        # Общая выручка (только оплаченные заказы)
-        revenue_query = select(func.sum(Order.total_price)).where(
-            Order.payment_status == PaymentStatus.PAID
-        )
-        revenue_result = await db.execute(revenue_query)
-        total_revenue = revenue_result.scalar() or Decimal('0.00')
-        
-        # Средний чек
-        avg_order_query = select(func.avg(Order.total_price)).where(
-            Order.payment_status == PaymentStatus.PAID
-        )
-        avg_order_result = await db.execute(avg_order_query)
-        avg_order_value = avg_order_result.scalar() or Decimal('0.00')
-        
+        summary = await StatisticsService.get_order_summary(db)
+
         return {
-            "total_orders": total_orders,
-            **status_stats,
-            "total_revenue": total_revenue,
-            "average_order_value": avg_order_value
+            "total_orders": summary["total_orders"],
+            **{
+                f"{status.value}_orders": count
+                for status, count in summary["by_status"].items()
+            },
+            "total_revenue": summary["total_revenue"],
+            "average_order_value": summary["average_order_value"]
         }
     
     @staticmethod
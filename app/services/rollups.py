@@ -0,0 +1,250 @@
+"""
+QRes OS 4 - Sales Rollups
+Инкрементальное обновление почасовых агрегатов продаж и их пересборка
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import Integer, case, cast, delete, event, func, inspect, insert, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import Order, OrderItem, OrderArchive, OrderRollup, OrderItemRollup
+from ..models.order import OrderStatus, PaymentStatus
+from .archive import orders_with_archive, order_items_with_archive
+from .order_pricing import moscow_now
+
+
+# Колонка счетчика для каждого статуса заказа
+STATUS_COLUMNS = {status: f"{status.name.lower()}_orders" for status in OrderStatus}
+
+ORDER_FIELDS = (
+    "created_at", "waiter_id", "payment_method_id", "status",
+    "payment_status", "total_price", "time_to_serve"
+)
+ITEM_FIELDS = ("created_at", "dish_id", "department", "quantity", "total")
+
+
+def _bucket(created_at: Optional[datetime]) -> Tuple[str, int]:
+    """Ключ часа (день, час) по дате создания; у новой строки даты еще нет"""
+    created_at = created_at or moscow_now()
+    return created_at.strftime("%Y-%m-%d"), created_at.hour
+
+
+def _order_contribution(values: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+    """Вклад одного заказа в строку order_rollups"""
+    status = values["status"] or OrderStatus.PENDING
+    is_paid = values["payment_status"] == PaymentStatus.PAID
+    key = (*_bucket(values["created_at"]), values["waiter_id"], values["payment_method_id"] or 0)
+    counters = {
+        "orders": 1,
+        STATUS_COLUMNS[status]: 1,
+        "paid_orders": 1 if is_paid else 0,
+        "revenue": float(values["total_price"] or 0) if is_paid else 0.0,
+        "time_to_serve_total": values["time_to_serve"] or 0,
+        "time_to_serve_count": 1 if values["time_to_serve"] is not None else 0
+    }
+    return key, counters
+
+
+def _item_contribution(values: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+    """Вклад одной позиции в строку order_item_rollups"""
+    key = (*_bucket(values["created_at"]), values["dish_id"], values["department"])
+    counters = {
+        "items": 1,
+        "quantity": values["quantity"] or 0,
+        "total": float(values["total"] or 0)
+    }
+    return key, counters
+
+
+def _values(obj, fields: tuple, before: bool, is_new: bool = False) -> Dict[str, Any]:
+    """
+    Значения полей объекта до (before=True) или после текущего flush
+
+    Колонки, участвующие в агрегатах, объявлены с active_history=True,
+    поэтому старое значение измененного поля всегда есть в истории.
+    """
+    state = inspect(obj)
+    values = {}
+    for name in fields:
+        if is_new and name == "created_at" and name not in state.dict:
+            values[name] = None  # server_default новой строки еще не прочитан
+            continue
+        history = state.attrs[name].history
+        if before and history.has_changes():
+            values[name] = history.deleted[0] if history.deleted else None
+        else:
+            values[name] = getattr(obj, name)
+    return values
+
+
+def _accumulate(deltas: Dict[tuple, Dict[str, Any]], key: tuple, counters: Dict[str, Any], sign: int) -> None:
+    for column, value in counters.items():
+        deltas[key][column] += sign * value
+
+
+def _apply(connection: Connection, model, key_columns: tuple, deltas: Dict[tuple, Dict[str, Any]]) -> None:
+    """Прибавить дельты к строкам агрегатов (INSERT ... ON CONFLICT DO UPDATE)"""
+    table = model.__table__
+    for key, counters in deltas.items():
+        counters = {column: value for column, value in counters.items() if value}
+        if not counters:
+            continue
+        statement = sqlite_insert(table).values(**dict(zip(key_columns, key)), **counters)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={column: table.c[column] + statement.excluded[column] for column in counters}
+        ))
+
+
+@event.listens_for(Session, "after_flush")
+def _update_rollups(session: Session, flush_context) -> None:
+    """
+    Обновить агрегаты продаж в транзакции изменения заказа
+
+    Срабатывает на любое изменение заказов и позиций через ORM (оплата,
+    отмена, смена статуса, дозаказ, удаление): из ключа вычитается вклад
+    состояния до flush и прибавляется вклад нового состояния.
+    """
+    order_deltas: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+    item_deltas: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+
+    for objects, before, after in (
+        (session.new, False, True),
+        (session.dirty, True, True),
+        (session.deleted, True, False)
+    ):
+        for obj in objects:
+            if isinstance(obj, Order):
+                contribution, deltas, fields = _order_contribution, order_deltas, ORDER_FIELDS
+            elif isinstance(obj, OrderItem):
+                contribution, deltas, fields = _item_contribution, item_deltas, ITEM_FIELDS
+            else:
+                continue
+            if before and after and not session.is_modified(obj, include_collections=False):
+                continue
+            if before:
+                _accumulate(deltas, *contribution(_values(obj, fields, before=True)), -1)
+            if after:
+                _accumulate(deltas, *contribution(_values(obj, fields, before=False, is_new=not before)), 1)
+
+    if order_deltas or item_deltas:
+        connection = session.connection()
+        _apply(connection, OrderRollup, ("day", "hour", "waiter_id", "payment_method_id"), order_deltas)
+        _apply(connection, OrderItemRollup, ("day", "hour", "dish_id", "department"), item_deltas)
+
+
+def today_start() -> datetime:
+    """Начало текущих (московских) суток: раньше - закрытые дни из агрегатов"""
+    return moscow_now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_range(
+    date_from: Optional[datetime],
+    date_to: Optional[datetime]
+) -> Optional[Tuple[Optional[datetime], datetime]]:
+    """
+    Часы периода, которые можно взять из агрегатов: [start, end)
+
+    Берутся только целые часы закрытых дней; неполный час в начале периода,
+    последний час и сегодняшний день читаются из заказов. None - агрегаты
+    не нужны (весь период читается из заказов).
+    """
+    end = today_start()
+    if date_to is not None:
+        end = min(end, date_to.replace(tzinfo=None, minute=0, second=0, microsecond=0))
+
+    start = None
+    if date_from is not None:
+        start = date_from.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        if start < date_from.replace(tzinfo=None):
+            start += timedelta(hours=1)
+        if start >= end:
+            return None
+    return start, end
+
+
+def hours_between(day_column, hour_column, start: Optional[datetime], end: datetime) -> list:
+    """Условия "час агрегата в [start, end)" по колонкам day/hour"""
+    conditions = [tuple_(day_column, hour_column) < (end.strftime("%Y-%m-%d"), end.hour)]
+    if start is not None:
+        conditions.append(tuple_(day_column, hour_column) >= (start.strftime("%Y-%m-%d"), start.hour))
+    return conditions
+
+
+class RollupService:
+    """Пересборка агрегатов продаж из заказов (горячих и архивных)"""
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> Dict[str, int]:
+        """
+        Пересчитать order_rollups и order_item_rollups с нуля
+
+        Нужна после обновления (агрегатов для старых заказов еще нет) и после
+        изменений в обход ORM. Выполняется одной транзакцией.
+        """
+        await db.execute(delete(OrderRollup))
+        await db.execute(delete(OrderItemRollup))
+
+        orders = orders_with_archive(*ORDER_FIELDS)
+        order_key = (
+            func.strftime("%Y-%m-%d", orders.c.created_at),
+            cast(func.strftime("%H", orders.c.created_at), Integer),
+            orders.c.waiter_id,
+            func.coalesce(orders.c.payment_method_id, 0)
+        )
+        is_paid = orders.c.payment_status == PaymentStatus.PAID
+        order_rows = await db.execute(insert(OrderRollup).from_select(
+            ["day", "hour", "waiter_id", "payment_method_id", "orders", *STATUS_COLUMNS.values(),
+             "paid_orders", "revenue", "time_to_serve_total", "time_to_serve_count"],
+            select(
+                *order_key,
+                func.count(),
+                *[func.count(case((orders.c.status == status, 1))) for status in STATUS_COLUMNS],
+                func.count(case((is_paid, 1))),
+                func.coalesce(func.sum(case((is_paid, orders.c.total_price), else_=0)), 0),
+                func.coalesce(func.sum(orders.c.time_to_serve), 0),
+                func.count(orders.c.time_to_serve)
+            ).group_by(*order_key)
+        ))
+
+        items = order_items_with_archive(*ITEM_FIELDS)
+        item_key = (
+            func.strftime("%Y-%m-%d", items.c.created_at),
+            cast(func.strftime("%H", items.c.created_at), Integer),
+            items.c.dish_id,
+            items.c.department
+        )
+        item_rows = await db.execute(insert(OrderItemRollup).from_select(
+            ["day", "hour", "dish_id", "department", "items", "quantity", "total"],
+            select(
+                *item_key,
+                func.count(),
+                func.coalesce(func.sum(items.c.quantity), 0),
+                func.coalesce(func.sum(items.c.total), 0)
+            ).group_by(*item_key)
+        ))
+
+        await db.commit()
+        return {"order_rollups": order_rows.rowcount, "order_item_rollups": item_rows.rowcount}
+
+    @staticmethod
+    async def ensure_built(db: AsyncSession) -> bool:
+        """
+        Собрать агрегаты, если их еще нет, а заказы уже есть
+
+        Вызывается при запуске: после обновления таблицы агрегатов пусты, и
+        без пересборки отчеты за прошлые дни показали бы нули.
+        """
+        has_rollups = await db.scalar(select(select(OrderRollup.id).exists()))
+        has_orders = await db.scalar(select(
+            select(Order.id).exists() | select(OrderArchive.id).exists()
+        ))
+        if has_rollups or not has_orders:
+            return False
+        await RollupService.rebuild(db)
+        return True
@@ -0,0 +1,137 @@
+"""
+QRes OS 4 - Row Counts
+Total для списков: точный, из кэша или оценка без перебора строк
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..pagination import CountMode
+
+
+class RowCountService:
+    """
+    Подсчет строк для total списков
+
+    COUNT(*) с фильтрами перебирает все подходящие строки, поэтому total
+    считается только по запросу клиента:
+    - exact - COUNT(*) на каждый запрос;
+    - cached - тот же COUNT, но результат живет list_count_cache_ttl секунд;
+    - estimated - оценка по статистике SQLite (sqlite_stat1 после ANALYZE);
+      если статистики нет или фильтры оценить нельзя - как cached.
+
+    Признак "приблизительно" зависит только от режима: в cached и estimated
+    он всегда true, даже если значение только что посчитано, чтобы
+    одинаковые запросы не получали разный флаг.
+    """
+
+    # LRU: (таблица, фильтры) -> (истекает, значение), не больше list_count_cache_size записей
+    _cache: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+
+    @staticmethod
+    async def count(
+        db: AsyncSession,
+        model,
+        conditions: list,
+        mode: CountMode,
+        filters: Dict[str, Any],
+        estimable: bool = True
+    ) -> Tuple[Optional[int], bool]:
+        """
+        Посчитать строки model, подходящие под conditions
+
+        filters - значения фильтров запроса (ключ кэша и оценка: фильтры на
+        равенство по колонкам model); estimable=False, если среди условий
+        есть такие, что оценить нельзя (например, поиск по подстроке).
+
+        Returns:
+            (total или None, приблизительное ли значение)
+        """
+        if mode == CountMode.NONE:
+            return None, False
+        if mode == CountMode.EXACT:
+            return await RowCountService._exact(db, model, conditions), False
+
+        filters = {name: value for name, value in filters.items() if value is not None}
+        if mode == CountMode.ESTIMATED and estimable:
+            estimate = await RowCountService._estimate(db, model, filters)
+            if estimate is not None:
+                return estimate, True
+
+        key = (model.__tablename__, tuple(sorted((name, str(value)) for name, value in filters.items())))
+        total = RowCountService._cached(key)
+        if total is None:
+            total = await RowCountService._exact(db, model, conditions)
+            RowCountService._remember(key, total)
+        return total, True
+
+    @staticmethod
+    def _cached(key: Hashable) -> Optional[int]:
+        """Значение из кэша (None - нет или устарело)"""
+        cache = RowCountService._cache
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return entry[1]
+
+    @staticmethod
+    def _remember(key: Hashable, total: int) -> None:
+        cache = RowCountService._cache
+        cache[key] = (time.monotonic() + settings.list_count_cache_ttl, total)
+        cache.move_to_end(key)
+        while len(cache) > max(1, settings.list_count_cache_size):
+            cache.popitem(last=False)
+
+    @staticmethod
+    async def _exact(db: AsyncSession, model, conditions: list) -> int:
+        return (await db.execute(select(func.count(model.id)).where(*conditions))).scalar() or 0
+
+    @staticmethod
+    async def _estimate(db: AsyncSession, model, filters: Dict[str, Any]) -> Optional[int]:
+        """
+        Оценка числа строк без их перебора
+
+        sqlite_stat1 хранит для индекса "N a b ...": N строк и в среднем a
+        строк на значение первой колонки, поэтому фильтр на равенство по
+        первой колонке индекса дает долю a / N.
+        """
+        if db.bind.dialect.name != "sqlite":
+            return None
+
+        table = model.__table__
+        has_stats = await db.scalar(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ))
+        stats: Dict[Optional[str], list] = {}
+        if has_stats:
+            rows = await db.execute(
+                text("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = :tbl"),
+                {"tbl": table.name}
+            )
+            stats = {idx: [int(part) for part in stat.split() if part.isdigit()] for idx, stat in rows.all()}
+
+        if not any(stats.values()):
+            return None
+
+        total = max(numbers[0] for numbers in stats.values() if numbers)
+        # Первая колонка каждого индекса -> среднее число строк на значение
+        per_value = {}
+        for index in table.indexes:
+            numbers = stats.get(index.name)
+            if numbers and len(numbers) > 1:
+                per_value.setdefault(list(index.columns)[0].name, numbers[1])
+
+        estimate = float(total)
+        for name in filters:
+            if name not in per_value or not total:
+                return None
+            estimate *= per_value[name] / total
+        return int(round(estimate))
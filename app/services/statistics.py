@@ -0,0 +1,200 @@
+"""
+QRes OS 4 - Statistics Service
+Агрегированная статистика заказов и позиций одним запросом (условная агрегация)
+"""
+from typing import Dict, Optional, Type, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, and_, or_, union_all
+from datetime import datetime
+from decimal import Decimal
+import enum
+
+from ..models.order import OrderStatus, PaymentStatus
+from ..models.order_item import OrderItemStatus, KitchenDepartment
+from ..models import OrderRollup, OrderItemRollup
+from ..pagination import datetime_key
+from .archive import orders_with_archive, order_items_with_archive
+from .rollups import STATUS_COLUMNS, rollup_range, hours_between, today_start
+
+
+def _status_counts(column, enum_cls: Type[enum.Enum]) -> list:
+    """Колонки COUNT(CASE WHEN column = X THEN 1 END) для каждого значения перечисления"""
+    return [
+        func.count(case((column == member, 1))).label(f"status_{member.name}")
+        for member in enum_cls
+    ]
+
+
+def _to_decimal(value: Any) -> Decimal:
+    """Привести результат SUM/AVG к Decimal (NULL -> 0.00)"""
+    if value is None:
+        return Decimal('0.00')
+    return Decimal(str(value))
+
+
+class StatisticsService:
+    """
+    Сервис статистики
+
+    Каждый метод выполняет один SELECT: все счетчики по статусам, суммы и
+    средние считаются условной агрегацией по одному и тому же набору строк,
+    фильтры по периоду применяются один раз в WHERE. Строки читаются из
+    горячих и архивных таблиц (UNION ALL), фильтры применяются в каждой ветке.
+    Для закрытых дней сводка по заказам берется из почасовых агрегатов
+    (order_rollups), поэтому отчет за год не перебирает заказы года.
+    """
+
+    @staticmethod
+    async def get_order_summary(
+        db: AsyncSession,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Сводка по заказам за период
+
+        Returns:
+            {
+                "total_orders": int,
+                "by_status": {OrderStatus: int},
+                "paid_orders": int,
+                "total_revenue": Decimal,
+                "average_order_value": Decimal,
+                "average_time_to_serve": Optional[float]
+            }
+        """
+        # Целые часы закрытых дней - из агрегатов, остальное - из заказов
+        hours = rollup_range(date_from, date_to)
+
+        def period(model):
+            upper = [model.created_at <= date_to] if date_to else []
+            if hours is None:
+                lower = [model.created_at >= date_from] if date_from else []
+                return lower + upper
+            start, end = hours
+            tail = and_(model.created_at >= datetime_key(end), *upper)
+            if start is None or start == date_from:
+                return [tail]
+            head = and_(model.created_at >= date_from, model.created_at < datetime_key(start))
+            return [or_(head, tail)]
+
+        orders = orders_with_archive(
+            "id", "status", "payment_status", "total_price", "time_to_serve", "created_at",
+            where=period
+        )
+        is_paid = orders.c.payment_status == PaymentStatus.PAID
+        raw = select(
+            func.count(orders.c.id).label("total"),
+            *_status_counts(orders.c.status, OrderStatus),
+            func.count(case((is_paid, 1))).label("paid"),
+            func.sum(case((is_paid, orders.c.total_price))).label("revenue"),
+            func.sum(orders.c.time_to_serve).label("tts_total"),
+            func.count(orders.c.time_to_serve).label("tts_count")
+        )
+
+        parts = [raw]
+        if hours is not None:
+            parts.append(select(
+                func.sum(OrderRollup.orders).label("total"),
+                *[
+                    func.sum(getattr(OrderRollup, column)).label(f"status_{status.name}")
+                    for status, column in STATUS_COLUMNS.items()
+                ],
+                func.sum(OrderRollup.paid_orders).label("paid"),
+                func.sum(OrderRollup.revenue).label("revenue"),
+                func.sum(OrderRollup.time_to_serve_total).label("tts_total"),
+                func.sum(OrderRollup.time_to_serve_count).label("tts_count")
+            ).where(*hours_between(OrderRollup.day, OrderRollup.hour, *hours)))
+
+        combined = union_all(*parts).subquery()
+        row = (await db.execute(
+            select(*[func.sum(column).label(column.name) for column in combined.c])
+        )).one()
+
+        paid = row.paid or 0
+        revenue = _to_decimal(row.revenue)
+
+        return {
+            "total_orders": row.total or 0,
+            "by_status": {status: getattr(row, f"status_{status.name}") or 0 for status in OrderStatus},
+            "paid_orders": paid,
+            "total_revenue": revenue,
+            "average_order_value": _to_decimal(float(revenue) / paid) if paid else Decimal('0.00'),
+            "average_time_to_serve": row.tts_total / row.tts_count if row.tts_count else None
+        }
+
+    @staticmethod
+    async def get_dish_sales(db: AsyncSession, dish_id: int) -> Dict:
+        """
+        Продажи блюда за все время: закрытые дни - из агрегатов, сегодня - из позиций
+
+        Returns:
+            {"quantity": int, "revenue": Decimal}
+        """
+        today = today_start()
+        items = order_items_with_archive(
+            "quantity", "total", "dish_id", "created_at",
+            where=lambda model: [model.dish_id == dish_id, model.created_at >= datetime_key(today)]
+        )
+        combined = union_all(
+            select(
+                func.sum(OrderItemRollup.quantity).label("quantity"),
+                func.sum(OrderItemRollup.total).label("revenue")
+            ).where(
+                OrderItemRollup.dish_id == dish_id,
+                OrderItemRollup.day < today.strftime("%Y-%m-%d")
+            ),
+            select(
+                func.sum(items.c.quantity).label("quantity"),
+                func.sum(items.c.total).label("revenue")
+            )
+        ).subquery()
+
+        row = (await db.execute(
+            select(func.sum(combined.c.quantity).label("quantity"), func.sum(combined.c.revenue).label("revenue"))
+        )).one()
+
+        return {"quantity": row.quantity or 0, "revenue": _to_decimal(row.revenue)}
+
+    @staticmethod
+    async def get_order_item_summary(
+        db: AsyncSession,
+        department: Optional[KitchenDepartment] = None,
+        since: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Сводка по позициям заказов (для цехов кухни)
+
+        Returns:
+            {
+                "total_items": int,
+                "by_status": {OrderItemStatus: int},
+                "average_preparation_time": Optional[float]
+            }
+        """
+        def filters(model):
+            conditions = []
+            if department is not None:
+                conditions.append(model.department == department)
+            if since is not None:
+                conditions.append(model.created_at >= since)
+            return conditions
+
+        items = order_items_with_archive(
+            "id", "status", "actual_preparation_time", "department", "created_at",
+            where=filters
+        )
+
+        query = select(
+            func.count(items.c.id).label("total"),
+            *_status_counts(items.c.status, OrderItemStatus),
+            func.avg(items.c.actual_preparation_time).label("avg_preparation_time")
+        )
+
+        row = (await db.execute(query)).one()
+
+        return {
+            "total_items": row.total or 0,
+            "by_status": {status: getattr(row, f"status_{status.name}") or 0 for status in OrderItemStatus},
+            "average_preparation_time": row.avg_preparation_time
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - Middleware Latency Benchmark
+Задержка запроса через весь стек middleware: /health и /dishes/menu
+
+Приложение вызывается в том же процессе через httpx.ASGITransport (без сети),
+поэтому разница между запусками - это стоимость middleware и обработчиков.
+Для сравнения "до/после" запустите скрипт на разных коммитах.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Отдельная временная база: настройки читаются при импорте приложения
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ["DEBUG"] = "false"
+# Ограничитель включен (DEBUG=false), но бюджеты не должны срабатывать на замере
+os.environ["RATE_LIMIT_MAX_REQUESTS"] = "1000000"
+os.environ["RATE_LIMIT_PUBLIC_MAX_REQUESTS"] = "1000000"
+
+import logging
+
+import httpx
+
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models import Category, Dish
+
+
+WARMUP = 200
+REQUESTS = 2000
+ENDPOINTS = ["/health", "/dishes/menu"]
+
+
+async def seed_menu():
+    """Меню из 5 категорий по 10 блюд"""
+    async with AsyncSessionLocal() as session:
+        for category_index in range(5):
+            category = Category(name=f"Категория {category_index}", sort_order=category_index)
+            session.add(category)
+            await session.flush()
+            for dish_index in range(10):
+                session.add(Dish(
+                    name=f"Блюдо {category_index}-{dish_index}",
+                    description="Описание блюда для проверки размера ответа",
+                    category_id=category.id,
+                    cooking_time=15,
+                    weight=250.0
+                ))
+        await session.commit()
+
+
+async def bench(client: httpx.AsyncClient, path: str):
+    for _ in range(WARMUP):
+        await client.get(path)
+
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = await client.get(path)
+        timings.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200, f"{path}: {response.status_code}"
+
+    timings.sort()
+    print(f"   {path:<14} среднее {statistics.mean(timings):8.1f} мкс | "
+          f"p50 {timings[len(timings) // 2]:8.1f} | p99 {timings[int(len(timings) * 0.99)]:8.1f}")
+
+
+async def main():
+    # Вывод логов запросов в консоль не должен влиять на замер
+    logging.disable(logging.CRITICAL)
+
+    transport = httpx.ASGITransport(app=app, client=("192.168.4.10", 50000))
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Linux; Android 13) Chrome/118.0 Mobile Safari/537.36",
+        "Origin": "http://192.168.4.1:5173",
+    }
+    async with app.router.lifespan_context(app):
+        await seed_menu()
+        async with httpx.AsyncClient(transport=transport, base_url="http://192.168.4.1:8000", headers=headers) as client:
+            print(f"🚀 Задержка через стек middleware ({REQUESTS} запросов)")
+            print("=" * 50)
+            for path in ENDPOINTS:
+                await bench(client, path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
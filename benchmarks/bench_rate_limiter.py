@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - Rate Limiter Benchmark
+Стоимость проверки лимита на запрос при 10 000 различных IP
+"""
+import random
+import sys
+import os
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rate_limit import create_rate_limiter
+
+
+DISTINCT_IPS = 10_000
+REQUESTS = 200_000
+PATHS = ["/dishes/menu", "/orders/", "/kitchen/orders", "/auth/login", "/tables/"]
+
+
+class ListLimiter:
+    """Прежний алгоритм RateLimiterMiddleware: список отметок времени на IP"""
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+        self.request_records = {}
+
+    def hit(self, ip: str, path: str, now: float) -> bool:
+        records = self.request_records.setdefault(ip, [])
+        records.append((now, path))
+        time_limit = now - self.window
+        records = [(t, p) for t, p in records if t >= time_limit]
+        self.request_records[ip] = records
+        return len(records) <= self.limit
+
+
+def workload():
+    """Запросы от 10 000 IP: несколько активных клиентов и много гостей"""
+    rng = random.Random(42)
+    ips = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(DISTINCT_IPS)]
+    hot = ips[:50]
+    requests = []
+    for _ in range(REQUESTS):
+        ip = rng.choice(hot) if rng.random() < 0.5 else rng.choice(ips)
+        requests.append((ip, rng.choice(PATHS)))
+    return requests
+
+
+def bench_unified(requests) -> float:
+    limiter = create_rate_limiter()
+    start = time.perf_counter()
+    now = 0.0
+    for ip, path in requests:
+        now += 0.0003  # ~200 000 запросов за минуту
+        limiter.hit(ip, limiter.route_class(path), now)
+    elapsed = time.perf_counter() - start
+    print(f"   Ключей в памяти: {limiter.stats()['tracked_keys']}")
+    return elapsed
+
+
+def bench_list(requests) -> float:
+    limiter = ListLimiter(limit=10**9, window=60)
+    start = time.perf_counter()
+    now = 0.0
+    for ip, path in requests:
+        now += 0.0003
+        limiter.hit(ip, path, now)
+    elapsed = time.perf_counter() - start
+    print(f"   IP в памяти: {len(limiter.request_records)}")
+    return elapsed
+
+
+def main():
+    print(f"🚀 Rate limiter: {REQUESTS} запросов от {DISTINCT_IPS} IP")
+    print("=" * 50)
+    requests = workload()
+
+    print("📋 Прежний список отметок времени:")
+    list_time = bench_list(requests)
+    print(f"   ⏱  {list_time / REQUESTS * 1e6:.2f} мкс/запрос")
+
+    print("📋 Единый ограничитель (скользящее окно + LRU):")
+    unified_time = bench_unified(requests)
+    print(f"   ⏱  {unified_time / REQUESTS * 1e6:.2f} мкс/запрос")
+
+    print("")
+    print(f"⚡ Ускорение: x{list_time / unified_time:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - Request Screening Benchmark
+Общий сопоставитель паттернов против трех прежних проверок на типичных URL
+"""
+import sys
+import os
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.request_screening import RULES, FILTER_PATH, FILTER_AGENT, MONITOR, ALERT, PATH, QUERY, AGENT, request_matcher
+
+
+ROUNDS = 20_000
+
+BROWSER = "Mozilla/5.0 (Linux; Android 13; SM-A536B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Mobile Safari/537.36"
+
+# (path, query, user_agent): обычный трафик ресторана и немного сканеров
+REQUESTS = [
+    ("/dishes/menu", "", BROWSER),
+    ("/dishes/menu", "", BROWSER),
+    ("/kitchen/orders", "department=hot_kitchen&status=in_preparation", BROWSER),
+    ("/orders/", "status=pending&limit=50", BROWSER),
+    ("/orders/128/items", "", BROWSER),
+    ("/tables/", "is_active=true", BROWSER),
+    ("/dashboard/stats", "", BROWSER),
+    ("/uploads/dishes/3f9a1c2e.jpg", "", BROWSER),
+    ("/auth/me", "", BROWSER),
+    ("/health", "", "kube-probe/1.27"),
+    ("/wp-login.php", "", "Mozilla/5.0 zgrab/0.x"),
+    ("/.env", "", "python-requests/2.31.0"),
+    ("/orders/", "id=1 union select password from users", "sqlmap/1.7"),
+]
+
+
+def _patterns(group: str, target: str):
+    return [rule.pattern for rule in RULES if rule.group == group and target in rule.targets]
+
+
+FILTER_PATH_PATTERNS = _patterns(FILTER_PATH, PATH)
+FILTER_AGENT_PATTERNS = _patterns(FILTER_AGENT, AGENT)
+MONITOR_URL_PATTERNS = _patterns(MONITOR, PATH)
+MONITOR_AGENT_PATTERNS = _patterns(MONITOR, AGENT)
+ALERT_PATTERNS = _patterns(ALERT, PATH)
+
+
+def legacy_screen(path: str, query: str, user_agent: str) -> bool:
+    """Прежние три прохода: монитор, фильтр и middleware мониторинга"""
+    # SecurityMonitor.is_suspicious_request
+    url_path = path.lower()
+    query_params = query.lower()
+    agent = user_agent.lower()
+    suspicious = any(p in url_path or p in query_params for p in MONITOR_URL_PATTERNS)
+    suspicious = suspicious or any(p in agent for p in MONITOR_AGENT_PATTERNS) or not user_agent
+
+    # SuspiciousRequestFilterMiddleware.dispatch
+    filter_path = path.lower()
+    filter_agent = user_agent.lower()
+    blocked = any(p in filter_path for p in FILTER_PATH_PATTERNS)
+    blocked = blocked or any(p in filter_agent for p in FILTER_AGENT_PATTERNS)
+
+    # security_monitoring_middleware
+    alert = any(p in path.lower() for p in ALERT_PATTERNS)
+    return suspicious or blocked or alert
+
+
+def unified_screen(path: str, query: str, user_agent: str) -> bool:
+    return not request_matcher.match(path, query, user_agent).is_clean
+
+
+def bench(name: str, func) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for path, query, user_agent in REQUESTS:
+            func(path, query, user_agent)
+    elapsed = time.perf_counter() - start
+    per_request = elapsed / (ROUNDS * len(REQUESTS)) * 1e6
+    print(f"   {name}: {per_request:.2f} мкс/запрос")
+    return elapsed
+
+
+def main():
+    print(f"🚀 Проверка запросов: {ROUNDS * len(REQUESTS)} запросов")
+    print("=" * 50)
+
+    # Результаты должны совпадать
+    for path, query, user_agent in REQUESTS:
+        assert legacy_screen(path, query, user_agent) == unified_screen(path, query, user_agent), path
+
+    legacy = bench("Три прохода (прежний код)", legacy_screen)
+    unified = bench("Общий сопоставитель      ", unified_screen)
+    print("")
+    print(f"⚡ Ускорение: x{legacy / unified:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
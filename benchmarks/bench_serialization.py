@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - JSON Serialization Benchmark
+Кодирование ответов самых тяжелых эндпоинтов: json.dumps против app.serialization
+
+1. Тело ответа /kitchen/dishes, /kitchen/dishes/changes и /orders/?expand=items
+   берется у работающего приложения и кодируется стандартным JSONResponse
+   и FastJSONResponse (разница - только стоимость кодирования).
+2. Задержка тех же запросов целиком через ASGI (для сравнения "до/после"
+   запустите скрипт на разных коммитах).
+3. Сообщение WebSocket: json.dumps(ensure_ascii=False) против dumps_text.
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Отдельная временная база: настройки читаются при импорте приложения
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ["DEBUG"] = "false"
+os.environ["RATE_LIMIT_MAX_REQUESTS"] = "1000000"
+os.environ["RATE_LIMIT_PUBLIC_MAX_REQUESTS"] = "1000000"
+
+import logging
+
+import httpx
+from starlette.responses import JSONResponse
+
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models import User, UserRole, Location, Table, Category, Dish, Order, OrderItem
+from app.models.order_item import OrderItemStatus, KitchenDepartment
+from app.services.auth import AuthService
+from app.serialization import FastJSONResponse, dumps_text, orjson
+
+
+ORDERS = 200
+ITEMS_PER_ORDER = 5
+RENDER_ROUNDS = 300
+REQUESTS = 200
+ENDPOINTS = [
+    "/kitchen/dishes?limit=500",
+    "/kitchen/dishes/changes",
+    "/orders/?limit=100&expand=items",
+]
+
+
+async def seed():
+    """200 открытых заказов по 5 позиций на 20 столиках, блюда всех цехов"""
+    departments = list(KitchenDepartment)
+    statuses = [OrderItemStatus.IN_PREPARATION, OrderItemStatus.READY, OrderItemStatus.SERVED]
+    async with AsyncSessionLocal() as session:
+        admin = User(
+            username="admin", full_name="Администратор",
+            password_hash=AuthService.hash_password("admin"), role=UserRole.ADMIN
+        )
+        location = Location(name="Основной зал")
+        category = Category(name="Горячее")
+        session.add_all([admin, location, category])
+        await session.flush()
+
+        tables = [Table(number=number, seats=4, location_id=location.id) for number in range(1, 21)]
+        dishes = [
+            Dish(
+                name=f"Блюдо {index}", description="Описание блюда для проверки размера ответа",
+                category_id=category.id, cooking_time=15, department=departments[index % len(departments)]
+            )
+            for index in range(30)
+        ]
+        session.add_all(tables + dishes)
+        await session.flush()
+
+        for index in range(ORDERS):
+            order = Order(
+                table_id=tables[index % len(tables)].id, waiter_id=admin.id,
+                total_price=350.0 * ITEMS_PER_ORDER, notes="Без лука"
+            )
+            session.add(order)
+            await session.flush()
+            for position in range(ITEMS_PER_ORDER):
+                dish = dishes[(index + position) % len(dishes)]
+                session.add(OrderItem(
+                    order_id=order.id, dish_id=dish.id, quantity=1, price=350.0, total=350.0,
+                    status=statuses[(index + position) % len(statuses)], department=dish.department,
+                    comment="Побольше соуса" if position == 0 else None
+                ))
+        await session.commit()
+
+
+def bench_render(name: str, payload) -> None:
+    """Стоимость кодирования одного тела ответа"""
+    results = []
+    for label, response_class in (("json", JSONResponse), ("fast", FastJSONResponse)):
+        renderer = response_class.__new__(response_class)
+        renderer.render(payload)
+        start = time.perf_counter()
+        for _ in range(RENDER_ROUNDS):
+            body = renderer.render(payload)
+        results.append((label, (time.perf_counter() - start) / RENDER_ROUNDS * 1e6, len(body)))
+
+    (_, slow, size), (_, fast, _) = results
+    print(f"   {name:<34} {size / 1024:7.1f} КБ | json {slow:8.1f} мкс | fast {fast:8.1f} мкс | x{slow / fast:4.1f}")
+
+
+async def bench_latency(client: httpx.AsyncClient, path: str, headers: dict) -> None:
+    for _ in range(20):
+        await client.get(path, headers=headers)
+
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        timings.append((time.perf_counter() - start) * 1e3)
+        assert response.status_code == 200, f"{path}: {response.status_code}"
+
+    timings.sort()
+    print(f"   {path:<34} среднее {statistics.mean(timings):7.2f} мс | "
+          f"p50 {timings[len(timings) // 2]:7.2f} | p99 {timings[int(len(timings) * 0.99)]:7.2f}")
+
+
+def bench_websocket() -> None:
+    message = {
+        "type": "item_status_changed",
+        "data": {
+            "item_id": 1250, "order_id": 250, "dish_name": "Борщ со сметаной",
+            "department": "hot", "old_status": "IN_PREPARATION", "new_status": "READY",
+            "table_number": 12, "message": "Борщ со сметаной (заказ #250): IN_PREPARATION → READY"
+        },
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    rounds = 100000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        json.dumps(message, ensure_ascii=False)
+    slow = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        dumps_text(message)
+    fast = (time.perf_counter() - start) / rounds * 1e6
+    print(f"   {'item_status_changed':<34} json {slow:6.2f} мкс | fast {fast:6.2f} мкс | x{slow / fast:4.1f}")
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+
+    print(f"🚀 Сериализация JSON ({'orjson ' + orjson.__version__ if orjson else 'orjson не установлен - стандартный json'})")
+    print("=" * 60)
+
+    transport = httpx.ASGITransport(app=app, client=("192.168.4.10", 50000))
+    async with app.router.lifespan_context(app):
+        await seed()
+        async with httpx.AsyncClient(transport=transport, base_url="http://192.168.4.1:8000") as client:
+            login = await client.post("/auth/login", json={"username": "admin", "password": "admin"})
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+            print(f"📦 Кодирование тела ответа (среднее из {RENDER_ROUNDS})")
+            for path in ENDPOINTS:
+                response = await client.get(path, headers=headers)
+                assert response.status_code == 200, f"{path}: {response.status_code}"
+                bench_render(path, response.json())
+
+            print(f"\n⏱️  Запрос целиком ({REQUESTS} запросов)")
+            for path in ENDPOINTS:
+                await bench_latency(client, path, headers)
+
+    print("\n📡 Сообщение WebSocket")
+    bench_websocket()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
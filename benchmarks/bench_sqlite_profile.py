@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - SQLite Profile Benchmark
+Пропускная способность записи при разных PRAGMA: по умолчанию, WAL+FULL и профиль из настроек
+
+Каждая транзакция - одна небольшая вставка с коммитом, как создание
+позиции заказа. Второй замер - параллельные писатели и читатели.
+Запускать на целевом носителе (SD-карта Raspberry Pi), указав каталог:
+    python3 benchmarks/bench_sqlite_profile.py /home/admin/qresos
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from sqlalchemy.pool import NullPool
+
+from app.database import install_sqlite_profile, sqlite_engine_options, sqlite_pragmas
+
+
+SEQUENTIAL_COMMITS = 500
+CONCURRENT_WRITERS = 20
+WRITES_PER_WRITER = 25
+READERS = 5
+
+# (PRAGMA, пул соединений); без пула каждая сессия открывает файл заново
+PROFILES = {
+    "по умолчанию (DELETE, FULL, без пула)": ({}, False),
+    "WAL + FULL": ({"journal_mode": "WAL", "synchronous": "FULL"}, True),
+    "профиль из настроек": (sqlite_pragmas(), True),
+}
+
+CREATE_TABLE = """
+CREATE TABLE bench_items (
+    id INTEGER PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    dish_id INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    comment TEXT,
+    created_at DATETIME DEFAULT (datetime('now'))
+)
+"""
+INSERT = text(
+    "INSERT INTO bench_items (order_id, dish_id, status, comment) "
+    "VALUES (:order_id, :dish_id, 'new', 'без лука')"
+)
+
+
+def make_engine(directory: str, name: str, pragmas: dict, pooled: bool):
+    path = os.path.join(directory, f"bench_{abs(hash(name))}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    url = f"sqlite+aiosqlite:///{path}"
+    options = sqlite_engine_options(url) if pooled else {"poolclass": NullPool}
+    engine = create_async_engine(url, **options)
+    install_sqlite_profile(engine, pragmas)
+    return engine
+
+
+async def sequential(engine) -> float:
+    """Коммиты по одному подряд: транзакций в секунду"""
+    start = time.perf_counter()
+    for index in range(SEQUENTIAL_COMMITS):
+        async with engine.begin() as conn:
+            await conn.execute(INSERT, {"order_id": index // 5, "dish_id": index % 40})
+    return SEQUENTIAL_COMMITS / (time.perf_counter() - start)
+
+
+async def concurrent(engine):
+    """Параллельные писатели и читатели: транзакций в секунду и число ошибок блокировки"""
+    locked = 0
+    done = asyncio.Event()
+
+    async def writer(writer_id: int):
+        nonlocal locked
+        for index in range(WRITES_PER_WRITER):
+            try:
+                async with engine.begin() as conn:
+                    await conn.execute(INSERT, {"order_id": writer_id, "dish_id": index})
+            except OperationalError:
+                locked += 1
+
+    async def reader():
+        nonlocal locked
+        while not done.is_set():
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT status, count(*) FROM bench_items GROUP BY status"))
+            except OperationalError:
+                locked += 1
+            await asyncio.sleep(0)
+
+    readers = [asyncio.create_task(reader()) for _ in range(READERS)]
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(i) for i in range(CONCURRENT_WRITERS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*readers)
+    return CONCURRENT_WRITERS * WRITES_PER_WRITER / elapsed, locked
+
+
+async def main(directory: str):
+    print(f"🚀 Запись в SQLite: {directory}")
+    print("=" * 50)
+    for name, (pragmas, pooled) in PROFILES.items():
+        engine = make_engine(directory, name, pragmas, pooled)
+        async with engine.begin() as conn:
+            await conn.execute(text(CREATE_TABLE))
+
+        sequential_tps = await sequential(engine)
+        concurrent_tps, locked = await concurrent(engine)
+        await engine.dispose()
+
+        print(f"📋 {name}: {pragmas or 'без PRAGMA'}")
+        print(f"   последовательно: {sequential_tps:8.0f} коммитов/с")
+        print(f"   параллельно:     {concurrent_tps:8.0f} коммитов/с, ошибок блокировки: {locked}")
+    return 0
+
+
+if __name__ == "__main__":
+    target_dir = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    sys.exit(asyncio.run(main(target_dir)))
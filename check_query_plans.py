@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - Check Query Plans
+Проверка планов основных запросов заказов/кухни через EXPLAIN QUERY PLAN
+
+Скрипт строит те же запросы, что выполняют роутеры и сервисы (списки
+заказов, столики и доску кухни - их же функциями), и завершается
+с кодом 1, если SQLite выбирает полный просмотр таблицы (SCAN) вместо поиска
+по индексу. Если база создана до появления индексов - примените миграции:
+
+    alembic upgrade head
+"""
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, and_, case
+from sqlalchemy.orm import joinedload
+
+from app.config import settings
+from app.database import engine, init_db
+from app.models import Order, OrderItem
+from app.models.order import OrderStatus, PaymentStatus
+from app.models.order_item import OrderItemStatus, KitchenDepartment
+from app.routers.orders import (
+    _active_table_orders_query, _order_filters, _order_list_query, _order_list_sort, _reorder_target_query
+)
+from app.schemas import Order as OrderSchema
+from app.services.kitchen import KitchenService
+
+
+# Таблицы, по которым полный просмотр недопустим
+HOT_TABLES = ("orders", "order_items")
+
+# Запросы без фильтра, которые читают строки в порядке индекса и
+# останавливаются на LIMIT: для них допустим обход только этого индекса
+ORDERED_SCANS = {
+    "Список заказов (GET /orders/)": "ix_orders_in_work_created_at",
+}
+
+
+def _order_list(status=None, waiter_id=None):
+    """GET /orders/ в режиме skip/limit - запрос роутера с его сортировкой"""
+    filters = _order_filters(Order, status, None, None, waiter_id)
+    return _order_list_query(Order, filters, OrderSchema).order_by(*_order_list_sort(status)).limit(100)
+
+
+def build_queries() -> dict:
+    """
+    Основные запросы в том виде, в каком их выполняет приложение
+
+    Запросы списков, столиков и доски кухни строятся теми же функциями,
+    что используют роутеры и сервисы, поэтому проверка следит за их
+    текущим видом и индексами.
+    """
+    now = datetime.utcnow() + timedelta(hours=3)
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    board_limit = KitchenService.department_limit(KitchenDepartment.HOT_KITCHEN)
+
+    return {
+        "Доска цеха (KitchenService.get_orders_for_department)": select(OrderItem).options(
+            joinedload(OrderItem.dish),
+            joinedload(OrderItem.order).joinedload(Order.table)
+        ).where(
+            and_(
+                OrderItem.department == KitchenDepartment.HOT_KITCHEN,
+                OrderItem.status.in_([OrderItemStatus.IN_PREPARATION])
+            )
+        ).order_by(OrderItem.created_at.asc()),
+
+        "Страница доски кухни (KitchenService.get_all_kitchen_dishes)": KitchenService._board_page_query(
+            KitchenDepartment.HOT_KITCHEN,
+            KitchenService.BOARD_STATUSES,
+            settings.kitchen_served_window_minutes,
+            board_limit
+        ),
+
+        "Следующая страница доски (cursor)": KitchenService._board_page_query(
+            KitchenDepartment.HOT_KITCHEN,
+            KitchenService.BOARD_STATUSES,
+            settings.kitchen_served_window_minutes,
+            board_limit,
+            (day_start, 1)
+        ),
+
+        "Активные заказы столика (GET /orders/active/table/{id})": _active_table_orders_query(1),
+
+        "Заказ для дозаказа (POST /orders/)": _reorder_target_query(1).limit(1),
+
+        "Список заказов (GET /orders/)": _order_list(),
+
+        "Позиции заказа (selectinload Order.items)": select(OrderItem).where(
+            OrderItem.order_id.in_([1, 2, 3])
+        ),
+
+        "Неготовые позиции при оплате": select(OrderItem).where(
+            and_(
+                OrderItem.order_id == 1,
+                OrderItem.status.in_([OrderItemStatus.IN_PREPARATION, OrderItemStatus.READY])
+            )
+        ),
+
+        "Заказы официанта (GET /orders/?waiter_id=)": _order_list(waiter_id=1),
+
+        "Заказы по статусу (GET /orders/?status=)": _order_list(status=OrderStatus.PENDING),
+
+        "Статистика заказов за период (StatisticsService)": select(
+            func.count(Order.id),
+            func.sum(case((Order.payment_status == PaymentStatus.PAID, Order.total_price)))
+        ).where(
+            Order.created_at >= day_start,
+            Order.created_at <= now
+        ),
+
+        "Статистика цеха (StatisticsService)": select(
+            func.count(OrderItem.id),
+            func.avg(OrderItem.actual_preparation_time)
+        ).where(
+            OrderItem.department == KitchenDepartment.HOT_KITCHEN,
+            OrderItem.created_at >= now - timedelta(hours=24)
+        ),
+    }
+
+
+def find_scans(plan_rows, ordered_index: Optional[str] = None) -> list:
+    """
+    Строки плана с полным просмотром горячих таблиц
+
+    ordered_index - индекс, обход которого по порядку (с LIMIT) ожидаем.
+    """
+    scans = []
+    for row in plan_rows:
+        detail = row[-1]
+        words = detail.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in HOT_TABLES:
+            if ordered_index is not None and words[-1] == ordered_index and "INDEX" in words:
+                continue
+            # "SCAN orders USING INDEX ..." - обход индекса целиком, тоже просмотр
+            scans.append(detail)
+    return scans
+
+
+async def check_query_plans() -> int:
+    """Выполнить EXPLAIN QUERY PLAN для всех запросов"""
+    if not settings.database_url.startswith("sqlite"):
+        print("❌ Проверка планов поддерживается только для SQLite")
+        return 1
+
+    await init_db()
+
+    failed = 0
+    async with engine.connect() as conn:
+        for name, query in build_queries().items():
+            compiled = query.compile(
+                dialect=conn.dialect,
+                compile_kwargs={"render_postcompile": True}
+            )
+            params = tuple(compiled.params[key] for key in compiled.positiontup)
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+            plan = result.fetchall()
+            scans = find_scans(plan, ORDERED_SCANS.get(name))
+
+            print(f"{'❌' if scans else '✅'} {name}")
+            for row in plan:
+                print(f"      {row[-1]}")
+            if scans:
+                failed += 1
+
+    print("=" * 50)
+    if failed:
+        print(f"💥 Полный просмотр таблицы в {failed} запрос(ах). Выполните: alembic upgrade head")
+        return 1
+
+    print("🌟 Все запросы используют индексы")
+    return 0
+
+
+async def main():
+    """Главная функция"""
+    print("🔍 Проверка планов запросов QRes OS 4")
+    print(f"🗄️  База данных: {settings.database_url}")
+    print("=" * 50)
+
+    try:
+        return await check_query_plans()
+    except Exception as e:
+        print(f"💥 Критическая ошибка: {e}")
+        return 1
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
@@ -33,7 +33,7 @@ async def create_admin_user():
                 return
             
             # Создаем нового администратора
-            hashed_password = AuthService.hash_password("admin")
+            hashed_password = await AuthService.hash_password_async("admin")
             
             admin_user = User(
                 username="admin",
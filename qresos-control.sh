@@ -91,7 +91,9 @@ case "$1" in
         BACKUP_DIR="/home/admin/qresos/backups"
         mkdir -p $BACKUP_DIR
         TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-        cp "$PROJECT_PATH/app.db" "$BACKUP_DIR/app_backup_$TIMESTAMP.db"
+        # Копия через backup API SQLite: учитывает незаписанный в файл WAL (app.db-wal)
+        python3 -c "import sqlite3, sys; sqlite3.connect(sys.argv[1]).backup(sqlite3.connect(sys.argv[2]))" \
+            "$PROJECT_PATH/app.db" "$BACKUP_DIR/app_backup_$TIMESTAMP.db"
         echo -e "${GREEN}✅ Резервная копия создана: $BACKUP_DIR/app_backup_$TIMESTAMP.db${NC}"
         ;;
     *)
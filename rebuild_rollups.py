@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+QRes OS 4 - Rebuild Sales Rollups
+Пересборка почасовых агрегатов продаж из заказов (горячих и архивных)
+
+Запускать после обновления (заполнить агрегаты за прошлые дни) и после
+правок заказов в обход приложения.
+"""
+import asyncio
+import sys
+import os
+
+# Добавляем путь к приложению
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import AsyncSessionLocal, engine, init_db
+from app.services.rollups import RollupService
+
+
+async def main():
+    """Главная функция"""
+    print("📊 Пересборка агрегатов продаж QRes OS 4")
+    print("=" * 50)
+    
+    try:
+        await init_db()
+        async with AsyncSessionLocal() as session:
+            result = await RollupService.rebuild(session)
+        print(f"✅ Агрегатов заказов: {result['order_rollups']}")
+        print(f"✅ Агрегатов позиций: {result['order_item_rollups']}")
+    except Exception as e:
+        print(f"💥 Ошибка пересборки агрегатов: {e}")
+        return 1
+    finally:
+        await engine.dispose()
+    
+    return 0
+
+
+if __name__ == "__main__":
+    exit_code = asyncio.run(main())
+    sys.exit(exit_code)
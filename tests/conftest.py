@@ -0,0 +1,23 @@
+"""
+QRes OS 4 - Test Configuration
+Общая временная база для всех тестов
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Настройки и движок создаются один раз при первом импорте app, поэтому
+# база задается здесь - до импорта тестовых модулей. Все тесты работают
+# с одной базой: данные каждого теста - под своими именами и номерами.
+_db_dir = tempfile.mkdtemp(prefix="qres-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["DEBUG"] = "false"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_dir():
+    """Каталог временной базы; удаляется после прогона"""
+    yield _db_dir
+    shutil.rmtree(_db_dir, ignore_errors=True)
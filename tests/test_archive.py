@@ -0,0 +1,153 @@
+"""
+QRes OS 4 - Order Archive Test
+Перенос закрытых заказов в архив пачками и чтение архивных заказов
+"""
+import asyncio
+from datetime import timedelta
+
+import httpx
+from sqlalchemy import select
+
+from app.main import app
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import (
+    Category, Dish, Order, OrderItem, OrderArchive, OrderItemArchive, Table, User, UserRole
+)
+from app.models.order import OrderStatus, PaymentStatus
+from app.services.archive import ArchiveService, archive_progress
+from app.services.auth import AuthService
+from app.services.order_pricing import moscow_now
+
+
+async def _create_orders():
+    """
+    Заказы двухмесячной давности и один свежий
+
+    Архивируются только закрытые; открытые (оплаченный тоже), свежий и
+    самый новый (max(id)) остаются в горячих таблицах.
+    """
+    async with AsyncSessionLocal() as session:
+        admin = User(
+            username="archive_admin",
+            full_name="Archive Admin",
+            password_hash=await AuthService.hash_password_async("password"),
+            role=UserRole.ADMIN
+        )
+        category = Category(name="Архив")
+        table = Table(number=5000, seats=4)
+        session.add_all([admin, category, table])
+        await session.flush()
+        dish = Dish(name="Архивный суп", description="Тест", category_id=category.id)
+        session.add(dish)
+        await session.flush()
+
+        old = moscow_now() - timedelta(days=60)
+        specs = {
+            "completed": (OrderStatus.COMPLETED, PaymentStatus.PAID, old),
+            "cancelled": (OrderStatus.CANCELLED, PaymentStatus.UNPAID, old + timedelta(minutes=1)),
+            "paid_open": (OrderStatus.SERVED, PaymentStatus.PAID, old + timedelta(minutes=2)),
+            "paid_pending": (OrderStatus.PENDING, PaymentStatus.PAID, old + timedelta(minutes=2)),
+            "unpaid_open": (OrderStatus.DINING, PaymentStatus.UNPAID, old + timedelta(minutes=3)),
+            "recent": (OrderStatus.COMPLETED, PaymentStatus.PAID, moscow_now() - timedelta(days=1)),
+            "newest": (OrderStatus.COMPLETED, PaymentStatus.PAID, old + timedelta(minutes=4)),
+        }
+        orders = {}
+        for name, (order_status, payment_status, created_at) in specs.items():
+            order = Order(
+                table_id=table.id, waiter_id=admin.id, status=order_status,
+                payment_status=payment_status, total_price=300, created_at=created_at
+            )
+            session.add(order)
+            await session.flush()
+            session.add_all([
+                OrderItem(order_id=order.id, dish_id=dish.id, quantity=1, price=150, total=150,
+                          department=dish.department, created_at=created_at)
+                for _ in range(2)
+            ])
+            orders[name] = order.id
+        await session.commit()
+        return admin, orders, old
+
+
+async def _archive():
+    async with app.router.lifespan_context(app):
+        admin, orders, old = await _create_orders()
+        token = AuthService.create_access_token({"sub": admin.username, "user_id": admin.id})
+        headers = {"Authorization": f"Bearer {token}"}
+        period = {"date_from": (old - timedelta(hours=1)).isoformat(),
+                  "date_to": (old + timedelta(hours=1)).isoformat()}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            stats_before = (await client.get("/orders/stats/summary", params=period, headers=headers)).json()
+
+            runs = archive_progress.runs
+            totals = await ArchiveService.run(days=30, batch_size=2)
+
+            async with AsyncSessionLocal() as session:
+                hot = set((await session.execute(
+                    select(Order.id).where(Order.id.in_(orders.values()))
+                )).scalars())
+                archived = set((await session.execute(
+                    select(OrderArchive.id).where(OrderArchive.id.in_(orders.values()))
+                )).scalars())
+                hot_items = set((await session.execute(
+                    select(OrderItem.order_id).where(OrderItem.order_id.in_(orders.values()))
+                )).scalars())
+                archived_items = (await session.execute(
+                    select(OrderItemArchive.order_id).where(OrderItemArchive.order_id.in_(orders.values()))
+                )).scalars().all()
+
+            detail = await client.get(f"/orders/{orders['completed']}", headers=headers)
+            listing = await client.get(
+                "/orders/", params={"waiter_id": admin.id, "include_archived": True}, headers=headers
+            )
+            stats_after = (await client.get("/orders/stats/summary", params=period, headers=headers)).json()
+            status = await client.get("/archive/status", headers=headers)
+
+    return {
+        "orders": orders, "totals": totals, "runs": archive_progress.runs - runs,
+        "hot": hot, "archived": archived, "hot_items": hot_items, "archived_items": archived_items,
+        "detail": detail, "listing": listing, "status": status,
+        "stats_before": stats_before, "stats_after": stats_after
+    }
+
+
+def test_archive_moves_closed_orders_and_keeps_them_readable(monkeypatch):
+    monkeypatch.setattr(settings, "archive_batch_pause", 0)
+
+    result = asyncio.run(_archive())
+    orders = result["orders"]
+
+    moved = {orders["completed"], orders["cancelled"]}
+    # Оплаченный, но открытый заказ еще на столике и на кухне - не архивируется
+    kept = {orders["paid_open"], orders["paid_pending"], orders["unpaid_open"], orders["recent"], orders["newest"]}
+
+    # Заказы и позиции перенесены целиком, в горячих таблицах их больше нет
+    assert result["archived"] == moved
+    assert result["hot"] == kept
+    assert result["hot_items"] == kept
+    assert sorted(result["archived_items"]) == sorted(order_id for order_id in moved for _ in range(2))
+    assert result["totals"]["orders"] >= len(moved)
+    assert result["runs"] == 1
+
+    # Карточка архивного заказа открывается по тому же адресу, с позициями
+    assert result["detail"].status_code == 200
+    detail = result["detail"].json()
+    assert detail["status"] == OrderStatus.COMPLETED.value
+    assert [item["dish_name"] for item in detail["items"]] == ["Архивный суп", "Архивный суп"]
+
+    # Список с include_archived: горячие заказы, затем архивные
+    listed = [order["id"] for order in result["listing"].json()["orders"]]
+    assert set(listed) == moved | kept
+    assert set(listed[:len(kept)]) == kept
+
+    # Отчет за период не меняется от того, где лежат заказы
+    assert result["stats_before"] == result["stats_after"]
+    assert result["stats_after"]["total_orders"] == 6
+
+    status = result["status"].json()["data"]
+    assert result["status"].status_code == 200
+    assert status["running"] is False
+    assert status["last_run_orders"] == result["totals"]["orders"]
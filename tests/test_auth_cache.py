@@ -0,0 +1,158 @@
+"""
+QRes OS 4 - Auth Cache Test
+Кэш проверенных JWT токенов и кэш пользователей для аутентификации запросов
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models import User, UserRole
+from app.schemas import TokenData
+from app.services import auth
+from app.services.auth import (
+    AuthService, PasswordHasher, TokenCache, VerifiedToken, principal_cache, token_cache
+)
+
+
+def _verified(expires_at: float) -> VerifiedToken:
+    return VerifiedToken(
+        token_data=TokenData(username="cached", user_id=1, role=None),
+        expires_at=expires_at,
+        issued_at=None,
+        fresh=False
+    )
+
+
+def test_token_cache_drops_entries_at_exp(monkeypatch):
+    cache = TokenCache(max_size=10)
+    now = time.time()
+    cache.put("token", _verified(expires_at=now + 60))
+
+    assert cache.get("token") is not None
+
+    # exp наступил - запись не выдается и удаляется
+    monkeypatch.setattr(auth.time, "time", lambda: now + 60)
+    assert cache.get("token") is None
+    assert cache.stats() == {"size": 0, "max_size": 10, "hits": 1, "misses": 1}
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    expires_at = time.time() + 60
+    cache.put("first", _verified(expires_at))
+    cache.put("second", _verified(expires_at))
+
+    assert cache.get("first") is not None  # "first" использован недавно
+    cache.put("third", _verified(expires_at))
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_verify_token_decodes_each_token_once(monkeypatch):
+    decoded = []
+    decode = auth.jwt.decode
+
+    def counting_decode(token, *args, **kwargs):
+        decoded.append(token)
+        return decode(token, *args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+    token_cache.clear()
+
+    token = AuthService.create_access_token({"sub": "cache_user", "user_id": 42})
+    assert AuthService.verify_token(token).user_id == 42
+    assert AuthService.verify_token(token).user_id == 42
+    assert decoded == [token]
+
+    # Невалидный токен не кэшируется: каждая попытка проверяется заново
+    forged = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            AuthService.verify_token(forged)
+        assert error.value.status_code == 401
+    assert decoded == [token, forged, forged]
+    assert token_cache.stats()["size"] == 1
+
+
+async def _cancel_queued_verify():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+    password_hash = await asyncio.get_running_loop().run_in_executor(None, auth.pwd_context.hash, "password")
+
+    # Единственный поток занят, проверка пароля ждет в очереди
+    busy = asyncio.create_task(hasher._submit(release.wait))
+    await asyncio.sleep(0.05)
+    queued = asyncio.create_task(hasher.verify("password", password_hash))
+    await asyncio.sleep(0.05)
+    stats_queued = hasher.stats()
+
+    # Клиент отключился - задача отменена до того, как поток освободился
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    release.set()
+    await busy
+    stats_cancelled = hasher.stats()
+
+    # Очередь не "заполнена" навсегда: следующая проверка проходит
+    verified = await hasher.verify("password", password_hash)
+
+    # Пул остановлен: отправка падает, счетчик очереди не растет
+    hasher._executor.shutdown()
+    with pytest.raises(RuntimeError):
+        await hasher.verify("password", password_hash)
+    return stats_queued, stats_cancelled, verified, hasher.stats()
+
+
+def test_cancelled_queued_verify_leaves_the_queue():
+    stats_queued, stats_cancelled, verified, stats_shutdown = asyncio.run(_cancel_queued_verify())
+
+    assert stats_queued["queued"] == 1 and stats_queued["running"] == 1
+    assert stats_cancelled["queued"] == 0 and stats_cancelled["running"] == 0
+    assert verified is True
+    assert stats_shutdown["queued"] == 0
+    assert stats_shutdown["rejected"] == 0
+
+
+async def _deactivate_cached_user():
+    async with app.router.lifespan_context(app):
+        async with AsyncSessionLocal() as session:
+            password_hash = await AuthService.hash_password_async("password")
+            admin = User(username="cache_admin", full_name="Cache Admin",
+                         password_hash=password_hash, role=UserRole.ADMIN)
+            waiter = User(username="cache_waiter", full_name="Cache Waiter",
+                          password_hash=password_hash, role=UserRole.WAITER)
+            session.add_all([admin, waiter])
+            await session.commit()
+
+        def headers(user):
+            token = AuthService.create_access_token({"sub": user.username, "user_id": user.id})
+            return {"Authorization": f"Bearer {token}"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            before = await client.get("/auth/me", headers=headers(waiter))
+            cached = waiter.id in principal_cache._entries
+            deleted = await client.delete(f"/users/{waiter.id}", headers=headers(admin))
+            after = await client.get("/auth/me", headers=headers(waiter))
+    return before, cached, deleted, after
+
+
+def test_deactivated_user_is_rejected_before_principal_ttl(monkeypatch):
+    monkeypatch.setattr(principal_cache, "ttl", 3600)
+
+    before, cached, deleted, after = asyncio.run(_deactivate_cached_user())
+
+    assert before.status_code == 200
+    assert cached
+    assert deleted.status_code == 200
+    # Запись кэша сброшена при деактивации, TTL ждать не нужно
+    assert after.status_code == 401
@@ -0,0 +1,97 @@
+"""
+QRes OS 4 - Dish Search Test
+Индекс FTS5 обновляется вместе с блюдом; запрос пользователя не ломает MATCH
+"""
+import asyncio
+
+from sqlalchemy import select, text
+
+from app.database import engine, init_db, AsyncSessionLocal
+from app.models import Category, Dish
+from app.services.dish_search import DishSearchService
+
+
+def test_match_query_quotes_user_input():
+    assert DishSearchService.match_query("Борщ укр") == '"борщ"* "укр"*'
+    assert DishSearchService.match_query("Ёжик") == '"ежик"*'
+
+    # Операторы и спецсимволы FTS5 - просто слова в кавычках
+    assert DishSearchService.match_query('борщ OR NEAR("x") -суп*') == '"борщ"* "or"* "near"* "x"* "суп"*'
+    assert DishSearchService.match_query('"*" ^ :') is None
+    assert DishSearchService.match_query("") is None
+
+
+async def _search(session, term: str):
+    condition, rank = DishSearchService.search_filter(session, term)
+    query = select(Dish.name).where(condition)
+    if rank is not None:
+        query = query.order_by(rank, Dish.name)
+    return list((await session.execute(query)).scalars())
+
+
+async def _sync():
+    await init_db()
+    results = {}
+    async with AsyncSessionLocal() as session:
+        category = Category(name="Поиск")
+        session.add(category)
+        await session.flush()
+        named = Dish(name="Квазиборщ с ёрмой", description="Тест", category_id=category.id)
+        described = Dish(name="Суп дня", description="Почти квазиборщ", category_id=category.id)
+        session.add_all([named, described])
+        await session.commit()
+
+        # Новые блюда - сразу в индексе; регистр кириллицы и ё/е не важны
+        results["created"] = await _search(session, "КВАЗИБОРЩ")
+        results["yo"] = await _search(session, "ЁРМ")
+        results["prefix"] = await _search(session, "квази")
+        results["operators"] = await _search(session, "квазиборщ OR NOT")
+
+        # Переименование заменяет строку индекса
+        named.name = "Гиперсолянка"
+        await session.commit()
+        results["old_name"] = await _search(session, "ЁРМ")
+        results["new_name"] = await _search(session, "гиперсолян")
+
+        # Изменение поля вне индекса не трогает строку
+        named.price = 500
+        await session.commit()
+        results["untouched"] = await _search(session, "гиперсолян")
+
+        # Удаленное блюдо пропадает из поиска
+        await session.delete(described)
+        await session.commit()
+        results["deleted"] = await _search(session, "квазиборщ")
+
+        results["rebuilt"] = await DishSearchService.ensure_built(session)
+
+        # Правка в обход приложения (число блюд то же) - индекс пересобирается при запуске
+        await session.execute(text("UPDATE dishes SET name = 'Мегарассольник' WHERE id = :id"), {"id": named.id})
+        await session.commit()
+        results["stale"] = await _search(session, "мегарассол")
+        results["rebuilt_after_edit"] = await DishSearchService.ensure_built(session)
+        results["edited"] = await _search(session, "мегарассол")
+    await engine.dispose()
+    return results
+
+
+def test_index_follows_dish_changes():
+    results = asyncio.run(_sync())
+
+    # Совпадение в названии ранжируется выше совпадения в описании
+    assert results["created"] == ["Квазиборщ с ёрмой", "Суп дня"]
+    assert results["yo"] == ["Квазиборщ с ёрмой"]
+    assert results["prefix"] == ["Квазиборщ с ёрмой", "Суп дня"]
+    assert results["operators"] == []
+
+    assert results["old_name"] == []
+    assert results["new_name"] == ["Гиперсолянка"]
+    assert results["untouched"] == ["Гиперсолянка"]
+    assert results["deleted"] == []
+
+    # Индекс совпадает с таблицей блюд - пересборка при запуске не нужна
+    assert results["rebuilt"] is False
+
+    assert results["stale"] == []
+    assert results["rebuilt_after_edit"] is True
+    assert results["edited"] == ["Мегарассольник"]
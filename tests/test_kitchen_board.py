@@ -0,0 +1,156 @@
+"""
+QRes OS 4 - Kitchen Board Test
+Страницы доски кухни по цехам, полная доска и изменения после курсора
+"""
+import asyncio
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import engine, init_db, AsyncSessionLocal
+from app.models import Category, Dish, Order, OrderItem, Table, User, UserRole
+from app.models.order_item import OrderItemStatus, KitchenDepartment
+from app.services.auth import AuthService
+from app.services.kitchen import KitchenService
+
+
+BAR_ITEMS = 7
+HOT_ITEMS = 2
+LIMIT = 3
+
+
+async def _create_items(tag: str, table_number: int):
+    """Один заказ: в баре позиций больше лимита цеха, в горячем цехе - меньше"""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        waiter = User(
+            username=f"{tag}_waiter",
+            full_name="Board Waiter",
+            password_hash=await AuthService.hash_password_async("password"),
+            role=UserRole.WAITER
+        )
+        category = Category(name=f"Доска {tag}")
+        table = Table(number=table_number, seats=4)
+        session.add_all([waiter, category, table])
+        await session.flush()
+
+        dishes = {
+            department: Dish(name=f"{tag} {department.value}", description="Тест", category_id=category.id,
+                             department=department)
+            for department in (KitchenDepartment.BAR, KitchenDepartment.HOT_KITCHEN)
+        }
+        order = Order(table_id=table.id, waiter_id=waiter.id)
+        session.add_all([order, *dishes.values()])
+        await session.flush()
+
+        items = []
+        for department, count in ((KitchenDepartment.BAR, BAR_ITEMS), (KitchenDepartment.HOT_KITCHEN, HOT_ITEMS)):
+            for _ in range(count):
+                items.append(OrderItem(
+                    order_id=order.id, dish_id=dishes[department].id, quantity=1, price=100, total=100,
+                    status=OrderItemStatus.IN_PREPARATION, department=department
+                ))
+        session.add_all(items)
+        await session.commit()
+        return {item.id for item in items}
+
+
+async def _board():
+    item_ids = await _create_items("board", 3000)
+    async with AsyncSessionLocal() as session:
+        first_page = await KitchenService.get_all_kitchen_dishes(session)
+
+        pages, cursor = [first_page], first_page["next_cursor"]
+        while cursor:
+            page = await KitchenService.get_all_kitchen_dishes(session, cursor=cursor)
+            pages.append(page)
+            cursor = page["next_cursor"]
+
+        baseline = await KitchenService.get_kitchen_changes(session, since=None)
+
+        # Позиция сверх лимита меняет статус - приходит в дельте
+        last_bar_item = await session.scalar(
+            select(OrderItem).where(OrderItem.id.in_(item_ids), OrderItem.department == KitchenDepartment.BAR)
+            .order_by(OrderItem.id.desc()).limit(1)
+        )
+        last_bar_item.status = OrderItemStatus.READY
+        await session.commit()
+        delta = await KitchenService.get_kitchen_changes(session, since=baseline["cursor"])
+    await engine.dispose()
+    return item_ids, pages, baseline, delta, last_bar_item.id
+
+
+def test_board_pages_and_full_sync_cover_items_over_department_limit(monkeypatch):
+    monkeypatch.setattr(settings, "kitchen_board_limit", LIMIT)
+    monkeypatch.setattr(settings, "kitchen_board_department_limits", {})
+
+    item_ids, pages, baseline, delta, changed_id = asyncio.run(_board())
+
+    # Первая страница: не больше LIMIT позиций каждого цеха, остаток - по курсору
+    first_ids = {item["id"] for item in pages[0]["items"]} & item_ids
+    assert len(first_ids) < len(item_ids)
+    assert pages[0]["next_cursor"] is not None
+    assert all(
+        sum(item["department"] == department.value for item in page["items"]) <= LIMIT
+        for page in pages for department in KitchenDepartment
+    )
+
+    # Страницы по курсору - все позиции ровно по одному разу
+    paged_ids = [item["id"] for page in pages for item in page["items"] if item["id"] in item_ids]
+    assert sorted(paged_ids) == sorted(item_ids)
+
+    # Полная доска для синхронизации не обрезается лимитом цеха
+    assert baseline["full"] is True
+    baseline_ids = [item["id"] for item in baseline["items"]]
+    assert item_ids <= set(baseline_ids)
+    assert len(baseline_ids) == len(set(baseline_ids))
+
+    assert delta["full"] is False
+    assert delta["cursor"] > baseline["cursor"]
+    assert [item["id"] for item in delta["items"]] == [changed_id]
+    assert delta["items"][0]["status"] == OrderItemStatus.READY.value
+
+
+async def _delta_sync():
+    item_ids = sorted(await _create_items("delta", 3001))
+    async with AsyncSessionLocal() as session:
+        baseline = await KitchenService.get_kitchen_changes(session, since=None)
+        unchanged = await KitchenService.get_kitchen_changes(session, since=baseline["cursor"])
+        from_future = await KitchenService.get_kitchen_changes(session, since=baseline["cursor"] + 1000)
+
+        items = {
+            item.id: item
+            for item in (await session.execute(select(OrderItem).where(OrderItem.id.in_(item_ids)))).scalars()
+        }
+        ready_id, cancelled_id, deleted_id = item_ids[:3]
+        items[ready_id].status = OrderItemStatus.READY
+        items[cancelled_id].status = OrderItemStatus.CANCELLED
+        await session.delete(items[deleted_id])
+        await session.commit()
+
+        delta = await KitchenService.get_kitchen_changes(session, since=baseline["cursor"])
+        hot_delta = await KitchenService.get_kitchen_changes(
+            session, since=baseline["cursor"], department=KitchenDepartment.HOT_KITCHEN
+        )
+    await engine.dispose()
+    return baseline, unchanged, from_future, delta, hot_delta, (ready_id, cancelled_id, deleted_id)
+
+
+def test_changes_since_cursor_report_updates_and_removals():
+    baseline, unchanged, from_future, delta, hot_delta, (ready_id, cancelled_id, deleted_id) = asyncio.run(_delta_sync())
+
+    # Изменений после курсора нет - пустой ответ с тем же курсором
+    assert unchanged == {"cursor": baseline["cursor"], "full": False, "items": [], "removed": []}
+
+    # Курсор из будущего (например, после пересоздания БД) - полная доска
+    assert from_future["full"] is True
+    assert from_future["cursor"] == baseline["cursor"]
+
+    # Позиция в фильтре - в items, вышедшая из фильтра и удаленная - в removed
+    assert delta["full"] is False
+    assert delta["cursor"] == baseline["cursor"] + 3
+    assert [item["id"] for item in delta["items"]] == [ready_id]
+    assert sorted(delta["removed"]) == sorted([cancelled_id, deleted_id])
+
+    # Все три позиции - из бара: в дельте горячего цеха их нет
+    assert hot_delta["items"] == [] and hot_delta["removed"] == []
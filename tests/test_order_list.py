@@ -0,0 +1,72 @@
+"""
+QRes OS 4 - Order List Test
+Порядок списка заказов и признаки is_active / in_work
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models import Order, Table, User, UserRole
+from app.models.order import OrderStatus
+from app.services.auth import AuthService
+
+
+async def _create_orders():
+    """Официант и по заказу в каждом статусе; чем позже статус в перечислении, тем новее заказ"""
+    async with AsyncSessionLocal() as session:
+        waiter = User(
+            username="list_waiter",
+            full_name="List Waiter",
+            password_hash=await AuthService.hash_password_async("password"),
+            role=UserRole.ADMIN
+        )
+        table = Table(number=4000, seats=4)
+        session.add_all([waiter, table])
+        await session.flush()
+
+        started = datetime(2026, 10, 1, 12, 0, 0)
+        orders = [
+            Order(
+                table_id=table.id, waiter_id=waiter.id, status=order_status,
+                created_at=started + timedelta(minutes=index)
+            )
+            for index, order_status in enumerate(OrderStatus)
+        ]
+        session.add_all(orders)
+        await session.commit()
+        return waiter, {order.id: order for order in orders}
+
+
+async def _list_orders():
+    async with app.router.lifespan_context(app):
+        waiter, orders = await _create_orders()
+        token = AuthService.create_access_token({"sub": waiter.username, "user_id": waiter.id})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            response = await client.get("/orders/", params={"waiter_id": waiter.id}, headers=headers)
+    return orders, response
+
+
+def test_order_list_puts_orders_in_work_first():
+    orders, response = asyncio.run(_list_orders())
+
+    assert response.status_code == 200
+    statuses = [order["status"] for order in response.json()["orders"]]
+
+    # PENDING/IN_PROGRESS/READY первыми, остальные (в том числе SERVED/DINING) - за ними,
+    # внутри каждой группы - от новых к старым
+    in_work = ["READY", "IN_PROGRESS", "PENDING"]
+    assert statuses[:3] == in_work
+    assert statuses[3:] == [
+        order_status.value for order_status in reversed(OrderStatus) if order_status.value not in in_work
+    ]
+
+    # Признаки ведутся по статусу
+    for order in orders.values():
+        assert order.is_active == (order.status not in (OrderStatus.COMPLETED, OrderStatus.CANCELLED))
+        assert order.in_work == (order.status in (OrderStatus.PENDING, OrderStatus.IN_PROGRESS, OrderStatus.READY))
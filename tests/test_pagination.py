@@ -0,0 +1,197 @@
+"""
+QRes OS 4 - Keyset Pagination Test
+Курсоры списков: каждая строка ровно один раз, переход из orders в архив
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.main import app
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Category, Dish, Order, Table, User, UserRole
+from app.models.order import OrderStatus, PaymentStatus
+from app.pagination import CountMode, decode_cursor, encode_cursor, read_cursor
+from app.services.archive import ArchiveService
+from app.services.auth import AuthService
+from app.services.order_pricing import moscow_now
+from app.services.row_counts import RowCountService
+
+
+HOT_ORDERS = 5
+ARCHIVED_ORDERS = 3
+DISHES = 7
+
+
+def test_cursor_round_trip_and_validation():
+    key = [datetime(2026, 10, 17, 12, 30, 15, 250000), 42]
+    cursor = encode_cursor({"key": key, "archive": True})
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"key": ["2026-10-17T12:30:15.250000", 42], "archive": True}
+    assert read_cursor(cursor)["archive"] is True
+    assert read_cursor("") == {}
+
+    for broken in ("not a cursor", encode_cursor({"key": ["вчера", 1]}), encode_cursor({"key": [key[0], "1"]})):
+        with pytest.raises(ValueError):
+            read_cursor(broken)
+
+
+async def _create_rows():
+    """
+    Заказы официанта: свежие в одну секунду (ключ различается только id)
+    и старые закрытые, которые уйдут в архив; блюда одной категории,
+    созданные одним INSERT (created_at по server_default, без микросекунд)
+    """
+    async with AsyncSessionLocal() as session:
+        waiter = User(
+            username="page_waiter",
+            full_name="Page Waiter",
+            password_hash=await AuthService.hash_password_async("password"),
+            role=UserRole.ADMIN
+        )
+        category = Category(name="Страницы")
+        table = Table(number=7000, seats=4)
+        session.add_all([waiter, category, table])
+        await session.flush()
+
+        old = moscow_now() - timedelta(days=90)
+        session.add_all([
+            Order(table_id=table.id, waiter_id=waiter.id, status=OrderStatus.COMPLETED,
+                  payment_status=PaymentStatus.PAID, created_at=old + timedelta(minutes=index))
+            for index in range(ARCHIVED_ORDERS)
+        ])
+        await session.flush()
+        same_second = moscow_now().replace(microsecond=0)
+        session.add_all([
+            Order(table_id=table.id, waiter_id=waiter.id, created_at=same_second)
+            for _ in range(HOT_ORDERS)
+        ])
+        session.add_all([
+            Dish(name=f"Страница {index}", description="Тест", category_id=category.id)
+            for index in range(DISHES)
+        ])
+        await session.commit()
+        return waiter, category
+
+
+async def _walk(client, path: str, params: dict, headers: dict, key: str):
+    """Пройти все страницы списка по курсору"""
+    pages, cursor = [], ""
+    while cursor is not None:
+        response = await client.get(path, params={**params, "cursor": cursor}, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append([row["id"] for row in body[key]])
+        cursor = body["next_cursor"]
+    return pages
+
+
+async def _paginate():
+    async with app.router.lifespan_context(app):
+        waiter, category = await _create_rows()
+        await ArchiveService.run(days=30)
+
+        token = AuthService.create_access_token({"sub": waiter.username, "user_id": waiter.id})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            order_params = {"waiter_id": waiter.id, "limit": 2, "include_archived": True}
+            order_pages = await _walk(client, "/orders/", order_params, headers, "orders")
+            hot_pages = await _walk(client, "/orders/", {"waiter_id": waiter.id, "limit": 2}, headers, "orders")
+            dish_pages = await _walk(client, "/dishes/", {"category_id": category.id, "limit": 3}, headers, "dishes")
+
+            counted = (await client.get(
+                "/orders/", params={**order_params, "cursor": "", "count": "exact"}, headers=headers
+            )).json()
+            uncounted = (await client.get(
+                "/orders/", params={**order_params, "cursor": ""}, headers=headers
+            )).json()
+            broken = await client.get("/orders/", params={"cursor": "broken"}, headers=headers)
+            legacy = (await client.get("/orders/", params={"waiter_id": waiter.id}, headers=headers)).json()
+
+        async with AsyncSessionLocal() as session:
+            hot_ids = set((await session.execute(
+                Order.__table__.select().with_only_columns(Order.id).where(Order.waiter_id == waiter.id)
+            )).scalars())
+    return order_pages, hot_pages, dish_pages, counted, uncounted, broken, legacy, hot_ids
+
+
+def test_cursor_pages_cover_every_row_once(monkeypatch):
+    monkeypatch.setattr(settings, "archive_batch_pause", 0)
+
+    order_pages, hot_pages, dish_pages, counted, uncounted, broken, legacy, hot_ids = asyncio.run(_paginate())
+
+    # Заказы: новые первыми, строки с одинаковым created_at различаются по id
+    orders = [order_id for page in order_pages for order_id in page]
+    assert all(len(page) <= 2 for page in order_pages)
+    assert len(orders) == len(set(orders)) == HOT_ORDERS + ARCHIVED_ORDERS
+    assert len(hot_ids) == HOT_ORDERS
+    assert orders[:HOT_ORDERS] == sorted(hot_ids, reverse=True)  # Сначала orders, затем архив
+    assert orders[HOT_ORDERS:] == sorted(orders[HOT_ORDERS:], reverse=True)
+
+    # Без include_archived курсор заканчивается на orders
+    assert [order_id for page in hot_pages for order_id in page] == orders[:HOT_ORDERS]
+
+    # Блюда одной секунды: по возрастанию id, без потерь на границе страниц
+    dishes = [dish_id for page in dish_pages for dish_id in page]
+    assert len(dishes) == DISHES
+    assert dishes == sorted(dishes)
+
+    # total в режиме курсора - только по запросу (с архивом)
+    assert counted["total"] == HOT_ORDERS + ARCHIVED_ORDERS
+    assert uncounted["total"] is None
+    assert broken.status_code == 400
+
+    # Прежний режим skip/limit - точный total без курсора
+    assert legacy["total"] == HOT_ORDERS
+    assert legacy["next_cursor"] is None
+
+
+async def _count_totals():
+    async with app.router.lifespan_context(app):
+        async with AsyncSessionLocal() as session:
+            category = Category(name="Подсчет")
+            session.add(category)
+            await session.flush()
+            session.add_all([
+                Dish(name=f"Подсчет {index}", description="Тест", category_id=category.id)
+                for index in range(3)
+            ])
+            await session.commit()
+
+            async def count(mode: CountMode, category_id: int, estimable: bool = True):
+                return await RowCountService.count(
+                    session, Dish, [Dish.category_id == category_id], mode, {"category_id": category_id},
+                    estimable=estimable
+                )
+
+            RowCountService._cache.clear()
+            # Промах и попадание кэша - одинаковый ответ
+            results = [await count(CountMode.CACHED, category.id) for _ in range(2)]
+            # Оценить нельзя - estimated считает как cached, флаг тот же
+            results.append(await count(CountMode.ESTIMATED, category.id, estimable=False))
+            results.append(await count(CountMode.EXACT, category.id))
+
+            # Кэш ограничен по размеру: вытесняется давно не использованная запись
+            session.add(Dish(name="Подсчет 3", description="Тест", category_id=category.id))
+            await session.commit()
+            stale = await count(CountMode.CACHED, category.id)
+            for other in (-1, -2):
+                await count(CountMode.CACHED, other)
+            fresh = await count(CountMode.CACHED, category.id)
+    return results, stale, fresh, len(RowCountService._cache)
+
+
+def test_count_modes_report_a_stable_estimated_flag(monkeypatch):
+    monkeypatch.setattr(settings, "list_count_cache_size", 2)
+
+    results, stale, fresh, cache_size = asyncio.run(_count_totals())
+
+    assert results == [(3, True), (3, True), (3, True), (3, False)]
+    assert stale == (3, True)
+    assert fresh == (4, True)
+    assert cache_size == 2
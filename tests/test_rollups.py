@@ -0,0 +1,156 @@
+"""
+QRes OS 4 - Sales Rollups Test
+Агрегаты продаж, обновляемые при каждом изменении заказа, совпадают с пересборкой
+"""
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import delete, select
+
+from app.database import engine, init_db, AsyncSessionLocal
+from app.models import (
+    Category, Dish, Order, OrderItem, OrderRollup, OrderItemRollup, PaymentMethod, Table, User, UserRole
+)
+from app.models.order import OrderStatus, PaymentStatus
+from app.services.auth import AuthService
+from app.services.order_pricing import moscow_now
+from app.services.rollups import RollupService
+
+
+ROLLUP_KEYS = {
+    OrderRollup: ("day", "hour", "waiter_id", "payment_method_id"),
+    OrderItemRollup: ("day", "hour", "dish_id", "department"),
+}
+
+
+async def _snapshot(session, model, **criteria) -> dict:
+    """Строки агрегатов: ключ -> счетчики (строки из одних нулей не в счет)"""
+    keys = ROLLUP_KEYS[model]
+    counters = [
+        column.name for column in model.__table__.columns
+        if column.name not in (*keys, "id", "created_at", "updated_at")
+    ]
+    rows = (await session.execute(
+        select(model).where(*[getattr(model, name) == value for name, value in criteria.items()])
+    )).scalars().all()
+    snapshot = {}
+    for row in rows:
+        values = {name: round(float(getattr(row, name)), 2) for name in counters}
+        if any(values.values()):
+            snapshot[tuple(getattr(row, name) for name in keys)] = values
+    return snapshot
+
+
+async def _rollups():
+    """Заказы позавчера: создание, дозаказ, оплата, отмена, удаление позиции - через ORM"""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        waiter = User(
+            username="rollup_waiter",
+            full_name="Rollup Waiter",
+            password_hash=await AuthService.hash_password_async("password"),
+            role=UserRole.WAITER
+        )
+        category = Category(name="Агрегаты")
+        table = Table(number=6000, seats=4)
+        card = PaymentMethod(name="Карта (агрегаты)")
+        session.add_all([waiter, category, table, card])
+        await session.flush()
+        dish = Dish(name="Агрегатный чай", description="Тест", category_id=category.id)
+        session.add(dish)
+        await session.flush()
+
+        created_at = (moscow_now() - timedelta(days=2)).replace(hour=13, minute=15, second=0, microsecond=0)
+        orders = []
+        for index in range(3):
+            order = Order(
+                table_id=table.id, waiter_id=waiter.id, total_price=200,
+                created_at=created_at + timedelta(minutes=index * 50)
+            )
+            session.add(order)
+            await session.flush()
+            session.add_all([
+                OrderItem(order_id=order.id, dish_id=dish.id, quantity=2, price=100, total=200,
+                          department=dish.department, created_at=order.created_at)
+            ])
+            orders.append(order)
+        await session.commit()
+
+        paid, cancelled, changed = orders
+
+        # Оплата: заказ переходит в строку способа оплаты, выручка растет
+        paid.status = OrderStatus.COMPLETED
+        paid.payment_status = PaymentStatus.PAID
+        paid.payment_method_id = card.id
+        paid.time_to_serve = 25
+        await session.commit()
+
+        # Отмена
+        cancelled.status = OrderStatus.CANCELLED
+        await session.commit()
+
+        # Дозаказ и удаление позиции
+        extra = OrderItem(order_id=changed.id, dish_id=dish.id, quantity=1, price=100, total=100,
+                          department=dish.department, created_at=changed.created_at)
+        session.add(extra)
+        changed.total_price = 300
+        await session.commit()
+        item = await session.scalar(
+            select(OrderItem).where(OrderItem.order_id == changed.id, OrderItem.id != extra.id)
+        )
+        await session.delete(item)
+        changed.total_price = 100
+        await session.commit()
+
+        incremental = (
+            await _snapshot(session, OrderRollup, waiter_id=waiter.id),
+            await _snapshot(session, OrderItemRollup, dish_id=dish.id),
+        )
+
+        await RollupService.rebuild(session)
+        rebuilt = (
+            await _snapshot(session, OrderRollup, waiter_id=waiter.id),
+            await _snapshot(session, OrderItemRollup, dish_id=dish.id),
+        )
+
+        # Таблицы агрегатов пусты (например, сразу после миграции)
+        await session.execute(delete(OrderRollup))
+        await session.execute(delete(OrderItemRollup))
+        await session.commit()
+        built = await RollupService.ensure_built(session)
+        built_again = await RollupService.ensure_built(session)
+        restored = (
+            await _snapshot(session, OrderRollup, waiter_id=waiter.id),
+            await _snapshot(session, OrderItemRollup, dish_id=dish.id),
+        )
+    await engine.dispose()
+    return card.id, incremental, rebuilt, built, built_again, restored
+
+
+def test_incremental_rollups_match_rebuild():
+    card_id, incremental, rebuilt, built, built_again, restored = asyncio.run(_rollups())
+    order_rollups, item_rollups = incremental
+
+    assert incremental == rebuilt
+
+    # Три заказа в 13:15, 14:05 и 14:55; оплаченный - в строке способа оплаты
+    by_key = {(key[1], key[3]): counters for key, counters in order_rollups.items()}
+    assert by_key[(13, card_id)]["paid_orders"] == 1
+    assert by_key[(13, card_id)]["revenue"] == 200
+    assert by_key[(13, card_id)]["completed_orders"] == 1
+    assert by_key[(13, card_id)]["time_to_serve_total"] == 25
+    assert by_key[(14, 0)]["orders"] == 2
+    assert by_key[(14, 0)]["cancelled_orders"] == 1
+    assert by_key[(14, 0)]["pending_orders"] == 1
+    assert by_key[(14, 0)]["revenue"] == 0
+    assert (13, 0) not in by_key  # Вклад до оплаты вычтен
+
+    # Позиции: 3 x 2 шт., дозаказ 1 шт., одна позиция на 2 шт. удалена
+    assert sum(counters["items"] for counters in item_rollups.values()) == 3
+    assert sum(counters["quantity"] for counters in item_rollups.values()) == 5
+    assert sum(counters["total"] for counters in item_rollups.values()) == 500
+
+    # ensure_built собирает пустые агрегаты и не трогает уже собранные
+    assert built is True
+    assert built_again is False
+    assert restored == rebuilt
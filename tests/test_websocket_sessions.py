@@ -0,0 +1,140 @@
+"""
+QRes OS 4 - WebSocket DB Session Test
+Открытые WebSocket соединения не должны удерживать соединения пула БД
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.database import engine, init_db, AsyncSessionLocal
+from app.models import User, UserRole
+from app.routers.websocket import ClientConnection
+from app.services.auth import AuthService
+
+
+CONNECTIONS = 8
+
+
+class PoolUsage:
+    """Счетчик соединений, выданных пулом и еще не возвращенных (для любого класса пула)"""
+
+    def __init__(self, engine):
+        self.checked_out = 0
+        self.peak = 0
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, *args):
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+
+    def _on_checkin(self, *args):
+        self.checked_out -= 1
+
+
+async def _create_users():
+    """Создать по пользователю на каждое WebSocket соединение"""
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        password_hash = await AuthService.hash_password_async("password")
+        users = [
+            User(
+                username=f"ws_user_{index}",
+                full_name=f"WS User {index}",
+                password_hash=password_hash,
+                role=UserRole.KITCHEN if index % 2 else UserRole.WAITER,
+                is_active=True
+            )
+            for index in range(CONNECTIONS)
+        ]
+        session.add_all(users)
+        await session.commit()
+        user_ids = [user.id for user in users]
+    await engine.dispose()
+    return user_ids
+
+
+def test_websocket_connections_do_not_hold_pool_connections():
+    user_ids = asyncio.run(_create_users())
+    pool = PoolUsage(engine)
+
+    with TestClient(app) as client:
+        tokens = [
+            AuthService.create_access_token({"sub": f"ws_user_{index}", "user_id": user_id})
+            for index, user_id in enumerate(user_ids)
+        ]
+
+        sockets = []
+        try:
+            for token in tokens:
+                websocket = client.websocket_connect(f"/ws/orders?token={token}")
+                websocket.__enter__()
+                sockets.append(websocket)
+                assert websocket.receive_json()["type"] == "connected"
+
+                # Аутентификация завершена - сессия уже вернула соединение в пул
+                assert pool.checked_out == 0
+
+            # Сообщение с обращением к БД берет и сразу освобождает сессию
+            sockets[0].send_json({"type": "get_order", "order_id": 999})
+            reply = sockets[0].receive_json()
+            assert reply["type"] == "error"
+            assert pool.checked_out == 0
+
+            sockets[0].send_json({"type": "get_stats"})
+            assert sockets[0].receive_json()["data"]["total"] == CONNECTIONS
+        finally:
+            for websocket in sockets:
+                websocket.__exit__(None, None, None)
+
+        # Одновременно открытых соединений БД не больше одного, сколько бы ни было сокетов
+        assert pool.checked_out == 0
+        assert pool.peak <= 1
+
+
+class ClosingSocket:
+    """Сокет, закрытие которого завершается ошибкой error (None - успешно)"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.closed = False
+
+    async def close(self):
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        self.closed = True
+
+
+async def _close_connections():
+    user = User(id=1, username="ws_closer", role=UserRole.WAITER)
+    connections = {
+        name: ClientConnection(ClosingSocket(error), user, max_queue_size=10, policy="coalesce", send_timeout=1)
+        for name, error in (
+            ("ok", None),
+            ("gone", RuntimeError("Cannot call \"send\" once a close message has been sent")),
+            ("broken", ValueError("сокет сломан")),
+        )
+    }
+    for connection in connections.values():
+        connection.start()
+        connection.close()
+        connection.close()  # Повторный вызов ничего не делает
+    # Задачи закрытия удерживаются соединением до завершения
+    tasks = [connection._closer for connection in connections.values()]
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+    return connections, tasks
+
+
+def test_close_keeps_the_close_task_and_logs_its_errors(capsys):
+    connections, tasks = asyncio.run(_close_connections())
+
+    assert all(isinstance(task, asyncio.Task) and task.done() for task in tasks)
+    assert connections["ok"].websocket.closed
+    output = capsys.readouterr().out
+    # Клиент уже отключился - не ошибка; прочие ошибки закрытия видны в логе
+    assert "ws_closer: ошибка закрытия (ValueError: сокет сломан)" in output
+    assert "RuntimeError" not in output
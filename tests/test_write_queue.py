@@ -0,0 +1,233 @@
+"""
+QRes OS 4 - SQLite Write Queue Test
+Одновременные пишущие запросы проходят через очередь записи без ошибок блокировки,
+действия после коммита выполняются после группового COMMIT
+"""
+import asyncio
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.main import app
+from app.config import settings
+from app.database import AsyncSessionLocal, write_coordinator
+from app.models import (
+    Category, Dish, DishVariation, Order, OrderItem, Table, User, UserRole
+)
+from app.services.auth import AuthService, password_hasher
+from app.services.dashboard import dashboard_cache
+
+
+ORDERS = 200
+TABLES = 20
+
+
+async def _create_fixtures():
+    """Официант, столики и блюдо с вариацией"""
+    async with AsyncSessionLocal() as session:
+        waiter = User(
+            username="queue_waiter",
+            full_name="Queue Waiter",
+            password_hash=await AuthService.hash_password_async("password"),
+            role=UserRole.WAITER,
+            is_active=True
+        )
+        category = Category(name="Очередь")
+        session.add_all([waiter, category])
+        await session.flush()
+
+        dish = Dish(name="Компот", description="Ягодный", category_id=category.id)
+        session.add(dish)
+        await session.flush()
+        session.add(DishVariation(dish_id=dish.id, name="Стакан", price=100))
+
+        tables = [Table(number=1000 + index, seats=4) for index in range(TABLES)]
+        session.add_all(tables)
+        await session.commit()
+        return waiter, dish, [table.id for table in tables]
+
+
+async def _stress():
+    async with app.router.lifespan_context(app):
+        assert write_coordinator.enabled
+
+        waiter, dish, table_ids = await _create_fixtures()
+        token = AuthService.create_access_token({"sub": waiter.username, "user_id": waiter.id})
+        headers = {"Authorization": f"Bearer {token}"}
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            responses = await asyncio.gather(*[
+                client.post("/orders/", headers=headers, json={
+                    "table_id": table_ids[index % TABLES],
+                    "items": [{"dish_id": dish.id, "quantity": 1}]
+                })
+                for index in range(ORDERS)
+            ])
+
+        stats = write_coordinator.stats()
+
+        async with AsyncSessionLocal() as session:
+            orders = await session.scalar(
+                select(func.count(Order.id)).where(Order.table_id.in_(table_ids))
+            )
+            items = await session.scalar(
+                select(func.count(OrderItem.id)).join(Order).where(Order.table_id.in_(table_ids))
+            )
+
+    return responses, stats, orders, items
+
+
+def test_concurrent_order_writes_go_through_write_queue(monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_write_queue", True)
+
+    responses, stats, orders, items = asyncio.run(_stress())
+
+    assert [response.status_code for response in responses] == [201] * ORDERS
+    assert not write_coordinator.enabled  # Остановлена вместе с приложением
+
+    # Транзакции выполнялись по очереди: второй заказ столика дописывается к первому
+    assert orders == TABLES
+    assert items == ORDERS
+
+    # Коммиты объединялись в группы
+    assert stats["timeouts"] == 0
+    assert stats["largest_group"] > 1
+    assert stats["group_commits"] < stats["transactions"]
+
+
+async def _slow_login(monkeypatch):
+    """Вход с долгой проверкой пароля и одновременный заказ"""
+    checking, finish = asyncio.Event(), asyncio.Event()
+
+    async def slow_verify(plain_password: str, hashed_password: str) -> bool:
+        checking.set()
+        await finish.wait()
+        return True
+
+    async with app.router.lifespan_context(app):
+        async with AsyncSessionLocal() as session:
+            waiter = User(
+                username="slow_login_waiter",
+                full_name="Slow Login Waiter",
+                password_hash=await AuthService.hash_password_async("password"),
+                role=UserRole.WAITER,
+                is_active=True
+            )
+            category = Category(name="Медленный вход")
+            table = Table(number=1100, seats=2)
+            session.add_all([waiter, category, table])
+            await session.flush()
+            dish = Dish(name="Морс", description="Клюквенный", category_id=category.id)
+            session.add(dish)
+            await session.flush()
+            session.add(DishVariation(dish_id=dish.id, name="Стакан", price=80))
+            await session.commit()
+
+        token = AuthService.create_access_token({"sub": waiter.username, "user_id": waiter.id})
+        monkeypatch.setattr(password_hasher, "verify", slow_verify)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+            login = asyncio.create_task(client.post(
+                "/auth/login", json={"username": waiter.username, "password": "password"}
+            ))
+            await checking.wait()  # Вход проверяет пароль
+
+            order = await client.post("/orders/", headers={"Authorization": f"Bearer {token}"}, json={
+                "table_id": table.id,
+                "items": [{"dish_id": dish.id, "quantity": 1}]
+            })
+            login_pending = not login.done()
+
+            finish.set()
+            login_response = await login
+
+        async with AsyncSessionLocal() as session:
+            last_login = await session.scalar(select(User.last_login).where(User.id == waiter.id))
+
+    return order, login_pending, login_response, last_login
+
+
+async def _dashboard_invalidation():
+    """Коммит в очереди, пока следующий запрос держит соединение писателя до группового COMMIT"""
+    async with app.router.lifespan_context(app):
+        assert write_coordinator.enabled
+        version = dashboard_cache._version
+
+        first = await write_coordinator.acquire()
+        second_task = asyncio.create_task(write_coordinator.acquire())
+        await asyncio.sleep(0)  # Второй запрос встал в очередь
+
+        first.add(Category(name="Дашборд"))
+        commit_task = asyncio.create_task(first.commit())
+        second = await second_task  # Точка сохранения первого освобождена, группа открыта
+
+        async with AsyncSessionLocal() as reader:
+            visible = await reader.scalar(select(func.count(Category.id)).where(Category.name == "Дашборд"))
+        version_before_group_commit = dashboard_cache._version
+
+        await write_coordinator.release(second)  # Очередь пуста - групповой COMMIT
+        await commit_task
+        version_after_group_commit = dashboard_cache._version
+        await write_coordinator.release(first)
+
+    return version, visible, version_before_group_commit, version_after_group_commit
+
+
+async def _failed_group_commit(monkeypatch):
+    """Групповой COMMIT завершается ошибкой"""
+    async def failing_commit(connection):
+        raise RuntimeError("disk I/O error")
+
+    async with app.router.lifespan_context(app):
+        version = dashboard_cache._version
+        session = await write_coordinator.acquire()
+        session.add(Category(name="Не сохранится"))
+
+        failed = False
+        with monkeypatch.context() as patch:
+            patch.setattr(AsyncConnection, "commit", failing_commit)
+            try:
+                await session.commit()
+            except RuntimeError:
+                failed = True
+        await write_coordinator.release(session)
+
+    return version, failed, dashboard_cache._version
+
+
+def test_slow_login_does_not_block_order_writes(monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_write_queue", True)
+    monkeypatch.setattr(settings, "sqlite_write_queue_timeout", 1.0)
+
+    order, login_pending, login_response, last_login = asyncio.run(_slow_login(monkeypatch))
+
+    # Заказ записан, пока вход еще проверяет пароль: очередь записи свободна
+    assert order.status_code == 201, order.text
+    assert login_pending
+
+    # Вход дописал время входа после проверки
+    assert login_response.status_code == 200, login_response.text
+    assert last_login is not None
+
+
+def test_dashboard_is_invalidated_after_group_commit(monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_write_queue", True)
+
+    version, visible, before, after = asyncio.run(_dashboard_invalidation())
+
+    # Пока группа не зафиксирована, данные не видны - и снимок дашборда не сброшен
+    assert visible == 0
+    assert before == version
+    assert after == version + 1
+
+
+def test_failed_group_commit_skips_after_commit_hooks(monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_write_queue", True)
+
+    version, failed, after = asyncio.run(_failed_group_commit(monkeypatch))
+
+    assert failed
+    assert after == version